@@ -4,7 +4,15 @@ from flask import Flask
 
 from resources.meals import meals_api
 from resources.users import users_api
+from resources.admin import admin_api
+from resources.reports import reports_api
 from models import db
+from database import ReplicaRouter
+from cache import MenuCache
+import json_backend
+import idempotency
+from intake import OrderIntake
+from metrics import Metrics
 
 
 def create_app(configuration):
@@ -15,7 +23,15 @@ def create_app(configuration):
 
     app.register_blueprint(meals_api, url_prefix='/api/v3')
     app.register_blueprint(users_api, url_prefix='/api/v3')
+    app.register_blueprint(admin_api, url_prefix='/api/v3')
+    app.register_blueprint(reports_api, url_prefix='/api/v3')
     db.init_app(app)
+    ReplicaRouter(app)
+    MenuCache(app)
+    json_backend.init_app(app)
+    idempotency.init_app(app)
+    OrderIntake(app)
+    Metrics(app)
 
     return app
 
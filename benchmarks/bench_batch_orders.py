@@ -0,0 +1,41 @@
+"""Compares placing N orders with N calls to POST /orders against one POST /orders/batch.
+
+    $ python benchmarks/bench_batch_orders.py [N ...]
+"""
+import json
+import sys
+import time
+
+from common import make_app, login
+
+import models
+
+
+def main():
+    """Run the benchmark"""
+    sizes = [int(size) for size in sys.argv[1:]] or [10, 30, 50, 100]
+    app = make_app()
+    client = app.test_client()
+    headers = login(client)
+    with app.app_context():
+        models.Meal.create_meal(name='chapo', price=20, in_menu=True)
+
+    print('{:>6} {:>14} {:>14} {:>9}'.format('orders', 'single calls', 'one batch', 'speedup'))
+    for size in sizes:
+        started = time.perf_counter()
+        for _ in range(size):
+            client.post('/api/v3/orders', headers=headers, data=json.dumps({'meal_id' : 1}))
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        response = client.post('/api/v3/orders/batch', headers=headers,
+                               data=json.dumps({'meal_ids' : [1] * size}))
+        batch = time.perf_counter() - started
+        assert response.status_code == 201, response.get_data()
+
+        print('{:>6} {:>12.1f}ms {:>12.1f}ms {:>8.1f}x'.format(
+            size, single * 1000, batch * 1000, single / batch))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Measures the memory used to stream the CSV export of orders as the number of orders grows.
+The peak should stay flat: rows are fetched and written STREAM_BATCH at a time.
+
+    $ python benchmarks/bench_export.py [ORDERS ...]
+"""
+import sys
+import time
+import tracemalloc
+
+from common import make_app, login
+
+import models
+
+
+def main():
+    """Run the benchmark"""
+    sizes = [int(size) for size in sys.argv[1:]] or [10000, 50000, 200000]
+    app = make_app()
+    client = app.test_client()
+    headers = login(client)
+    row = {'meal_id' : 1, 'meal_name' : 'chapo', 'price' : 20, 'user_id' : 1,
+           'user_email' : 'admin@gmail.com'}
+    written = 0
+
+    print('{:>8} {:>12} {:>12} {:>12}'.format('orders', 'time', 'bytes', 'peak memory'))
+    for size in sizes:
+        with app.app_context():
+            while written < size:
+                chunk = min(10000, size - written)
+                models.Order.insert_many([dict(row) for _ in range(chunk)], chunk_size=500)
+                models.db.session.commit()
+                written += chunk
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = client.get('/api/v3/orders/export.csv', headers=headers)
+        received = sum(len(chunk) for chunk in response.response)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print('{:>8} {:>10.2f}s {:>12} {:>10.1f}MB'.format(size, elapsed, received, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Shows the query plan and timing of the hot order and menu queries before and after
+the secondary indexes are created.
+
+    $ python benchmarks/bench_indexes.py [orders]
+
+Runs against a throwaway SQLite database. Point BENCH_DATABASE_URI at a Postgres
+database to see the Postgres plans instead (the tables are dropped afterwards).
+"""
+import datetime
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+import models
+
+USERS = 2000
+MEALS = 500
+
+QUERIES = [
+    ('OrderList.get (user page)',
+     'SELECT * FROM "order" WHERE user_id = :user_id ORDER BY id DESC LIMIT 51'),
+    ('Order.get (ownership check)',
+     'SELECT * FROM "order" WHERE user_id = :user_id AND id = :order_id'),
+    ('User.get_user (orders)',
+     'SELECT * FROM "order" WHERE user_id = :user_id'),
+    ('order history (by day)',
+     'SELECT * FROM "order" WHERE created_at >= :since ORDER BY created_at'),
+    ('MenuList.get',
+     'SELECT * FROM meal WHERE in_menu = {}'),
+]
+
+
+def explain(connection, sql, params):
+    """Returns the query plan as a single string"""
+    if connection.dialect.name == 'sqlite':
+        rows = connection.execute(text('EXPLAIN QUERY PLAN ' + sql), params)
+        return '; '.join(str(row[-1]) for row in rows)
+    rows = connection.execute(text('EXPLAIN ' + sql), params)
+    return '; '.join(str(row[0]).strip() for row in rows)
+
+
+def populate(engine, orders):
+    """Fills the tables with users, meals (a few on the menu) and orders spread over a year"""
+    started = datetime.datetime(2026, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(models.User.__table__.insert(), [
+            {'id': i, 'username': 'user{}'.format(i), 'email': 'user{}@gmail.com'.format(i),
+             'password': 'x', 'admin': False} for i in range(1, USERS + 1)])
+        connection.execute(models.Meal.__table__.insert(), [
+            {'id': i, 'name': 'meal{}'.format(i), 'price': 100, 'in_menu': i % 50 == 0}
+            for i in range(1, MEALS + 1)])
+        connection.execute(models.Order.__table__.insert(), [
+            {'meal_id': i % MEALS + 1, 'meal_name': 'meal', 'price': 100,
+             'user_id': random.randint(1, USERS), 'user_email': 'user@gmail.com',
+             'created_at': started + datetime.timedelta(minutes=i % 525600)}
+            for i in range(orders)])
+
+
+def report(engine, title):
+    """Prints the plan and the average time of each query"""
+    print('\n== {} =='.format(title))
+    true = 'true' if engine.dialect.name == 'postgresql' else '1'
+    params = {'user_id': USERS // 2, 'order_id': 10, 'since': datetime.datetime(2026, 12, 31)}
+
+    with engine.connect() as connection:
+        for name, sql in QUERIES:
+            sql = sql.format(true)
+            plan = explain(connection, sql, params)
+            seconds = timeit.timeit(
+                lambda: connection.execute(text(sql), params).fetchall(), number=20) / 20
+            print('{:<30} {:>9.3f}ms  {}'.format(name, seconds * 1000, plan))
+
+
+def main():
+    """Run the benchmark"""
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    engine = create_engine(os.getenv('BENCH_DATABASE_URI', 'sqlite://'))
+    metadata = models.db.Model.metadata
+    indexes = [index for table in metadata.sorted_tables for index in table.indexes]
+
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    for index in indexes:
+        index.drop(engine)
+
+    populate(engine, orders)
+    report(engine, 'before ({} orders, no secondary indexes)'.format(orders))
+
+    for index in indexes:
+        index.create(engine)
+    with engine.connect() as connection:
+        connection.execute(text('ANALYZE'))
+    report(engine, 'after ({})'.format(', '.join(index.name for index in indexes)))
+
+    metadata.drop_all(engine)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Compares the order throughput of concurrent clients with a commit per order against
+the write-behind intake, which commits orders in batches.
+
+    $ python benchmarks/bench_intake.py [THREADS [ORDERS_PER_THREAD]]
+"""
+import json
+import sys
+import threading
+import time
+
+from common import make_app, login
+
+import models
+
+
+def run(intake, threads, per_thread):
+    """Places threads * per_thread orders from threads clients, returns orders per second"""
+    app = make_app(ORDER_INTAKE=intake)
+    headers = login(app.test_client(), email='user@gmail.com', admin=False)
+    with app.app_context():
+        models.Meal.create_meal(name='chapo', price=20, in_menu=True)
+    data = json.dumps({'meal_id' : 1})
+
+    def client():
+        """place orders one after the other"""
+        test_client = app.test_client()
+        for _ in range(per_thread):
+            response = test_client.post('/api/v3/orders', headers=headers, data=data)
+            assert response.status_code == 201, response.get_data()
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        assert models.Order.query.count() == threads * per_thread
+    stats = app.extensions['order_intake'].stats()
+    app.extensions['order_intake'].close()
+    return threads * per_thread / elapsed, stats
+
+
+def main():
+    """Run the benchmark"""
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+    direct, _ = run(False, threads, per_thread)
+    grouped, stats = run(True, threads, per_thread)
+
+    print('{} clients placing {} orders each'.format(threads, per_thread))
+    print('commit per order  {:>8.0f} orders/s'.format(direct))
+    print('intake            {:>8.0f} orders/s  ({} commits, {:.1f}x)'.format(
+        grouped, stats['batches'], grouped / direct))
+
+
+if __name__ == '__main__':
+    main()
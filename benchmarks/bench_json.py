@@ -0,0 +1,64 @@
+"""Reports the encoded size and encode time of each list endpoint for every JSON backend.
+
+    $ python benchmarks/bench_json.py [rows]
+
+'flask default' is what flask.jsonify produced before (pretty printed, json module).
+"""
+import datetime
+import json
+import sys
+import time
+
+from common import make_app, login
+
+import json_backend
+import models
+
+ITERATIONS = 20
+ENDPOINTS = ['/api/v3/menu', '/api/v3/meals?limit=500', '/api/v3/orders?limit=500',
+             '/api/v3/users?limit=500']
+
+
+def seed(app, rows):
+    """Adds meals, users and orders"""
+    with app.app_context():
+        models.db.session.execute(models.Meal.__table__.insert(), [
+            {'name' : 'meal {}'.format(i), 'price' : 200, 'in_menu' : i % 5 == 0}
+            for i in range(rows)])
+        models.db.session.execute(models.User.__table__.insert(), [
+            {'username' : 'user{}'.format(i), 'email' : 'user{}@gmail.com'.format(i),
+             'password' : 'x', 'admin' : False} for i in range(rows)])
+        models.db.session.execute(models.Order.__table__.insert(), [
+            {'meal_id' : i % rows + 1, 'meal_name' : 'meal {}'.format(i % rows), 'price' : 200,
+             'user_id' : i % rows + 2, 'user_email' : 'user@gmail.com',
+             'created_at' : datetime.datetime(2018, 6, 7, 11, 18, 39)} for i in range(rows)])
+        models.db.session.commit()
+
+
+def main():
+    """Run the benchmark"""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    app = make_app()
+    client = app.test_client()
+    headers = login(client)
+    seed(app, rows)
+
+    backends = [('flask default', json_backend.create_backend('stdlib', compact=False)),
+                ('stdlib compact', json_backend.create_backend('stdlib'))]
+    if json_backend.orjson is not None:
+        backends.append(('orjson compact', json_backend.create_backend('orjson')))
+
+    # the payloads still hold formatted strings, as they would when the endpoint encodes them
+    print('{:<28} {:<16} {:>10} {:>10}'.format('endpoint', 'backend', 'bytes', 'encode'))
+    for endpoint in ENDPOINTS:
+        payload = json.loads(client.get(endpoint, headers=headers).get_data(as_text=True))
+        for name, backend in backends:
+            started = time.perf_counter()
+            for _ in range(ITERATIONS):
+                body = backend.dumps(payload)
+            elapsed = (time.perf_counter() - started) / ITERATIONS
+            print('{:<28} {:<16} {:>10} {:>8.3f}ms'.format(endpoint, name, len(body), elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
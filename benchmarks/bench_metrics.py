@@ -0,0 +1,62 @@
+"""Measures what recording metrics adds to every request: the request hooks alone, and
+whole requests to a cheap endpoint with METRICS on and off.
+
+    $ python benchmarks/bench_metrics.py [REQUESTS]
+"""
+import sys
+import time
+
+from flask import request
+
+from common import make_app
+
+BUDGET = 20e-6 # seconds a request may spend recording its metrics
+
+
+def hooks(requests):
+    """Returns the seconds the request hooks take per request"""
+    app = make_app()
+    metrics = app.extensions['metrics']
+    response = app.response_class(status=401)
+
+    with app.test_request_context('/api/v3/menu'):
+        request.url_rule, request.view_args = app.url_map.bind('localhost').match(
+            '/api/v3/menu', return_rule=True)
+        started = time.perf_counter()
+        for _ in range(requests):
+            metrics._start() # pylint: disable=W0212
+            metrics._finish(response) # pylint: disable=W0212
+            metrics._fail(None) # pylint: disable=W0212
+        return (time.perf_counter() - started) / requests
+
+
+def timed(client, requests):
+    """Returns the seconds per request to the menu without a token, which needs no query"""
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get('/api/v3/menu')
+    return (time.perf_counter() - started) / requests
+
+
+def main():
+    """Run the benchmark"""
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    per_hook = hooks(requests)
+
+    # alternate short runs so both see the same machine load, keep the fastest of each
+    clients = {enabled : make_app(METRICS=enabled).test_client() for enabled in (False, True)}
+    best = {enabled : timed(client, 100) for enabled, client in clients.items()}
+    for _ in range(10):
+        for enabled, client in clients.items():
+            best[enabled] = min(best[enabled], timed(client, requests // 40))
+    off, on = best[False], best[True]
+
+    print('request hooks          {:>8.2f} us per request'.format(per_hook * 1e6))
+    print('request, metrics off   {:>8.2f} us'.format(off * 1e6))
+    print('request, metrics on    {:>8.2f} us  (+{:.2f} us)'.format(on * 1e6, (on - off) * 1e6))
+    assert per_hook < BUDGET, 'recording metrics takes {:.2f} us per request'.format(per_hook * 1e6)
+
+
+if __name__ == '__main__':
+    main()
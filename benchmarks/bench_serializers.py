@@ -0,0 +1,52 @@
+"""Compares flask_restful.marshal with the compiled serializers on order rows.
+
+    $ python benchmarks/bench_serializers.py
+
+marshal is given ORM-like objects and the serializer the row tuples it gets from
+with_entities, which is how each is used by the list endpoints.
+"""
+import datetime
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_restful import marshal
+
+from resources.meals import order_fields, order_serializer
+
+SIZES = (1000, 10000, 100000)
+
+
+def make_rows(count):
+    """Returns count order rows as tuples and as objects"""
+    created_at = datetime.datetime(2018, 6, 7, 11, 18, 39)
+    rows = [(i, i % 50, 'meal {}'.format(i % 50), 200, i % 700, 'user@gmail.com', created_at)
+            for i in range(count)]
+    objects = [SimpleNamespace(**dict(zip(order_serializer.keys, row))) for row in rows]
+    return rows, objects
+
+
+def timed(function, items):
+    """Returns the seconds taken to apply function to every item"""
+    started = time.perf_counter()
+    for item in items:
+        function(item)
+    return time.perf_counter() - started
+
+
+def main():
+    """Run the benchmark"""
+    print('{:>8} {:>12} {:>12} {:>8}'.format('rows', 'marshal', 'compiled', 'speedup'))
+    for size in SIZES:
+        rows, objects = make_rows(size)
+        marshal_time = timed(lambda obj: marshal(obj, order_fields), objects)
+        compiled_time = timed(order_serializer.encode, rows)
+        print('{:>8} {:>10.1f}ms {:>10.1f}ms {:>7.1f}x'.format(
+            size, marshal_time * 1000, compiled_time * 1000, marshal_time / compiled_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Helpers shared by the benchmarks that run requests against the app.
+
+The app uses TestingConfig with a throwaway SQLite database unless
+BENCH_DATABASE_URI points somewhere else.
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+import config
+import models
+from app import create_app
+
+
+def make_app(**settings):
+    """Returns an app with empty tables, settings override the config"""
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    attributes = dict(settings)
+    attributes.setdefault(
+        'SQLALCHEMY_DATABASE_URI', os.getenv('BENCH_DATABASE_URI', 'sqlite:///' + path))
+    attributes.setdefault('SQLALCHEMY_TRACK_MODIFICATIONS', False)
+    configuration = type('BenchmarkConfig', (config.TestingConfig,), attributes)
+    app = create_app(configuration)
+
+    with app.app_context():
+        models.db.drop_all()
+        models.db.create_all()
+    return app
+
+
+def login(client, email='admin@gmail.com', password='12345678', admin=True):
+    """Creates a user and returns the headers to authenticate as them"""
+    with client.application.app_context():
+        models.User.create_user(username=email, email=email, password=password, admin=admin)
+    response = client.post('/api/v3/auth/login', content_type='application/json',
+                           data=json.dumps({'email' : email, 'password' : password}))
+    token = json.loads(response.get_data(as_text=True))['token']
+    return {'Content-Type' : 'application/json', 'x-access-token' : token}
@@ -0,0 +1,87 @@
+"""Contains the in-process cache of the serialised menu.
+
+The menu is read by every client far more often than it changes, so the JSON body of
+MenuList.get is kept in memory together with a version number. Every write to a meal
+bumps the version once it has been committed, and entries also expire after
+MENU_CACHE_TTL seconds to bound staleness when another worker process made the change.
+"""
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+
+
+CachedMenu = namedtuple('CachedMenu', ['body', 'etag', 'version', 'expires', 'last_modified'])
+
+
+class MenuCache(object):
+    """Holds the pre-serialised menu and counts cache hits and misses"""
+
+
+    def __init__(self, app=None):
+        self.ttl = 30
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.last_modified = time.time()
+        self._entry = None
+        self._etag = None
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Attaches the cache to an app"""
+        self.ttl = app.config.get('MENU_CACHE_TTL', self.ttl)
+        app.extensions['menu_cache'] = self
+
+    def get(self, build):
+        """Returns the cached menu, calling build() to serialise it again when stale"""
+        entry = self._entry
+        now = time.time()
+
+        if entry is not None and entry.version == self.version and entry.expires > now:
+            self.hits += 1
+            return entry, True
+
+        self.misses += 1
+        version = self.version
+        body = build()
+        etag = hashlib.sha1(body).hexdigest()
+
+        with self._lock:
+            if etag != self._etag:
+                # the menu really changed, possibly through another worker
+                self._etag = etag
+                self.last_modified = now
+            entry = CachedMenu(body=body, etag=etag, version=version,
+                               expires=now + self.ttl, last_modified=self.last_modified)
+            # a write committed while we were building, keep serving fresh copies
+            if self.version == version:
+                self._entry = entry
+
+        return entry, False
+
+    def invalidate(self):
+        """Discards the cached menu after a committed write to the meal table"""
+        with self._lock:
+            self.version += 1
+            self._entry = None
+
+    def stats(self):
+        """Returns the hit and miss counters and the current version"""
+        return {'hits' : self.hits, 'misses' : self.misses, 'version' : self.version}
+
+
+def menu_cache():
+    """Returns the menu cache of the current app"""
+    return current_app.extensions['menu_cache']
+
+
+def invalidate_menu():
+    """Invalidates the menu cache of the current app, if it has one"""
+    if has_app_context() and 'menu_cache' in current_app.extensions:
+        current_app.extensions['menu_cache'].invalidate()
@@ -0,0 +1,147 @@
+"""Contains the bulk import of the meal catalogue from CSV or NDJSON uploads.
+
+Uploads are parsed as a stream, one row at a time, and written in chunks of
+IMPORT_CHUNK_SIZE meals with a single transaction per chunk, so a whole weekly
+catalogue is loaded without ever holding it in memory or committing once per meal.
+Rows that cannot be imported are reported with their row number and skipped. An upload
+that stops being valid UTF-8 (or CSV) ends the import there, keeping the chunks written
+before it, and the report says from which row on nothing was read.
+"""
+import csv
+import io
+import json
+import re
+
+from flask_restful import inputs
+
+import models
+from cache import invalidate_menu
+
+IMPORT_CHUNK_SIZE = 500
+CSV_TYPES = ('text/csv',)
+NDJSON_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-lines')
+
+NAME_REGEX = re.compile(r"(.*\S.*)")
+
+
+class UnreadableUpload(Exception):
+    """Raised when the rest of an upload, from row on, cannot be read"""
+
+    def __init__(self, row, error):
+        super().__init__(
+            'kindly upload the meals as valid UTF-8 CSV or NDJSON, '
+            'row {} and the rows after it could not be read ({})'.format(row, error))
+        self.row = row
+
+
+def read_csv(stream):
+    """Yields (row number, record) for each row of a CSV upload with a header row"""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    number = 0
+    try:
+        for number, record in enumerate(csv.DictReader(text), start=1):
+            yield number, record
+    except (UnicodeDecodeError, csv.Error) as error:
+        raise UnreadableUpload(number + 1, error)
+
+
+def read_ndjson(stream):
+    """Yields (row number, record) for each line of an NDJSON upload, None when a line is not JSON"""
+    text = io.TextIOWrapper(stream, encoding='utf-8')
+    number = 0
+    try:
+        for line in text:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield number, record
+    except UnicodeDecodeError as error:
+        raise UnreadableUpload(number + 1, error)
+
+
+def reader_for(mimetype):
+    """Returns the reader for an upload content type or None when it is not supported"""
+    if mimetype in CSV_TYPES:
+        return read_csv
+    if mimetype in NDJSON_TYPES:
+        return read_ndjson
+    return None
+
+
+def _validate(record):
+    """Returns the meal described by a record, raises ValueError with a message otherwise"""
+    if not isinstance(record, dict):
+        raise ValueError('kindly provide each meal as a JSON object')
+
+    name = record.get('name')
+    if not isinstance(name, str) or not NAME_REGEX.match(name):
+        raise ValueError('kindly provide a valid name')
+
+    price = record.get('price')
+    try:
+        if isinstance(price, bool):
+            raise ValueError
+        price = int(price)
+    except (TypeError, ValueError):
+        raise ValueError('kindly provide a price(should be a valid number)')
+
+    in_menu = record.get('in_menu')
+    if in_menu in (None, ''):
+        in_menu = False
+    elif not isinstance(in_menu, bool):
+        try:
+            in_menu = inputs.boolean(str(in_menu))
+        except ValueError:
+            raise ValueError('kindly provide a valid boolean value')
+
+    return {'name' : name, 'price' : price, 'in_menu' : in_menu}
+
+
+def import_meals(records, chunk_size=IMPORT_CHUNK_SIZE):
+    """Creates or updates (by name) the meals in records, a stream of (row number, record).
+
+    Returns a report with the number of meals created and updated, the errors per row and
+    whether the whole upload could be read.
+    """
+    report = {'created' : 0, 'updated' : 0, 'errors' : [], 'complete' : True}
+    seen = set()
+    chunk = []
+
+    def flush():
+        """write the pending chunk"""
+        created, updated = models.Meal.upsert_many(chunk)
+        report['created'] += created
+        report['updated'] += updated
+        del chunk[:]
+
+    try:
+        for number, record in records:
+            try:
+                meal = _validate(record)
+            except ValueError as error:
+                report['errors'].append({'row' : number, 'message' : str(error)})
+                continue
+
+            if meal['name'] in seen:
+                report['errors'].append({'row' : number, 'message' : 'meal with that name appears more than once'})
+                continue
+
+            seen.add(meal['name'])
+            chunk.append(meal)
+            if len(chunk) >= chunk_size:
+                flush()
+    except UnreadableUpload as error:
+        report['errors'].append({'row' : error.row, 'message' : str(error)})
+        report['complete'] = False
+
+    if chunk:
+        flush()
+
+    if report['created'] or report['updated']:
+        invalidate_menu()
+
+    return report
@@ -9,6 +9,23 @@ class Config(object):
     TESTING = False
     SQLALCHEMY_TRACK_MODIFICATIONS = True
     SECRET_KEY = getenv('SECRET_KEY')
+    SQLALCHEMY_POOL_PRE_PING = True # replace connections closed by a failover before using them
+    SQLALCHEMY_NULL_POOL = False # True when an external pooler like PgBouncer does the pooling
+    SQLALCHEMY_STATEMENT_TIMEOUT = None # milliseconds, None to let statements run forever
+    SQLALCHEMY_BINDS = None # {'replica': URI} sends the reads of GET requests to a replica
+    READ_YOUR_WRITES_WINDOW = 5 # seconds a user who wrote reads from the primary again
+    MENU_CACHE_TTL = 30 # seconds a cached menu may be served before it is rebuilt
+    JSON_BACKEND = 'auto' # 'orjson', 'stdlib' or 'auto' to use orjson when it is installed
+    JSON_COMPACT = True
+    ORDER_BATCH_LIMIT = 100 # most orders accepted by one call to /orders/batch
+    IDEMPOTENCY_STORE = 'memory' # or 'database' to share Idempotency-Keys between workers
+    IDEMPOTENCY_TTL = 86400 # seconds a response is replayed for a retried Idempotency-Key
+    IDEMPOTENCY_MAX_KEYS = 10000 # keys kept per process by the memory store
+    ORDER_INTAKE = False # True to commit new orders in batches from a background writer
+    ORDER_INTAKE_BATCH = 100 # most orders written by one INSERT and commit
+    ORDER_INTAKE_DELAY = 0.005 # seconds the writer waits for more orders before writing
+    ORDER_INTAKE_TIMEOUT = 10 # seconds a request waits for its order to be written
+    METRICS = True # count requests and serve them at /metrics
 
 
 class TestingConfig(Config):
@@ -22,8 +39,16 @@ class DevelopmentConfig(Config):
     """Contains config variables required during development"""
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = getenv('DEVELOPMENT_DATABASE_URI')
+    SQLALCHEMY_BINDS = {'replica' : getenv('DEVELOPMENT_REPLICA_URI')} if getenv('DEVELOPMENT_REPLICA_URI') else None
 
 
 class ProductionConfig(Config):
     """Contains config variables for use during production"""
     SQLALCHEMY_DATABASE_URI = getenv('PRODUCTION_DATABASE_URI')
+    SQLALCHEMY_BINDS = {'replica' : getenv('PRODUCTION_REPLICA_URI')} if getenv('PRODUCTION_REPLICA_URI') else None
+    SQLALCHEMY_POOL_SIZE = 10
+    SQLALCHEMY_MAX_OVERFLOW = 20
+    SQLALCHEMY_POOL_TIMEOUT = 10 # seconds to wait for a connection before failing the request
+    SQLALCHEMY_POOL_RECYCLE = 1800 # seconds before a connection is replaced
+    SQLALCHEMY_NULL_POOL = getenv('DATABASE_NULL_POOL') == '1'
+    SQLALCHEMY_STATEMENT_TIMEOUT = 30000
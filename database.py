@@ -0,0 +1,295 @@
+"""Contains the Flask-SQLAlchemy extension with configurable connection pools.
+
+On top of the pool options Flask-SQLAlchemy reads (SQLALCHEMY_POOL_SIZE,
+SQLALCHEMY_MAX_OVERFLOW, SQLALCHEMY_POOL_TIMEOUT and SQLALCHEMY_POOL_RECYCLE) every
+configuration class may set:
+
+SQLALCHEMY_POOL_PRE_PING       test connections on checkout, replacing the ones a failover
+                               or an idle timeout closed
+SQLALCHEMY_NULL_POOL           open a connection per checkout, for use behind an external
+                               pooler such as PgBouncer
+SQLALCHEMY_STATEMENT_TIMEOUT   milliseconds a statement may run before the database cancels
+                               it, set on every new connection (Postgres and MySQL)
+
+SQLite connections are opened with foreign keys enforced, like the other databases.
+
+Pools count their checkouts and the time spent waiting for a connection, see pool_stats().
+
+When SQLALCHEMY_BINDS has a 'replica' database, the reads of GET requests are sent to it
+and everything else to the primary, see ReplicaRouter.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import flask_sqlalchemy
+from flask import g, has_request_context, request
+from sqlalchemy import exc, orm
+from sqlalchemy.pool import QueuePool, NullPool
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA = 'replica'
+
+# statement run on each new connection to apply SQLALCHEMY_STATEMENT_TIMEOUT
+_STATEMENT_TIMEOUTS = {
+    'postgresql': 'SET statement_timeout = {:d}',
+    'mysql': 'SET SESSION max_execution_time = {:d}',
+}
+
+
+class PoolStats(object):
+    """Counts the checkouts of a pool and the time callers waited for them"""
+
+
+    def __init__(self):
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def checked_out(self, waited):
+        """Records a checkout that took waited seconds"""
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_time += waited
+            if waited > self.max_wait:
+                self.max_wait = waited
+
+    def connected(self):
+        """Records a new connection opened by the pool"""
+        with self._lock:
+            self.connects += 1
+
+    def timed_out(self):
+        """Records a checkout that gave up waiting for a connection"""
+        with self._lock:
+            self.timeouts += 1
+
+    def checked_in(self):
+        """Records a connection given back to the pool"""
+        with self._lock:
+            self.in_use -= 1
+
+    def as_dict(self):
+        """Returns the counters, with times in milliseconds"""
+        return {'checkouts' : self.checkouts,
+                'connects' : self.connects,
+                'timeouts' : self.timeouts,
+                'in_use' : self.in_use,
+                'wait_time_ms' : round(self.wait_time * 1000, 3),
+                'avg_wait_ms' : round(self.wait_time * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'max_wait_ms' : round(self.max_wait * 1000, 3)}
+
+
+class InstrumentedPool(object):
+    """Mixin that keeps PoolStats for a SQLAlchemy pool class"""
+
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timed_out()
+            raise
+        self.stats.checked_out(time.perf_counter() - start)
+        return connection
+
+    def _do_return_conn(self, conn):
+        self.stats.checked_in()
+        super()._do_return_conn(conn)
+
+    def _create_connection(self):
+        self.stats.connected()
+        return super()._create_connection()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPool, QueuePool):
+    """QueuePool that keeps PoolStats"""
+
+
+class InstrumentedNullPool(InstrumentedPool, NullPool):
+    """NullPool that keeps PoolStats"""
+
+
+def _run_on_connect(statement):
+    """Returns a pool connect listener that runs statement on every new connection"""
+
+    def on_connect(dbapi_connection, connection_record): # pylint: disable=W0613
+        """configure the connection"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute(statement)
+        cursor.close()
+
+    return on_connect
+
+
+class ReplicaRouter(object):
+    """Decides which requests may read from the replica.
+
+    Reads of GET and HEAD requests go to the replica, unless the caller wrote to the
+    primary in the last READ_YOUR_WRITES_WINDOW seconds, so users see their own changes
+    while the replica catches up, or the reads are made within primary(). Recent writers
+    are remembered per process.
+    """
+
+
+    def __init__(self, app=None, max_size=10000):
+        self.window = 5
+        self.max_size = max_size
+        self._writers = OrderedDict()
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Attaches the router to an app"""
+        self.window = app.config.get('READ_YOUR_WRITES_WINDOW', self.window)
+        app.extensions['replica_router'] = self
+
+    def reads_from_replica(self):
+        """Returns whether the reads of the current request may use the replica"""
+        if not has_request_context() or request.method not in ('GET', 'HEAD'):
+            return False
+
+        if g.get('read_primary'):
+            return False
+
+        identity = g.get('identity')
+        if identity is not None and self._writers.get(identity.id, 0) > time.time():
+            return False
+
+        return True
+
+    @contextmanager
+    def primary(self):
+        """Sends the reads of the current request to the primary within the block, for
+        results shared with other callers, like the cached menu, that must not lag"""
+        if not has_request_context():
+            yield
+            return
+
+        previous = g.get('read_primary', False)
+        g.read_primary = True
+        try:
+            yield
+        finally:
+            g.read_primary = previous
+
+    def wrote(self):
+        """Sends the next reads of the current caller to the primary for a while"""
+        identity = g.get('identity') if has_request_context() else None
+        if identity is None:
+            return
+
+        with self._lock:
+            self._writers.pop(identity.id, None)
+            self._writers[identity.id] = time.time() + self.window
+            if len(self._writers) > self.max_size:
+                self._writers.popitem(last=False)
+
+    def clear(self):
+        """Forgets all recent writers"""
+        with self._lock:
+            self._writers.clear()
+
+
+class RoutingSession(flask_sqlalchemy.SignallingSession):
+    """Session that sends the reads of GET requests to the replica bind, when there is one.
+
+    Flushes and INSERT, UPDATE and DELETE statements always go to the primary, and so
+    does every later statement of a session that wrote.
+    """
+
+
+    def __init__(self, db, **options):
+        super().__init__(db, **options)
+        self._db = db
+        self._wrote = False
+
+    def get_bind(self, mapper=None, clause=None):
+        router = self.app.extensions.get('replica_router')
+
+        if router is not None and REPLICA in (self.app.config['SQLALCHEMY_BINDS'] or ()):
+            if self._flushing or isinstance(clause, UpdateBase):
+                self._wrote = True
+                router.wrote()
+            elif not self._wrote and router.reads_from_replica():
+                return self._db.get_engine(self.app, bind=REPLICA)
+
+        return super().get_bind(mapper, clause)
+
+
+class SQLAlchemy(flask_sqlalchemy.SQLAlchemy):
+    """Flask-SQLAlchemy with the extra pool options and replica routing of this module"""
+
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_pool_defaults(self, app, options):
+        super().apply_pool_defaults(app, options)
+        if app.config.get('SQLALCHEMY_POOL_PRE_PING'):
+            options['pool_pre_ping'] = True
+
+    def apply_driver_hacks(self, app, info, options):
+        super().apply_driver_hacks(app, info, options)
+        backend = info.drivername.split('+')[0]
+
+        if app.config.get('SQLALCHEMY_NULL_POOL'):
+            options['poolclass'] = NullPool
+            for key in ('pool_size', 'max_overflow', 'pool_timeout'):
+                options.pop(key, None)
+
+        poolclass = options.get('poolclass')
+        if poolclass is NullPool:
+            options['poolclass'] = InstrumentedNullPool
+        elif poolclass is None:
+            options['poolclass'] = InstrumentedQueuePool
+            if backend == 'sqlite':
+                # pooled SQLite connections are handed between threads
+                options.setdefault('connect_args', {})['check_same_thread'] = False
+
+        timeout = app.config.get('SQLALCHEMY_STATEMENT_TIMEOUT')
+        if timeout and backend in _STATEMENT_TIMEOUTS:
+            statement = _STATEMENT_TIMEOUTS[backend].format(int(timeout))
+            options.setdefault('pool_events', []).append((_run_on_connect(statement), 'connect'))
+
+        if backend == 'sqlite':
+            # SQLite ignores foreign keys unless asked, and with them ON DELETE CASCADE
+            options.setdefault('pool_events', []).append(
+                (_run_on_connect('PRAGMA foreign_keys = ON'), 'connect'))
+
+
+def pool_stats(db, app=None):
+    """Returns the live statistics of the pool of every configured database"""
+    app = db.get_app(app)
+    binds = [None] + list(app.config.get('SQLALCHEMY_BINDS') or ())
+    pools = {}
+
+    for bind in binds:
+        pool = db.get_engine(app, bind).pool
+        info = {'class' : type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            info.update(size=pool.size(), checked_in=pool.checkedin(),
+                        checked_out=pool.checkedout(), overflow=pool.overflow())
+        if isinstance(pool, InstrumentedPool):
+            info.update(pool.stats.as_dict())
+        pools[bind or 'default'] = info
+
+    return pools
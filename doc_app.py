@@ -111,6 +111,15 @@ def get_all_users():
         in: header
         type: string
         required: true
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 50
+      - name: cursor
+        in: query
+        type: string
+        required: false
     """
 
 @app.route("/api/v3/users/<int:user_id>", methods=["GET"])
@@ -128,6 +137,30 @@ def get_one_user():
         required: true
     """
 
+@app.route("/api/v3/users/<int:user_id>/orders", methods=["GET"])
+def get_user_orders():
+    """endpoint for  getting a page of the orders of a particular user, newest first.
+    ---
+    parameters:
+      - name: x-access-token
+        in: header
+        type: string
+        required: true
+      - name: user_id
+        in: path
+        type: integer
+        required: true
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 50
+      - name: cursor
+        in: query
+        type: string
+        required: false
+    """
+
 @app.route('/api/v3/users/<int:user_id>', methods=["PUT"])
 def update_user():
     """ endpoint for updating an existing user.
@@ -200,6 +233,27 @@ def create_meal():
         default: false
     """
 
+@app.route('/api/v3/meals/import', methods=["POST"])
+def import_meals():
+    """ endpoint for creating or updating meals in bulk.
+    Send the meals as the request body, either as text/csv with a name,price,in_menu
+    header row or as application/x-ndjson with one meal object per line.
+    ---
+    consumes:
+      - text/csv
+      - application/x-ndjson
+    parameters:
+      - name: x-access-token
+        in: header
+        type: string
+        required: true
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: string
+    """
+
 @app.route("/api/v3/meals", methods=["GET"])
 def get_all_meals():
     """endpoint for getting all meals.
@@ -209,6 +263,15 @@ def get_all_meals():
         in: header
         type: string
         required: true
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 50
+      - name: cursor
+        in: query
+        type: string
+        required: false
     """
 
 @app.route("/api/v3/meals/<int:meal_id>", methods=["GET"])
@@ -235,6 +298,11 @@ def update_meal():
         in: header
         type: string
         required: true
+      - name: If-Match
+        in: header
+        type: string
+        required: false
+        description: the ETag of the version being changed, a 412 is returned if it changed since
       - name: meal_id
         in: path
         type: integer
@@ -286,6 +354,27 @@ def create_menu():
         required: true
     """
 
+@app.route('/api/v3/menu', methods=["PUT"])
+def replace_menu():
+    """ endpoint for replacing the whole menu at once, an empty list clears it.
+    ---
+    parameters:
+      - name: x-access-token
+        in: header
+        type: string
+        required: true
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            meal_ids:
+              type: array
+              items:
+                type: integer
+    """
+
 @app.route("/api/v3/menu", methods=["GET"])
 def get_all_menu():
     """endpoint for  getting all menu options.
@@ -338,12 +427,63 @@ def create_order():
         in: header
         type: string
         required: true
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: retries with the same key get the first response back
       - name: meal_id
         in: formData
         type: integer
         required: true
     """
 
+@app.route('/api/v3/orders/queued/<ticket>', methods=["GET"])
+def get_queued_order():
+    """ endpoint for following an order accepted with a 202 and a ticket.
+    ---
+    parameters:
+      - name: x-access-token
+        in: header
+        type: string
+        required: true
+      - name: ticket
+        in: path
+        type: string
+        required: true
+    """
+
+@app.route('/api/v3/orders/batch', methods=["POST"])
+def create_orders():
+    """ endpoint for placing several orders in one call.
+    ---
+    parameters:
+      - name: x-access-token
+        in: header
+        type: string
+        required: true
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: retries with the same key get the first response back
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            meal_ids:
+              type: array
+              items:
+                type: integer
+            user_ids:
+              type: array
+              description: admins only, the user each order is placed for
+              items:
+                type: integer
+    """
+
 @app.route("/api/v3/orders", methods=["GET"])
 def get_all_orders():
     """endpoint for  getting all orders.
@@ -353,6 +493,20 @@ def get_all_orders():
         in: header
         type: string
         required: true
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 50
+      - name: cursor
+        in: query
+        type: string
+        required: false
+      - name: stream
+        in: query
+        type: boolean
+        required: false
+        default: false
     """
 
 @app.route("/api/v3/orders/<int:order_id>", methods=["GET"])
@@ -379,6 +533,16 @@ def update_order():
         in: header
         type: string
         required: true
+      - name: If-Match
+        in: header
+        type: string
+        required: false
+        description: the ETag of the version being changed, a 412 is returned if it changed since
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: retries with the same key get the first response back
       - name: order_id
         in: path
         type: integer
@@ -404,6 +568,131 @@ def delete_order():
         required: true
     """
 
+@app.route("/api/v3/admin/pool", methods=["GET"])
+def get_pool_stats():
+    """ endpoint for getting the database connection pool statistics.
+    ---
+    parameters:
+      - name: x-access-token
+        in: header
+        type: string
+        required: true
+    """
+
+@app.route("/api/v3/reports/daily", methods=["GET"])
+def get_daily_report():
+    """ endpoint for getting the orders and revenue per day and meal.
+    ---
+    parameters:
+      - name: x-access-token
+        in: header
+        type: string
+        required: true
+      - name: from
+        in: query
+        type: string
+        format: date
+        required: false
+      - name: to
+        in: query
+        type: string
+        format: date
+        required: false
+    """
+
+@app.route("/api/v3/orders/export.csv", methods=["GET"])
+def export_orders():
+    """ endpoint for downloading the orders placed between two dates as CSV.
+    ---
+    produces:
+      - text/csv
+    parameters:
+      - name: x-access-token
+        in: header
+        type: string
+        required: true
+      - name: from
+        in: query
+        type: string
+        format: date
+        required: false
+      - name: to
+        in: query
+        type: string
+        format: date
+        required: false
+    """
+
+@app.route("/api/v3/meals/<int:meal_id>/stock", methods=["PUT"])
+def set_meal_stock(meal_id):
+    """ endpoint for setting the portions of a meal left to sell.
+    ---
+    parameters:
+      - name: x-access-token
+        in: header
+        type: string
+        required: true
+      - name: meal_id
+        in: path
+        type: integer
+        required: true
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            stock:
+              type: integer
+              description: null for a meal that never sells out
+    """
+
+@app.route("/api/v3/admin/orders", methods=["DELETE"])
+def bulk_delete_orders():
+    """ endpoint for deleting the orders placed between two dates and/or by a user.
+    ---
+    parameters:
+      - name: x-access-token
+        in: header
+        type: string
+        required: true
+      - name: from
+        in: query
+        type: string
+        format: date
+        required: false
+      - name: to
+        in: query
+        type: string
+        format: date
+        required: false
+      - name: user_id
+        in: query
+        type: integer
+        required: false
+    """
+
+@app.route("/api/v3/admin/meals", methods=["DELETE"])
+def bulk_delete_meals():
+    """ endpoint for deleting several meals at once.
+    ---
+    parameters:
+      - name: x-access-token
+        in: header
+        type: string
+        required: true
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            meal_ids:
+              type: array
+              items:
+                type: integer
+    """
+
 @app.route('/')
 def hello_world():
     "test that flask app is running"
@@ -0,0 +1,226 @@
+"""Contains the Idempotency-Key support of the order endpoints.
+
+A client that retries a request with the same Idempotency-Key header gets the response
+stored for the first attempt instead of placing the order again. Keys are scoped to the
+authenticated user, expire after IDEMPOTENCY_TTL seconds and must be reused with the same
+request body. IDEMPOTENCY_STORE picks where responses are kept: 'memory' keeps at most
+IDEMPOTENCY_MAX_KEYS per process, 'database' keeps them in the idempotency_key table so
+every worker process sees them.
+"""
+import datetime
+import hashlib
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from functools import wraps
+
+from flask import current_app, request, make_response
+from sqlalchemy.exc import IntegrityError
+
+import models
+from json_backend import jsonify
+from resources.auth import current_identity
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# status is None while the first request with the key is still being handled
+Stored = namedtuple('Stored', ['fingerprint', 'status', 'mimetype', 'body', 'expires'])
+
+
+class MemoryStore(object):
+    """Keeps stored responses in this process, evicting the oldest when full"""
+
+
+    def __init__(self, ttl=86400, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, scope, key, fingerprint):
+        """Claims a key for a new request. Returns None when claimed, else what is stored"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is not None and entry.expires > now:
+                return entry
+
+            if len(self._entries) >= self.max_size:
+                self._evict(now)
+            self._entries[(scope, key)] = Stored(fingerprint, None, None, None, now + self.ttl)
+
+        return None
+
+    def complete(self, scope, key, status, mimetype, body):
+        """Stores the response of the request that claimed a key"""
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is not None:
+                self._entries[(scope, key)] = entry._replace(status=status, mimetype=mimetype, body=body)
+
+    def release(self, scope, key):
+        """Forgets a key whose request produced no response worth replaying"""
+        with self._lock:
+            self._entries.pop((scope, key), None)
+
+    def _evict(self, now):
+        """Drops expired entries and, if still full, the oldest one. Caller holds the lock"""
+        expired = [item for item, entry in self._entries.items() if entry.expires <= now]
+        for item in expired:
+            del self._entries[item]
+
+        if len(self._entries) >= self.max_size:
+            self._entries.popitem(last=False)
+
+
+class DatabaseStore(object):
+    """Keeps stored responses in the idempotency_key table, shared by all workers"""
+
+
+    def __init__(self, ttl=86400, purge_every=1000, attempts=3):
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self.attempts = attempts
+        self._reservations = 0
+
+    def reserve(self, scope, key, fingerprint):
+        """Claims a key for a new request. Returns None when claimed, else what is stored"""
+        session = models.db.session
+        now = datetime.datetime.utcnow()
+        expires = now + datetime.timedelta(seconds=self.ttl)
+
+        self._reservations += 1
+        if self._reservations % self.purge_every == 0:
+            models.IdempotencyKey.query.filter(
+                models.IdempotencyKey.expires_at <= now).delete(synchronize_session=False)
+
+        for _ in range(self.attempts):
+            # the primary key makes the INSERT fail for a key another request already claimed
+            try:
+                session.add(models.IdempotencyKey(
+                    user_id=scope, key=key, fingerprint=fingerprint, expires_at=expires))
+                session.commit()
+                return None
+            except IntegrityError:
+                session.rollback()
+
+            entry = models.IdempotencyKey.query.get((scope, key))
+            if entry is None:
+                # purged since the INSERT failed, try it again
+                continue
+
+            if entry.expires_at <= now:
+                # reuse an expired key, unless someone else just did
+                claimed = models.IdempotencyKey.query.filter_by(
+                    user_id=scope, key=key, expires_at=entry.expires_at).update({
+                        'fingerprint' : fingerprint, 'status' : None, 'mimetype' : None,
+                        'body' : None, 'expires_at' : expires}, synchronize_session=False)
+                session.commit()
+                if claimed:
+                    return None
+                continue
+
+            stored = Stored(entry.fingerprint, entry.status, entry.mimetype, entry.body, entry.expires_at)
+            session.commit()
+            return stored
+
+        # other requests keep claiming the key, answer as if it were still being processed
+        return Stored(fingerprint, None, None, None, expires)
+
+    def complete(self, scope, key, status, mimetype, body):
+        """Stores the response of the request that claimed a key"""
+        models.IdempotencyKey.query.filter_by(user_id=scope, key=key).update({
+            'status' : status, 'mimetype' : mimetype, 'body' : body}, synchronize_session=False)
+        models.db.session.commit()
+
+    def release(self, scope, key):
+        """Forgets a key whose request produced no response worth replaying"""
+        models.db.session.rollback()
+        models.IdempotencyKey.query.filter_by(user_id=scope, key=key).delete(
+            synchronize_session=False)
+        models.db.session.commit()
+
+
+def create_store(name='memory', ttl=86400, max_size=10000):
+    """Returns the store called name"""
+    if name == 'memory':
+        return MemoryStore(ttl=ttl, max_size=max_size)
+
+    if name == 'database':
+        return DatabaseStore(ttl=ttl)
+
+    raise ValueError('unknown IDEMPOTENCY_STORE {!r}'.format(name))
+
+
+def init_app(app):
+    """Attaches the configured store to an app"""
+    app.extensions['idempotency'] = create_store(
+        name=app.config.get('IDEMPOTENCY_STORE', 'memory'),
+        ttl=app.config.get('IDEMPOTENCY_TTL', 86400),
+        max_size=app.config.get('IDEMPOTENCY_MAX_KEYS', 10000))
+
+
+def fingerprint():
+    """Identifies the request a key was first used with"""
+    digest = hashlib.sha1(request.method.encode('UTF-8'))
+    digest.update(request.path.encode('UTF-8'))
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def replay(stored):
+    """Rebuilds the stored response of an earlier request"""
+    response = current_app.response_class(stored.body, status=stored.status, mimetype=stored.mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(f):
+    """Replays the stored response when a request is retried with the same Idempotency-Key.
+    Must be applied below token_required so the key can be scoped to the caller"""
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        """look up the key before handling the request"""
+        key = request.headers.get(HEADER)
+
+        if key is None:
+            return f(*args, **kwargs)
+
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return make_response(jsonify({
+                "message" : "kindly provide an Idempotency-Key of at most {} characters".format(
+                    MAX_KEY_LENGTH)}), 400)
+
+        store = current_app.extensions['idempotency']
+        scope = current_identity().id
+        request_fingerprint = fingerprint()
+        stored = store.reserve(scope, key, request_fingerprint)
+
+        if stored is not None:
+            if stored.fingerprint != request_fingerprint:
+                return make_response(jsonify({
+                    "message" : "this Idempotency-Key was already used with a different request"}), 422)
+            if stored.status is None:
+                return make_response(jsonify({
+                    "message" : "a request with this Idempotency-Key is still being processed"}), 409)
+            return replay(stored)
+
+        try:
+            response = f(*args, **kwargs)
+        except BaseException:
+            store.release(scope, key)
+            raise
+
+        # server errors may succeed on retry, so they are not replayed
+        if not isinstance(response, current_app.response_class) or response.is_streamed \
+                or response.status_code >= 500:
+            store.release(scope, key)
+            return response
+
+        store.complete(scope, key, response.status_code, response.mimetype, response.get_data())
+        return response
+
+    return decorated
@@ -0,0 +1,196 @@
+"""Contains the write-behind intake of new orders.
+
+With ORDER_INTAKE enabled, POST /orders validates the order as usual and hands the row to
+a background writer instead of committing it itself. The writer waits up to
+ORDER_INTAKE_DELAY seconds for more orders to arrive, then inserts up to
+ORDER_INTAKE_BATCH rows with one multi-row INSERT and one commit, so a burst of orders
+costs one commit (and one fsync) per batch rather than one per order. The stock of meals
+that have one is taken in the same transaction. Each request waits on a future for the id
+of its order. Queued orders are written before the process exits.
+
+A request that stops waiting after ORDER_INTAKE_TIMEOUT answers 202 with a ticket. The
+outcome of its order can be read with the ticket from the same process. Orders that cannot
+be written, or sell out after their 202, are logged.
+"""
+import atexit
+import queue
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from flask import current_app
+
+import models
+
+_intakes = weakref.WeakSet()
+
+
+class OrderIntake(object):
+    """Queues order rows and writes them in batches from a background thread"""
+
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.batch_size = 100
+        self.delay = 0.005
+        self.timeout = 10
+        self.max_tickets = 10000
+        self.batches = 0
+        self.written = 0
+        self._app = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._closed = False
+        self._tickets = OrderedDict()
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Attaches the intake to an app"""
+        self.enabled = app.config.get('ORDER_INTAKE', self.enabled)
+        self.batch_size = app.config.get('ORDER_INTAKE_BATCH', self.batch_size)
+        self.delay = app.config.get('ORDER_INTAKE_DELAY', self.delay)
+        self.timeout = app.config.get('ORDER_INTAKE_TIMEOUT', self.timeout)
+        self._app = app
+        app.extensions['order_intake'] = self
+        _intakes.add(self)
+
+    def submit(self, row):
+        """Queues an order row, returns a future for the row with its id and created_at set"""
+        future = Future()
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('the order intake has been closed')
+            if self._thread is None or not self._thread.is_alive():
+                # first order, or the writer died, start one
+                self._thread = threading.Thread(target=self._run, name='order-intake', daemon=True)
+                self._thread.start()
+            self._queue.put((row, future))
+
+        return future
+
+    def track(self, row, future):
+        """Keeps the outcome of an order its request stopped waiting for, returns its ticket"""
+        ticket = uuid.uuid4().hex
+
+        with self._lock:
+            self._tickets[ticket] = (row, future)
+            if len(self._tickets) > self.max_tickets:
+                self._tickets.popitem(last=False)
+
+        future.add_done_callback(lambda done: self._abandoned(row, done))
+        return ticket
+
+    def tracked(self, ticket):
+        """Returns the (row, future) of a ticket, None when it is unknown or was forgotten"""
+        return self._tickets.get(ticket)
+
+    def _abandoned(self, row, future):
+        """log an order that sold out after its request was answered, _write logs the rest"""
+        if isinstance(future.exception(), models.SoldOut):
+            self._app.logger.warning(
+                'order of meal %s by user %s was accepted but the meal sold out',
+                row["meal_id"], row["user_id"])
+
+    def close(self, timeout=None):
+        """Writes every queued order and stops the writer"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _run(self):
+        """Writes batches until closed and the queue is empty"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            closing = False
+            deadline = time.perf_counter() + self.delay
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            if closing:
+                break
+
+        # orders queued after close() was called, if any
+        while not self._queue.empty():
+            item = self._queue.get()
+            if item is not None:
+                self._write([item])
+
+    def _write(self, batch):
+        """Inserts a batch with one commit, one at a time if the batch fails. Fails the
+        futures of the batch rather than the writer when even that raises"""
+        try:
+            with self._app.app_context():
+                try:
+                    self._insert(batch)
+                except Exception: # pylint: disable=W0703
+                    models.db.session.rollback()
+                    # keep one bad row, like a deleted user, from failing the others
+                    for item in batch:
+                        try:
+                            self._insert([item])
+                        except Exception as error: # pylint: disable=W0703
+                            models.db.session.rollback()
+                            self._app.logger.error(
+                                'order of meal %s by user %s could not be written: %r',
+                                item[0]["meal_id"], item[0]["user_id"], error)
+                            item[1].set_exception(error)
+        except Exception as error: # pylint: disable=W0703
+            self._app.logger.exception('a batch of %s orders could not be written', len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+
+    def _insert(self, batch):
+        """Inserts the rows of batch, commits and resolves their futures"""
+        pending = [(row, future) for row, future in batch if not future.done()]
+        sold_out = {id(row) for row in models.Order.take_stock_for([row for row, _ in pending])}
+        rows = models.Order.insert_many([row for row, _ in pending if id(row) not in sold_out])
+        models.db.session.commit()
+        self.batches += 1
+        self.written += len(rows)
+
+        for row, future in pending:
+            if id(row) in sold_out:
+                future.set_exception(models.SoldOut(row["meal_id"]))
+            else:
+                future.set_result(row)
+
+    def stats(self):
+        """Returns the number of batches and orders written and the queue length"""
+        return {'batches' : self.batches, 'written' : self.written, 'queued' : self._queue.qsize()}
+
+
+def order_intake():
+    """Returns the order intake of the current app when it is enabled, None otherwise"""
+    intake = current_app.extensions.get('order_intake')
+    return intake if intake is not None and intake.enabled else None
+
+
+@atexit.register
+def _drain():
+    """Writes the queued orders of every intake before the process exits"""
+    for intake in list(_intakes):
+        intake.close()
@@ -0,0 +1,105 @@
+"""Contains the JSON encoding used for every API response.
+
+The backend is picked per configuration class through JSON_BACKEND:
+'orjson' uses orjson, 'stdlib' uses the json module and 'auto' uses orjson when it is
+installed and falls back to the json module otherwise. JSON_COMPACT drops the
+indentation and spaces Flask adds by default. Dates keep the HTTP date format Flask's
+encoder produces so clients see the same values whichever backend is in use.
+"""
+import datetime
+import json
+
+from flask import current_app
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError: # optional, the json module is used instead
+    orjson = None
+
+
+def _default(value):
+    """Encodes the values the json module does not know about, like flask.json.JSONEncoder"""
+    if isinstance(value, datetime.date):
+        return http_date(value.timetuple())
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+class StdlibBackend(object):
+    """Encodes with the json module"""
+
+    name = 'stdlib'
+
+    def __init__(self, compact=True, sort_keys=True):
+        self.options = {'default' : _default, 'sort_keys' : sort_keys}
+        if compact:
+            self.options['separators'] = (',', ':')
+        else:
+            self.options.update(indent=2, separators=(', ', ': '))
+
+    def dumps(self, data):
+        """Returns data encoded as JSON bytes"""
+        return json.dumps(data, **self.options).encode('UTF-8')
+
+
+class OrjsonBackend(object):
+    """Encodes with orjson"""
+
+    name = 'orjson'
+
+    def __init__(self, compact=True, sort_keys=True):
+        # passthrough hands datetimes to _default so they keep the HTTP date format
+        self.option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            self.option |= orjson.OPT_SORT_KEYS
+        if not compact:
+            self.option |= orjson.OPT_INDENT_2
+
+    def dumps(self, data):
+        """Returns data encoded as JSON bytes"""
+        return orjson.dumps(data, default=_default, option=self.option)
+
+
+def create_backend(name='auto', compact=True, sort_keys=True):
+    """Returns the backend called name, 'auto' prefers orjson when it is installed"""
+    if name == 'auto':
+        name = 'stdlib' if orjson is None else 'orjson'
+
+    if name == 'orjson':
+        if orjson is None:
+            raise RuntimeError('JSON_BACKEND is orjson but orjson is not installed')
+        return OrjsonBackend(compact=compact, sort_keys=sort_keys)
+
+    if name == 'stdlib':
+        return StdlibBackend(compact=compact, sort_keys=sort_keys)
+
+    raise ValueError('unknown JSON_BACKEND {!r}'.format(name))
+
+
+def init_app(app):
+    """Attaches the configured backend to an app"""
+    app.extensions['json_backend'] = create_backend(
+        name=app.config.get('JSON_BACKEND', 'auto'),
+        compact=app.config.get('JSON_COMPACT', True),
+        sort_keys=app.config.get('JSON_SORT_KEYS', True))
+
+
+def dumps(data):
+    """Encodes data as JSON bytes with the backend of the current app"""
+    return current_app.extensions['json_backend'].dumps(data)
+
+
+def jsonify(*args, **kwargs):
+    """Drop-in replacement for flask.jsonify that uses the backend of the current app"""
+    if args and kwargs:
+        raise TypeError('jsonify() behavior undefined when passed both args and kwargs')
+    data = args[0] if len(args) == 1 else (list(args) if args else kwargs)
+    return current_app.response_class(dumps(data) + b'\n', mimetype=current_app.config['JSONIFY_MIMETYPE'])
+
+
+def output_json(data, code, headers=None):
+    """Flask-RESTful representation for application/json using the backend of the current app"""
+    response = current_app.response_class(dumps(data) + b'\n', status=code,
+                                          mimetype='application/json')
+    response.headers.extend(headers or {})
+    return response
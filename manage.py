@@ -1,4 +1,5 @@
 """Handles database migrations and handles superuser creation"""
+import datetime
 import re
 import sys
 
@@ -6,6 +7,7 @@ from flask_script import Manager, prompt, prompt_pass
 from flask_migrate import Migrate, MigrateCommand
 
 import models
+import catalogue
 from app import app
 
 migrate = Migrate(app, models.db)
@@ -46,6 +48,54 @@ def createsuperuser():
         admin=True)
 
 
+@manager.option('path', help='CSV (.csv) or NDJSON (.ndjson, .jsonl) file of meals')
+@manager.option('-c', '--chunk-size', dest='chunk_size', type=int, default=catalogue.IMPORT_CHUNK_SIZE,
+                help='meals written per transaction')
+def import_meals(path, chunk_size):
+    """Create or update meals in bulk from a CSV or NDJSON file with name, price and in_menu."""
+
+    if path.endswith('.csv'):
+        reader = catalogue.read_csv
+    elif path.endswith(('.ndjson', '.jsonl')):
+        reader = catalogue.read_ndjson
+    else:
+        sys.exit('\n kindly provide a .csv, .ndjson or .jsonl file')
+
+    with open(path, 'rb') as stream:
+        report = catalogue.import_meals(reader(stream), chunk_size=chunk_size)
+
+    for error in report['errors']:
+        print('row {}: {}'.format(error['row'], error['message']))
+    print('{} meals created, {} updated, {} rows failed'.format(
+        report['created'], report['updated'], len(report['errors'])))
+    if not report['complete']:
+        sys.exit(1)
+
+
+@manager.command
+def rebuild_daily_sales():
+    """Recompute the daily sales totals from the order table."""
+
+    written = models.DailySales.rebuild()
+    print('{} daily sales rows written'.format(written))
+
+
+@manager.option('-b', '--before', dest='before', required=True,
+                help='archive the orders placed before this date, like 2018-01-01')
+@manager.option('-s', '--batch-size', dest='batch_size', type=int, default=1000,
+                help='orders moved per transaction')
+def archive_orders(before, batch_size):
+    """Move old orders from the order table to the order archive."""
+
+    try:
+        before = datetime.datetime.strptime(before, '%Y-%m-%d')
+    except ValueError:
+        sys.exit('\n kindly provide the date as YYYY-MM-DD')
+
+    moved = models.Order.archive(before, batch_size=batch_size)
+    print('{} orders archived'.format(moved))
+
+
 if __name__ == '__main__':
     manager.run()
     models.db.create_all()
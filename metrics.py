@@ -0,0 +1,223 @@
+"""Contains the request metrics exposed at /metrics in the Prometheus text format.
+
+Every request is counted by endpoint (the resource endpoint name, like orders or login),
+method and status, and its latency is added to a histogram per endpoint. Each thread
+records into a shard of its own, so handling a request takes no lock; /metrics adds the
+shards up. The resident memory of the process and the statistics of the database pools
+are read when /metrics is requested. Set METRICS to False to turn it all off.
+"""
+import bisect
+import os
+import threading
+import time
+
+from flask import current_app, _request_ctx_stack
+
+import models
+from database import pool_stats
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# WSGI environ key holding the time a request started
+_STARTED = 'metrics.started'
+
+# upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# pool_stats() keys exported as gauges and counters, with their help text
+_POOL_GAUGES = (
+    ('size', 'Connections the pool keeps open.'),
+    ('checked_out', 'Connections in use.'),
+    ('checked_in', 'Idle connections in the pool.'),
+    ('overflow', 'Connections opened beyond the pool size.'),
+)
+_POOL_COUNTERS = (
+    ('checkouts', 'Connections handed out by the pool.'),
+    ('connects', 'Connections opened by the pool.'),
+    ('timeouts', 'Checkouts that gave up waiting for a connection.'),
+)
+
+
+class Shard(object):
+    """The counters of one thread"""
+
+    __slots__ = ('requests', 'latency')
+
+    def __init__(self):
+        # (endpoint, method, status) -> count
+        self.requests = {}
+        # endpoint -> [count per bucket..., count above the last bucket, sum of seconds]
+        self.latency = {}
+
+    def merge(self, other):
+        """Adds the counters of other to this shard"""
+        for key, count in dict(other.requests).items():
+            self.requests[key] = self.requests.get(key, 0) + count
+
+        for endpoint, histogram in dict(other.latency).items():
+            total = self.latency.setdefault(endpoint, [0] * len(histogram))
+            for index, value in enumerate(list(histogram)):
+                total[index] += value
+
+
+class Metrics(object):
+    """Records the requests of an app and renders them with the process and pool metrics"""
+
+
+    def __init__(self, app=None, buckets=BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = []
+        self._retired = Shard()
+        # only taken when a thread records its first request and when rendering
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Attaches the metrics to an app and serves them at /metrics"""
+        if not app.config.get('METRICS', True):
+            return
+
+        app.extensions['metrics'] = self
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._fail)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    # the hooks look the request up once, every access through the request proxy costs
+    # about as much as recording the request itself
+    def _start(self):
+        """note when the request started"""
+        _request_ctx_stack.top.request.environ[_STARTED] = time.perf_counter()
+
+    def _finish(self, response):
+        """record the request with its status"""
+        req = _request_ctx_stack.top.request
+        started = req.environ.pop(_STARTED, None)
+        if started is not None:
+            self.record(req.endpoint, req.method, response.status_code, time.perf_counter() - started)
+        return response
+
+    def _fail(self, error):
+        """record a request that raised, it got no response"""
+        if error is None:
+            return
+        req = _request_ctx_stack.top.request
+        started = req.environ.pop(_STARTED, None)
+        if started is not None:
+            self.record(req.endpoint, req.method, 500, time.perf_counter() - started)
+
+    def _shard(self):
+        """Returns the shard of the current thread"""
+        shard = Shard()
+        with self._lock:
+            self._shards.append((threading.current_thread(), shard))
+        self._local.shard = shard
+        return shard
+
+    def record(self, endpoint, method, status, seconds):
+        """Counts a request to endpoint that took seconds"""
+        shard = getattr(self._local, 'shard', None) or self._shard()
+        # blueprint endpoints are named like resources.meals.orders
+        endpoint = endpoint.rpartition('.')[2] if endpoint else 'unmatched'
+
+        key = (endpoint, method, status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+
+        histogram = shard.latency.get(endpoint)
+        if histogram is None:
+            histogram = shard.latency[endpoint] = [0] * (len(self.buckets) + 2)
+        histogram[bisect.bisect_left(self.buckets, seconds)] += 1
+        histogram[-1] += seconds
+
+    def collect(self):
+        """Returns the counters of every thread added up"""
+        total = Shard()
+
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    # the thread will not record again, keep its counters only once
+                    self._retired.merge(shard)
+            self._shards = live
+
+            total.merge(self._retired)
+            for _, shard in live:
+                total.merge(shard)
+
+        return total
+
+    def render(self, app=None):
+        """Returns every metric in the Prometheus text format"""
+        total = self.collect()
+        lines = [
+            '# HELP http_requests_total Requests handled, by endpoint, method and status.',
+            '# TYPE http_requests_total counter']
+        for (endpoint, method, status), count in sorted(total.requests.items()):
+            lines.append('http_requests_total{{endpoint="{}",method="{}",status="{}"}} {}'.format(
+                endpoint, method, status, count))
+
+        lines += [
+            '# HELP http_request_duration_seconds Time taken to handle requests, by endpoint.',
+            '# TYPE http_request_duration_seconds histogram']
+        for endpoint, histogram in sorted(total.latency.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), histogram):
+                cumulative += count
+                lines.append('http_request_duration_seconds_bucket{{endpoint="{}",le="{}"}} {}'.format(
+                    endpoint, bound, cumulative))
+            lines.append('http_request_duration_seconds_sum{{endpoint="{}"}} {!r}'.format(
+                endpoint, histogram[-1]))
+            lines.append('http_request_duration_seconds_count{{endpoint="{}"}} {}'.format(
+                endpoint, cumulative))
+
+        rss = resident_memory()
+        if rss is not None:
+            lines += ['# HELP process_resident_memory_bytes Resident memory size in bytes.',
+                      '# TYPE process_resident_memory_bytes gauge',
+                      'process_resident_memory_bytes {}'.format(rss)]
+
+        lines += _pool_lines(pool_stats(models.db, app))
+        return '\n'.join(lines) + '\n'
+
+    def view(self):
+        """Serves the metrics"""
+        return current_app.response_class(self.render(current_app), content_type=CONTENT_TYPE)
+
+
+def _pool_lines(pools):
+    """Renders the statistics of the database pools"""
+    lines = []
+
+    for name, help_text in _POOL_GAUGES:
+        lines += ['# HELP db_pool_{} {}'.format(name, help_text),
+                  '# TYPE db_pool_{} gauge'.format(name)]
+        lines += ['db_pool_{}{{database="{}"}} {}'.format(name, database, stats[name])
+                  for database, stats in sorted(pools.items()) if name in stats]
+
+    for name, help_text in _POOL_COUNTERS:
+        lines += ['# HELP db_pool_{}_total {}'.format(name, help_text),
+                  '# TYPE db_pool_{}_total counter'.format(name)]
+        lines += ['db_pool_{}_total{{database="{}"}} {}'.format(name, database, stats[name])
+                  for database, stats in sorted(pools.items()) if name in stats]
+
+    lines += ['# HELP db_pool_wait_seconds_total Time spent waiting for a connection.',
+              '# TYPE db_pool_wait_seconds_total counter']
+    lines += ['db_pool_wait_seconds_total{{database="{}"}} {!r}'.format(
+        database, stats['wait_time_ms'] / 1000) for database, stats in sorted(pools.items())
+              if 'wait_time_ms' in stats]
+    return lines
+
+
+def resident_memory():
+    """Returns the resident memory of this process in bytes, None where /proc is missing"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
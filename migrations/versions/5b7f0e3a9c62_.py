@@ -0,0 +1,37 @@
+"""add the order_archive table
+
+Revision ID: 5b7f0e3a9c62
+Revises: 9a4e2c7d5f18
+Create Date: 2026-10-18 15:32:10.847113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7f0e3a9c62'
+down_revision = '9a4e2c7d5f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('order_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('meal_id', sa.Integer(), nullable=False),
+    sa.Column('meal_name', sa.String(length=250), nullable=False),
+    sa.Column('price', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('user_email', sa.String(length=250), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_order_archive_created_at'), 'order_archive', ['created_at'], unique=False)
+    op.create_index('ix_order_archive_user_id_id', 'order_archive', ['user_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_order_archive_user_id_id', table_name='order_archive')
+    op.drop_index(op.f('ix_order_archive_created_at'), table_name='order_archive')
+    op.drop_table('order_archive')
@@ -0,0 +1,30 @@
+"""add indexes for the order and menu queries
+
+Revision ID: 7c1e5b9a2f43
+Revises: 26af0d2f1535
+Create Date: 2026-10-18 09:12:04.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e5b9a2f43'
+down_revision = '26af0d2f1535'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_order_user_id_id', 'order', ['user_id', 'id'], unique=False)
+    op.create_index(op.f('ix_order_created_at'), 'order', ['created_at'], unique=False)
+    op.create_index('ix_meal_in_menu', 'meal', ['in_menu'], unique=False,
+                    postgresql_where=sa.text('in_menu'),
+                    sqlite_where=sa.text('in_menu = 1'))
+
+
+def downgrade():
+    op.drop_index('ix_meal_in_menu', table_name='meal')
+    op.drop_index(op.f('ix_order_created_at'), table_name='order')
+    op.drop_index('ix_order_user_id_id', table_name='order')
@@ -0,0 +1,26 @@
+"""add the version column to meal, order and order_archive
+
+Revision ID: 8c1f3d9e7a64
+Revises: e2b6c4a81d35
+Create Date: 2026-10-18 17:36:02.518946
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1f3d9e7a64'
+down_revision = 'e2b6c4a81d35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('meal', 'order', 'order_archive'):
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in ('order_archive', 'order', 'meal'):
+        op.drop_column(table, 'version')
@@ -0,0 +1,35 @@
+"""add the daily_sales rollup table
+
+Revision ID: 9a4e2c7d5f18
+Revises: 3d8a4f6c1b27
+Create Date: 2026-10-18 14:05:51.226840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4e2c7d5f18'
+down_revision = '3d8a4f6c1b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('meal_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('meal_name', sa.String(length=250), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'meal_id')
+    )
+    # fill the table from the orders placed so far
+    op.execute('INSERT INTO daily_sales (day, meal_id, meal_name, orders, revenue) '
+               'SELECT date(created_at), meal_id, max(meal_name), count(id), sum(price) '
+               'FROM "order" WHERE created_at IS NOT NULL GROUP BY date(created_at), meal_id')
+
+
+def downgrade():
+    op.drop_table('daily_sales')
@@ -0,0 +1,24 @@
+"""add the stock column to meal
+
+Revision ID: e2b6c4a81d35
+Revises: 5b7f0e3a9c62
+Create Date: 2026-10-18 16:48:27.310592
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6c4a81d35'
+down_revision = '5b7f0e3a9c62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('meal', sa.Column('stock', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('meal', 'stock')
@@ -2,14 +2,68 @@
 """
 # pylint: disable=E1101
 import datetime
+from collections import Counter
+from concurrent import futures
 
-from flask import make_response, jsonify
+from flask import make_response
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, orm, or_, true, false
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.hybrid import hybrid_property
+
+from cache import invalidate_menu
+from database import SQLAlchemy
+from json_backend import jsonify
 
 db = SQLAlchemy()
 
 
+class SoldOut(Exception):
+    """Raised for a queued order whose meal has no stock left"""
+
+
+def invalidate_menu_on_commit():
+    """Invalidates the cached menu once the current transaction commits"""
+    db.session.info['menu_changed'] = True
+
+
+@event.listens_for(orm.Session, 'after_commit')
+def _menu_changed(session):
+    """invalidate the menu after a commit that changed it"""
+    if session.info.pop('menu_changed', False):
+        invalidate_menu()
+
+
+@event.listens_for(orm.Session, 'after_rollback')
+def _menu_unchanged(session):
+    """forget the changes of a rolled back transaction"""
+    session.info.pop('menu_changed', None)
+
+
+def update_returning(model, key, condition, values, columns):
+    """Runs UPDATE ... WHERE key AND condition and returns columns of the updated row or None.
+
+    Postgres returns the columns from the UPDATE itself through RETURNING. Other dialects
+    read them back by key in the same transaction, only once the UPDATE matched a row.
+    """
+    table = model.__table__
+    statement = table.update().where(db.and_(key, condition)).values(values)
+
+    if db.session.get_bind(model.__mapper__).dialect.name == 'postgresql':
+        return db.session.execute(statement.returning(*columns)).first()
+
+    if db.session.execute(statement).rowcount != 1:
+        return None
+    return db.session.execute(db.select(columns).where(key)).first()
+
+
+def changed_since(name):
+    """Returns the response to an update sent with If-Match for an outdated version"""
+    return make_response(jsonify({
+        "message" : "this {} has changed since you fetched it, kindly fetch it again".format(name)}), 412)
+
+
 class User(db.Model):
     """Contains user columns and methods to add, update and delete a user"""
 
@@ -20,56 +74,70 @@ class User(db.Model):
     email = db.Column(db.String(250), unique=True, nullable=False)
     password = db.Column(db.String(250), nullable=False)
     admin = db.Column(db.Boolean)
-    orders = db.relationship('Order', backref=db.backref('user', lazy=True))
+    # the database deletes the orders of a deleted user (ON DELETE CASCADE), never load them
+    orders = db.relationship('Order', backref=db.backref('user', lazy=True),
+                             cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
         return '<user {}>'.format(self.username)
 
     @classmethod
     def create_user(cls, username, email, password, admin=False):
-        """Creates a new user and ensures that the email is unique"""
-
-        by_email = cls.query.filter_by(email=email).first()
-
-        if by_email is None:
-            password = generate_password_hash(password, method='sha256')
-            new_user = cls(username=username, email=email, password=password, admin=admin)
-            db.session.add(new_user)
-            db.session.commit()
-            return make_response(jsonify({
-                "message" : "user has been successfully created",
-                str(new_user.id) : {"username" : new_user.username,
-                                    "email" : new_user.email,
-                                    "admin" : new_user.admin}}), 201)
-
-
-        return make_response(jsonify({"message" : "user with that email already exists"}), 400)
+        """Creates a new user, the unique constraint on email rejects an existing email"""
+        password = generate_password_hash(password, method='sha256')
+        new_user = cls(username=username, email=email, password=password, admin=admin)
+        db.session.add(new_user)
+
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return make_response(jsonify({"message" : "user with that email already exists"}), 400)
+
+        info = {"username" : new_user.username, "email" : new_user.email, "admin" : new_user.admin}
+        db.session.commit()
+        return make_response(jsonify({
+            "message" : "user has been successfully created",
+            str(new_user.id) : info}), 201)
 
     @staticmethod
     def update_user(user_id, username, email, password, admin):
-        """Updates user information"""
-        user = User.query.get(user_id)
-        by_email = User.query.filter_by(email=email).first()
-
-        if user is None:
-            return make_response(jsonify({"message" : "user does not exists"}), 404)
-
-        if user.username == username and user.email == email and user.admin == admin and check_password_hash(user.password, password):
-            return make_response(jsonify({"message" : "No changes detected"}), 400)
-
-        if by_email is None or by_email.id == user.id:
-            user.username = username
-            user.email = email
-            user.password = generate_password_hash(password, method='sha256')
-            user.admin = admin
+        """Updates user information.
+
+        A single UPDATE applies the change when the username, email or admin flag differ. Only
+        when none of them do is the row read, to tell a missing user from an unchanged one,
+        as the password can only be compared with its hash in Python.
+        """
+        values = {"username" : username, "email" : email, "admin" : admin,
+                  "password" : generate_password_hash(password, method='sha256')}
+        key = User.id == user_id
+        if admin is None:
+            admin_changed = User.admin.isnot(None)
+        else:
+            admin_changed = or_(User.admin.is_(None), User.admin != admin)
+        changed = or_(User.username != username, User.email != email, admin_changed)
+
+        try:
+            updated = User.query.filter(key, changed).update(values, synchronize_session=False)
+            if not updated:
+                user = db.session.query(User.password).filter(key).first()
+                if user is None:
+                    db.session.rollback()
+                    return make_response(jsonify({"message" : "user does not exists"}), 404)
+                if check_password_hash(user.password, password):
+                    db.session.rollback()
+                    return make_response(jsonify({"message" : "No changes detected"}), 400)
+                User.query.filter(key).update(values, synchronize_session=False)
             db.session.commit()
-            return make_response(jsonify({
-                "message" : "user has been successfully updated",
-                str(user.id) : {"username" : user.username,
-                                "email" : user.email,
-                                "admin" : user.admin}}), 200)
+        except IntegrityError:
+            db.session.rollback()
+            return make_response(jsonify({"message" : "user with that email already exists"}), 400)
 
-        return make_response(jsonify({"message" : "user with that email already exists"}), 400)
+        return make_response(jsonify({
+            "message" : "user has been successfully updated",
+            str(user_id) : {"username" : username,
+                            "email" : email,
+                            "admin" : admin}}), 200)
 
     @staticmethod
     def reset_password(user_id, password):
@@ -93,12 +161,16 @@ class User(db.Model):
 
     @staticmethod
     def delete_user(user_id):
-        """Deletes a user"""
+        """Deletes a user and their orders without loading them: the database cascades the
+        delete to the order table and their archived orders are deleted with one statement"""
         user = User.query.get(user_id)
 
         if user is None:
             return make_response(jsonify({"message" : "user does not exists"}), 404)
 
+        for model in (Order, OrderArchive):
+            DailySales.remove(model, model.user_id == user.id)
+        OrderArchive.query.filter(OrderArchive.user_id == user.id).delete(synchronize_session=False)
         db.session.delete(user)
         db.session.commit()
         return make_response(jsonify({"message" : "user has been successfully deleted"}), 200)
@@ -111,16 +183,15 @@ class User(db.Model):
         if user is None:
             return make_response(jsonify({"message" : "user does not exists"}), 404)
 
-        records = Order.query.filter_by(user_id=user.id).all()
-        orders = []
-        for record in records:
-            orders.append(str(record))
+        return make_response(jsonify({user.id : User.user_info(user)}), 200)
 
-        info = {"user_id" : user.id, "email" : user.email,
+    @staticmethod
+    def user_info(user):
+        """Gets the details of a user and a summary of their orders, which are listed by
+        GET /users/<id>/orders"""
+        return {"user_id" : user.id, "email" : user.email,
                 "username" : user.username, "admin" : user.admin,
-                "orders" : orders}
-
-        return make_response(jsonify({user.id : info}), 200)
+                "order_summary" : Order.summary(user.id)}
 
 
 class Meal(db.Model):
@@ -132,52 +203,168 @@ class Meal(db.Model):
     name = db.Column(db.String(250), nullable=False, unique=True)
     price = db.Column(db.Integer, nullable=False)
     in_menu = db.Column(db.Boolean)
-
+    # portions left to sell, None for a meal that never sells out
+    stock = db.Column(db.Integer)
+    # bumped by every write to name, price or in_menu and checked by If-Match, selling stock
+    # leaves it alone so orders never outdate an admin's copy of the meal
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # MenuList.get filters on in_menu = true, only index the (few) rows on the menu
+    __table_args__ = (
+        db.Index('ix_meal_in_menu', in_menu,
+                 postgresql_where=db.text('in_menu'),
+                 sqlite_where=db.text('in_menu = 1')),)
 
     def __repr__(self):
         return '<meal {}>'.format(self.name)
 
+    @hybrid_property
+    def sold_out(self):
+        """Whether the meal has a stock and none of it is left"""
+        return self.stock is not None and self.stock <= 0
+
+    @sold_out.expression
+    def sold_out(cls): # pylint: disable=E0213
+        """the same test in SQL, false for a meal without a stock"""
+        return db.and_(cls.stock.isnot(None), cls.stock <= 0)
+
     @classmethod
-    def create_meal(cls, name, price, in_menu=False):
-        """Creates a new meal and ensures that the name is unique"""
-        by_name = cls.query.filter_by(name=name).first()
+    def create_meal(cls, name, price, in_menu=False, stock=None):
+        """Creates a new meal, the unique constraint on name rejects an existing name"""
+        new_meal = cls(name=name, price=price, in_menu=in_menu, stock=stock)
+        db.session.add(new_meal)
+
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return make_response(jsonify({"message" : "meal with that name already exists"}), 400)
+
+        info = {"name" : new_meal.name, "in_menu" : new_meal.in_menu, "price" : new_meal.price,
+                "stock" : new_meal.stock}
+        db.session.commit()
+        invalidate_menu()
+        return make_response(jsonify({
+            "message" : "meal has been successfully created",
+            str(new_meal.id) : info}), 201)
 
-        if by_name is None:
-            new_meal = cls(name=name, price=price, in_menu=in_menu)
-            db.session.add(new_meal)
-            db.session.commit()
-            return make_response(jsonify({
-                "message" : "meal has been successfully created",
-                str(new_meal.id) : {"name" : new_meal.name,
-                                    "in_menu" : new_meal.in_menu,
-                                    "price" : new_meal.price}}), 201)
+    @classmethod
+    def upsert_many(cls, meals):
+        """Inserts or updates (by name) a chunk of meals in a single transaction.
+
+        meals is a list of dicts with name, price and in_menu and unique names. Existing
+        names are found with one IN query, new meals are inserted with one executemany
+        and existing ones updated in bulk. Returns the number of meals created and updated.
+        """
+        for attempt in range(2):
+            existing = dict(db.session.query(cls.name, cls.id).filter(
+                cls.name.in_([meal["name"] for meal in meals])))
+            new = [meal for meal in meals if meal["name"] not in existing]
+            updated = [dict(meal, meal_id=existing[meal["name"]]) for meal in meals
+                       if meal["name"] in existing]
+            try:
+                if new:
+                    db.session.execute(cls.__table__.insert(), new)
+                if updated:
+                    db.session.execute(cls.__table__.update().where(
+                        cls.id == db.bindparam("meal_id")).values(version=cls.version + 1), updated)
+                db.session.commit()
+                return len(new), len(updated)
+            except IntegrityError:
+                # another writer created one of the names since we looked, look again
+                db.session.rollback()
+                if attempt:
+                    raise
 
-        return make_response(jsonify({"message" : "meal with that name already exists"}), 400)
+    @staticmethod
+    def update_meal(meal_id, name, price, in_menu, versions=None):
+        """Updates meal information with a single UPDATE that only matches a changed meal,
+        the unique constraint on name rejects a name taken by another meal. With versions,
+        from If-Match, the UPDATE also only matches a meal still at one of them"""
+        key = Meal.id == meal_id
+        changed = or_(Meal.name != name, Meal.price != price,
+                      Meal.in_menu.is_(None), Meal.in_menu != in_menu)
+        if versions is not None:
+            changed = db.and_(changed, Meal.version.in_(versions) if versions else false())
+
+        try:
+            updated = Meal.query.filter(key, changed).update(
+                {"name" : name, "price" : price, "in_menu" : in_menu, "version" : Meal.version + 1},
+                synchronize_session=False)
+        except IntegrityError:
+            db.session.rollback()
+            return make_response(jsonify({"message" : "meal with that name already exists"}), 400)
+
+        if not updated:
+            meal = db.session.query(Meal.version).filter(key).first()
+            db.session.rollback()
+            if meal is None:
+                return make_response(jsonify({"message" : "meal does not exists"}), 404)
+            if versions is not None and meal.version not in versions:
+                return changed_since("meal")
+            return make_response(jsonify({"message" : "No changes detected"}), 400)
+
+        db.session.commit()
+        invalidate_menu()
+        return make_response(jsonify({
+            "message" : "meal has been successfully updated",
+            str(meal_id) : {"name" : name,
+                            "in_menu" : in_menu,
+                            "price" : price}}), 200)
 
     @staticmethod
-    def update_meal(meal_id, name, price, in_menu):
-        """Updates meal information"""
-        meal = Meal.query.get(meal_id)
-        by_name = Meal.query.filter_by(name=name).first()
+    def set_stock(meal_id, stock):
+        """Sets the portions of a meal left to sell, None for a meal that never sells out"""
+        meal = update_returning(Meal, Meal.id == meal_id, true(), {"stock" : stock},
+                                [Meal.name, Meal.price, Meal.in_menu])
 
         if meal is None:
+            db.session.rollback()
             return make_response(jsonify({"message" : "meal does not exists"}), 404)
 
-        if meal.name == name and meal.price == price and meal.in_menu == in_menu:
-            return make_response(jsonify({"message" : "No changes detected"}), 400)
+        db.session.commit()
+        invalidate_menu()
+        return make_response(jsonify({
+            "message" : "the stock of the meal has been successfully updated",
+            str(meal_id) : {"name" : meal.name,
+                            "in_menu" : meal.in_menu,
+                            "price" : meal.price,
+                            "stock" : stock}}), 200)
 
-        if by_name is None or meal.id == by_name.id:
-            meal.name = name
-            meal.price = price
-            meal.in_menu = in_menu
-            db.session.commit()
-            return make_response(jsonify({
-                "message" : "meal has been successfully updated",
-                str(meal.id) : {"name" : meal.name,
-                                "in_menu" : meal.in_menu,
-                                "price" : meal.price}}), 200)
+    @staticmethod
+    def take_stock(meal_id, wanted=1):
+        """Takes up to wanted portions of a meal with a stock in the current transaction.
 
-        return make_response(jsonify({"message" : "meal with that name already exists"}), 400)
+        Each portion is taken by an UPDATE that only matches while enough stock is left, so
+        concurrent orders can never sell more than there is. Returns the number taken.
+        """
+        meal = update_returning(Meal, Meal.id == meal_id, Meal.stock >= wanted,
+                                {"stock" : Meal.stock - wanted}, [Meal.stock])
+        taken = wanted
+
+        if meal is None:
+            # not enough left for all of them, take what is left one at a time
+            taken = 0
+            while taken < wanted:
+                meal = update_returning(Meal, Meal.id == meal_id, Meal.stock > 0,
+                                        {"stock" : Meal.stock - 1}, [Meal.stock])
+                if meal is None:
+                    break
+                taken += 1
+
+        if taken and (meal is None or meal.stock <= 0):
+            # the meal just sold out
+            invalidate_menu_on_commit()
+        return taken
+
+    @staticmethod
+    def restore_stock(meal_id, count=1):
+        """Gives back portions of a meal with a stock, in the current transaction"""
+        meal = update_returning(Meal, Meal.id == meal_id, Meal.stock.isnot(None),
+                                {"stock" : Meal.stock + count}, [Meal.stock])
+
+        if meal is not None and meal.stock - count <= 0:
+            # the meal is no longer sold out
+            invalidate_menu_on_commit()
 
     @staticmethod
     def delete_meal(meal_id):
@@ -189,8 +376,26 @@ class Meal(db.Model):
 
         db.session.delete(meal)
         db.session.commit()
+        invalidate_menu()
         return make_response(jsonify({"message" : "meal has been successfully deleted"}), 200)
 
+    @staticmethod
+    def delete_many(meal_ids, batch_size=500):
+        """Deletes the given meals with one DELETE ... WHERE id IN per batch of batch_size ids,
+        each in its own transaction. Returns the number of meals deleted"""
+        meal_ids = sorted(set(meal_ids))
+        deleted = 0
+
+        for start in range(0, len(meal_ids), batch_size):
+            chunk = meal_ids[start:start + batch_size]
+            deleted += db.session.execute(
+                Meal.__table__.delete().where(Meal.id.in_(chunk))).rowcount
+            db.session.commit()
+
+        if deleted:
+            invalidate_menu()
+        return deleted
+
     @staticmethod
     def get_meal(meal_id):
         """Gets a particular meal"""
@@ -199,47 +404,89 @@ class Meal(db.Model):
         if meal is None:
             return make_response(jsonify({"message" : "meal does not exists"}), 404)
 
-        info = {"meal_id" : meal.id, "name" : meal.name, "price" : meal.price, "in_menu" : meal.in_menu}
+        info = {"meal_id" : meal.id, "name" : meal.name, "price" : meal.price, "in_menu" : meal.in_menu,
+                "stock" : meal.stock}
         return make_response(jsonify({meal.id : info}), 200)
 
     @staticmethod
     def add_to_menu(meal_id):
-        """Adds a particular meal to the menu"""
-        meal = Meal.query.get(meal_id)
+        """Adds a particular meal to the menu with a single UPDATE of meals not on it"""
+        meal = update_returning(
+            Meal, Meal.id == meal_id, or_(Meal.in_menu == false(), Meal.in_menu.is_(None)),
+            {"in_menu" : True, "version" : Meal.version + 1}, [Meal.name, Meal.price])
 
         if meal is None:
-            return make_response(jsonify({"message" : "meal does not exists"}), 404)
-
-        if meal.in_menu:
+            exists = db.session.query(Meal.id).filter(Meal.id == meal_id).first() is not None
+            db.session.rollback()
+            if not exists:
+                return make_response(jsonify({"message" : "meal does not exists"}), 404)
             return make_response(jsonify({"message" : "meal already in the menu"}), 400)
 
-        meal.in_menu = True
         db.session.commit()
+        invalidate_menu()
         return make_response(jsonify({
             "message" : "meal has been successfully added to the menu",
-            str(meal.id) : {"name" : meal.name,
-                            "in_menu" : meal.in_menu,
+            str(meal_id) : {"name" : meal.name,
+                            "in_menu" : True,
                             "price" : meal.price}}), 200)
 
     @staticmethod
     def remove_from_menu(meal_id):
-        """Removes a particular meal from the menu"""
-        meal = Meal.query.get(meal_id)
+        """Removes a particular meal from the menu with a single UPDATE of meals on it"""
+        meal = update_returning(
+            Meal, Meal.id == meal_id, Meal.in_menu == true(),
+            {"in_menu" : False, "version" : Meal.version + 1}, [Meal.name, Meal.price])
 
         if meal is None:
-            return make_response(jsonify({"message" : "meal does not exists"}), 404)
-
-        if not meal.in_menu:
+            exists = db.session.query(Meal.id).filter(Meal.id == meal_id).first() is not None
+            db.session.rollback()
+            if not exists:
+                return make_response(jsonify({"message" : "meal does not exists"}), 404)
             return make_response(jsonify({"message" : "meal already not in the menu"}), 400)
 
-        meal.in_menu = False
         db.session.commit()
+        invalidate_menu()
         return make_response(jsonify({
             "message" : "meal has been successfully removed from the menu",
-            str(meal.id) : {"name" : meal.name,
-                            "in_menu" : meal.in_menu,
+            str(meal_id) : {"name" : meal.name,
+                            "in_menu" : False,
                             "price" : meal.price}}), 200)
 
+    @staticmethod
+    def replace_menu(meal_ids):
+        """Makes the given meals the whole menu in a single transaction.
+
+        One query checks that every meal exists, then one UPDATE puts the given meals on the
+        menu and another takes every other meal off it, and both are committed together.
+        """
+        meal_ids = set(meal_ids)
+        added = 0
+        # an empty list clears the menu, without an empty IN () that SQLAlchemy warns about
+        others = Meal.in_menu == true()
+
+        if meal_ids:
+            found = {meal_id for meal_id, in db.session.query(Meal.id).filter(Meal.id.in_(meal_ids))}
+            missing = sorted(meal_ids - found)
+
+            if missing:
+                return make_response(jsonify({
+                    "message" : "meal does not exists", "meal_ids" : missing}), 404)
+
+            added = Meal.query.filter(
+                Meal.id.in_(meal_ids), or_(Meal.in_menu == false(), Meal.in_menu.is_(None))).update(
+                    {Meal.in_menu : True, Meal.version : Meal.version + 1}, synchronize_session=False)
+            others = db.and_(~Meal.id.in_(meal_ids), others)
+
+        removed = Meal.query.filter(others).update(
+            {Meal.in_menu : False, Meal.version : Meal.version + 1}, synchronize_session=False)
+        db.session.commit()
+        invalidate_menu()
+        return make_response(jsonify({
+            "message" : "the menu has been successfully replaced",
+            "menu" : sorted(meal_ids),
+            "added" : added,
+            "removed" : removed}), 200)
+
     @staticmethod
     def get_menu(meal_id):
         """Gets a particular meal on the menu"""
@@ -252,7 +499,8 @@ class Meal(db.Model):
             return make_response(jsonify({
                 "message" : "kindly ensure that this meal is in the menu"}), 400)
 
-        info = {"meal_id" : meal.id, "name" : meal.name, "price" : meal.price, "in_menu" : meal.in_menu}
+        info = {"meal_id" : meal.id, "name" : meal.name, "price" : meal.price, "in_menu" : meal.in_menu,
+                "sold_out" : meal.sold_out}
         return make_response(jsonify({meal.id : info}), 200)
 
 
@@ -265,32 +513,53 @@ class Order(db.Model):
     meal_id = db.Column(db.Integer, nullable=False)
     meal_name = db.Column(db.String(250), nullable=False)
     price = db.Column(db.Integer, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, index=True)
     user_email = db.Column(db.String(250), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE')) # tablename
+    # bumped by every write to the row, the ETag checked by If-Match
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # serves filter_by(user_id=...) ordered or paginated by id
+    __table_args__ = (db.Index('ix_order_user_id_id', user_id, id),)
 
     def __repr__(self):
-        return '<order {}: {}>'.format(self.id, self.meal_name)
+        return Order.label(self.id, self.meal_name)
+
+    @staticmethod
+    def label(order_id, meal_name):
+        """Formats an order the way it is listed under its user"""
+        return '<order {}: {}>'.format(order_id, meal_name)
+
+    @staticmethod
+    def labels_by_user(user_ids):
+        """Gets the order labels of each of the given users in a single query"""
+        labels = {user_id : [] for user_id in user_ids}
+
+        if user_ids:
+            rows = db.session.query(Order.user_id, Order.id, Order.meal_name).filter(
+                Order.user_id.in_(user_ids)).order_by(Order.id)
+            for user_id, order_id, meal_name in rows:
+                labels[user_id].append(Order.label(order_id, meal_name))
+
+        return labels
 
     @classmethod
     def create_order(cls, meal_id, user_id):
         """Create a new order"""
         meal = Meal.query.get(meal_id)
         user = User.query.get(user_id)
+        error = cls._check_order(meal, user)
 
-        if meal is None:
-            return make_response(jsonify({"message" : "meal does not exists"}), 404)
+        if error is not None:
+            return error
 
-        if user is None:
-            return make_response(jsonify({"message" : "user does not exists"}), 404)
+        if meal.stock is not None and not Meal.take_stock(meal.id):
+            db.session.rollback()
+            return cls._sold_out()
 
-        if not meal.in_menu:
-            return make_response(jsonify({
-                "message" : "kindly ensure that this meal is in the menu"}), 400)
-
-        new_order = cls(meal_id=meal.id, meal_name=meal.name,
-                        price=meal.price, user_id=user.id, user_email=user.email)
+        new_order = cls(meal_id=meal.id, meal_name=meal.name, price=meal.price,
+                        user_id=user.id, user_email=user.email, created_at=datetime.datetime.utcnow())
         db.session.add(new_order)
+        DailySales.record([new_order])
         db.session.commit()
         return make_response(jsonify({
             "message" : "your order has been successfully created",
@@ -303,14 +572,199 @@ class Order(db.Model):
                                  "created_at" : new_order.created_at}}), 201)
 
     @staticmethod
-    def update_order(order_id, meal_id):
-        """Updates order information"""
+    def _check_order(meal, user):
+        """Returns the error response for an order that cannot be placed, None otherwise"""
+        if meal is None:
+            return make_response(jsonify({"message" : "meal does not exists"}), 404)
+
+        if user is None:
+            return make_response(jsonify({"message" : "user does not exists"}), 404)
+
+        if not meal.in_menu:
+            return make_response(jsonify({
+                "message" : "kindly ensure that this meal is in the menu"}), 400)
+
+        if meal.stock is not None and meal.stock <= 0:
+            return Order._sold_out()
+
+        return None
+
+    @staticmethod
+    def _sold_out():
+        """Returns the error response for an order of a meal without stock left"""
+        return make_response(jsonify({"message" : "sorry, this meal is sold out"}), 400)
+
+    @classmethod
+    def queue_order(cls, meal_id, user_id, intake):
+        """Create a new order through the write-behind intake, which commits it with others"""
+        meal = db.session.query(Meal.id, Meal.name, Meal.price, Meal.in_menu, Meal.stock).filter(
+            Meal.id == meal_id).first()
+        user = db.session.query(User.id, User.email).filter(User.id == user_id).first()
+        error = cls._check_order(meal, user)
+
+        if error is not None:
+            return error
+
+        # do not hold a connection while the intake writes the order
+        db.session.rollback()
+        row = {"meal_id" : meal.id, "meal_name" : meal.name, "price" : meal.price,
+               "user_id" : user.id, "user_email" : user.email}
+        future = intake.submit(row)
+        futures.wait([future], timeout=intake.timeout)
+
+        if not future.done():
+            # the order may still fail, give the client a ticket to find out
+            return make_response(jsonify({
+                "message" : "your order has been received and will be created shortly",
+                "ticket" : intake.track(row, future)}), 202)
+
+        return cls.queued_result(future)
+
+    @classmethod
+    def queued_result(cls, future, status=201):
+        """Returns the response for an order handed to the intake, status once it is created"""
+        if not future.done():
+            return make_response(jsonify({"message" : "your order has not been created yet"}), 202)
+
+        error = future.exception()
+        if isinstance(error, SoldOut):
+            return cls._sold_out()
+        if error is not None:
+            return make_response(jsonify({
+                "message" : "sorry, your order could not be created, kindly try again"}), 503)
+
+        row = future.result()
+        return make_response(jsonify({
+            "message" : "your order has been successfully created",
+            str(row["id"]) : cls._created(row)}), status)
+
+    @classmethod
+    def create_orders(cls, items):
+        """Creates several orders in a single transaction.
+
+        items is a list of (meal_id, user_id) pairs. All meals and users are looked up with
+        one IN query each and the valid orders are inserted together and committed once.
+        Returns one (result, status) pair per item, in the same order as items.
+        """
+        meal_ids = {meal_id for meal_id, _ in items}
+        user_ids = {user_id for _, user_id in items}
+        meals = {meal.id : meal for meal in db.session.query(
+            Meal.id, Meal.name, Meal.price, Meal.in_menu, Meal.stock).filter(Meal.id.in_(meal_ids))}
+        users = {user.id : user for user in db.session.query(
+            User.id, User.email).filter(User.id.in_(user_ids))}
+
+        results = []
+        rows = []
+        for meal_id, user_id in items:
+            meal = meals.get(meal_id)
+            user = users.get(user_id)
+
+            if meal is None:
+                results.append(({"meal_id" : meal_id, "message" : "meal does not exists"}, 404))
+            elif user is None:
+                results.append(({"meal_id" : meal_id, "message" : "user does not exists"}, 404))
+            elif not meal.in_menu:
+                results.append(({"meal_id" : meal_id,
+                                 "message" : "kindly ensure that this meal is in the menu"}, 400))
+            elif meal.stock is not None and meal.stock <= 0:
+                results.append(({"meal_id" : meal_id, "message" : "sorry, this meal is sold out"}, 400))
+            else:
+                row = {"meal_id" : meal.id, "meal_name" : meal.name, "price" : meal.price,
+                       "user_id" : user.id, "user_email" : user.email}
+                rows.append(row)
+                results.append((row, 201))
+
+        sold_out = {id(row) for row in cls.take_stock_for(rows)}
+        if sold_out:
+            rows = [row for row in rows if id(row) not in sold_out]
+            results = [({"meal_id" : result["meal_id"], "message" : "sorry, this meal is sold out"}, 400)
+                       if id(result) in sold_out else (result, status) for result, status in results]
+
+        if rows:
+            cls.insert_many(rows)
+            db.session.commit()
+
+        return [(cls._created(result) if status == 201 else result, status)
+                for result, status in results]
+
+    @staticmethod
+    def take_stock_for(rows):
+        """Takes a portion of its meal for every order row in the current transaction.
+        Meals are updated in id order, so concurrent batches lock them in the same order.
+        Returns the rows that got none because their meal sold out"""
+        wanted = Counter(row["meal_id"] for row in rows)
+        sold_out = []
+
+        if wanted:
+            limited = db.session.query(Meal.id).filter(
+                Meal.id.in_(wanted), Meal.stock.isnot(None)).order_by(Meal.id)
+            for meal_id, in limited.all():
+                taken = Meal.take_stock(meal_id, wanted[meal_id])
+                if taken < wanted[meal_id]:
+                    sold_out.extend([row for row in rows if row["meal_id"] == meal_id][taken:])
+
+        return sold_out
+
+    @staticmethod
+    def _created(row):
+        """Describes an order inserted by create_orders"""
+        return {"order_id" : row["id"],
+                "meal_id" : row["meal_id"],
+                "meal_name" : row["meal_name"],
+                "price" : row["price"],
+                "user_id" : row["user_id"],
+                "user_email" : row["user_email"],
+                "created_at" : row["created_at"]}
+
+    @classmethod
+    def insert_many(cls, rows, chunk_size=100):
+        """Inserts order rows with multi-row INSERT statements in the current transaction.
+
+        Sets 'id' and 'created_at' on every row. Postgres returns the new ids through
+        RETURNING; SQLite numbers the rows of a single INSERT consecutively while it holds
+        the write lock, so their ids are derived from the last one.
+        """
+        now = datetime.datetime.utcnow()
+        for row in rows:
+            row.setdefault("created_at", now)
+
+        dialect = db.session.get_bind(cls.__mapper__).dialect.name
+        table = cls.__table__
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            values = [{key : row[key] for key in row if key != "id"} for row in chunk]
+
+            if dialect == 'postgresql':
+                result = db.session.execute(table.insert().values(values).returning(table.c.id))
+                ids = [order_id for order_id, in result]
+            elif dialect == 'sqlite':
+                last_id = db.session.execute(table.insert().values(values)).lastrowid
+                ids = range(last_id - len(chunk) + 1, last_id + 1)
+            else:
+                db.session.bulk_insert_mappings(cls, values, return_defaults=True)
+                ids = [value["id"] for value in values]
+
+            for row, order_id in zip(chunk, ids):
+                row["id"] = order_id
+
+        DailySales.record(rows)
+        return rows
+
+    @staticmethod
+    def update_order(order_id, meal_id, versions=None):
+        """Updates order information with an UPDATE that only matches the order as it was read,
+        so a concurrent change is never overwritten. versions, from If-Match, are the versions
+        the caller allows"""
         order = Order.query.get(order_id)
         meal = Meal.query.get(meal_id)
 
         if order is None:
             return make_response(jsonify({"message" : "order does not exists"}), 404)
 
+        if versions is not None and order.version not in versions:
+            return changed_since("order")
+
         if meal is None:
             return make_response(jsonify({"message" : "meal does not exists"}), 404)
 
@@ -321,16 +775,36 @@ class Order(db.Model):
         if order.meal_id == meal.id:
             return make_response(jsonify({"message" : "You had ordered this meal initially"}), 400)
 
-        order.meal_id = meal.id
-        order.meal_name = meal.name
-        order.price = meal.price
+        if meal.stock is not None and not Meal.take_stock(meal.id):
+            db.session.rollback()
+            return Order._sold_out()
+
+        version = order.version
+        old = {"meal_id" : order.meal_id, "meal_name" : order.meal_name, "price" : order.price,
+               "created_at" : order.created_at}
+        new = dict(old, meal_id=meal.id, meal_name=meal.name, price=meal.price)
+        updated = Order.query.filter(Order.id == order_id, Order.version == version).update({
+            "meal_id" : meal.id, "meal_name" : meal.name, "price" : meal.price,
+            "version" : Order.version + 1}, synchronize_session=False)
+
+        if not updated:
+            db.session.rollback()
+            if versions is not None:
+                return changed_since("order")
+            return make_response(jsonify({
+                "message" : "this order was changed by another request, kindly try again"}), 409)
+
+        Meal.restore_stock(old["meal_id"])
+        DailySales.record([old], sign=-1)
+        DailySales.record([new])
         db.session.commit()
         return make_response(jsonify({
             "message" : "your order has been successfully updated",
-            str(order.id) : {"order_id" : order.id,
-                             "meal_id" : order.meal_id,
-                             "meal_name" : order.meal_name,
-                             "price" : order.price}}), 200)
+            str(order_id) : {"order_id" : order_id,
+                             "meal_id" : new["meal_id"],
+                             "meal_name" : new["meal_name"],
+                             "price" : new["price"],
+                             "version" : version + 1}}), 200)
 
     @staticmethod
     def delete_order(order_id):
@@ -340,14 +814,101 @@ class Order(db.Model):
         if order is None:
             return make_response(jsonify({"message" : "order does not exists"}), 404)
 
+        DailySales.record([order], sign=-1)
+        Meal.restore_stock(order.meal_id)
         db.session.delete(order)
         db.session.commit()
         return make_response(jsonify({"message" : "your order has been successfully deleted"}), 200)
 
+    @classmethod
+    def archive(cls, before, batch_size=1000):
+        """Moves the orders placed before a datetime to the archive, batch_size at a time.
+
+        Each batch is copied with INSERT ... SELECT and deleted in its own transaction, so
+        locks are held briefly and an interrupted run can simply be started again. The
+        newest order always stays, as SQLite numbers new rows from the highest id left in
+        the table and would otherwise hand out archived ids again. Returns the number moved.
+        """
+        columns = [column.name for column in cls.__table__.columns]
+        newest = db.session.query(db.func.max(cls.id)).scalar()
+        moved = 0
+
+        while newest is not None:
+            ids = [order_id for order_id, in db.session.query(cls.id).filter(
+                cls.created_at < before, cls.id < newest).order_by(cls.id).limit(batch_size)]
+            if not ids:
+                break
+
+            db.session.execute(OrderArchive.__table__.insert().from_select(
+                columns, db.select([cls.__table__.c[column] for column in columns]).where(
+                    cls.id.in_(ids))))
+            db.session.execute(cls.__table__.delete().where(cls.id.in_(ids)))
+            db.session.commit()
+            moved += len(ids)
+
+        db.session.commit()
+        return moved
+
+    @staticmethod
+    def summary(user_id):
+        """Counts the live and archived orders of a user and totals their price in one GROUP BY
+        query, each table read through its (user_id, id) index"""
+        orders = db.union_all(*[
+            db.select([model.user_id, model.price, model.created_at]).where(model.user_id == user_id)
+            for model in (Order, OrderArchive)]).alias('orders')
+        row = db.session.query(
+            db.func.count(), db.func.sum(orders.c.price), db.func.max(orders.c.created_at)).group_by(
+                orders.c.user_id).first()
+        count, total, last = row if row is not None else (0, 0, None)
+
+        return {"count" : count, "total_spend" : total, "last_order_at" : last}
+
+    @classmethod
+    def delete_many(cls, since=None, before=None, user_id=None, batch_size=1000):
+        """Deletes the live and archived orders placed from since up to before and/or by a
+        user, batch_size at a time.
+
+        Like archive(), each batch is deleted by id in its own transaction so locks are held
+        briefly, and is taken off the daily sales first. Stock is not given back, unlike
+        delete_order(), as these orders were served. Returns the number deleted.
+        """
+        deleted = 0
+
+        for model in (cls, OrderArchive):
+            conditions = []
+            if since is not None:
+                conditions.append(model.created_at >= since)
+            if before is not None:
+                conditions.append(model.created_at < before)
+            if user_id is not None:
+                conditions.append(model.user_id == user_id)
+
+            while True:
+                ids = [order_id for order_id, in db.session.query(model.id).filter(
+                    *conditions).order_by(model.id).limit(batch_size)]
+                if not ids:
+                    break
+
+                DailySales.remove(model, model.id.in_(ids))
+                db.session.execute(model.__table__.delete().where(model.id.in_(ids)))
+                db.session.commit()
+                deleted += len(ids)
+
+        db.session.commit()
+        return deleted
+
+    @staticmethod
+    def find(order_id):
+        """Gets an order by id from the live table, or from the archive if it was moved there"""
+        order = Order.query.get(order_id)
+        if order is None:
+            order = OrderArchive.query.get(order_id)
+        return order
+
     @staticmethod
     def get_order(order_id):
         """Get a particular order"""
-        order = Order.query.get(order_id)
+        order = Order.find(order_id)
 
         if order is None:
             return make_response(jsonify({"message" : "order does not exists"}), 404)
@@ -360,3 +921,158 @@ class Order(db.Model):
                 "user_email" : order.user_email,
                 "created_at" : order.created_at}
         return make_response(jsonify({order.id : info}), 200)
+
+
+class OrderArchive(db.Model):
+    """Contains the orders moved out of the order table by Order.archive, read-only"""
+
+
+    __tablename__ = 'order_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    meal_id = db.Column(db.Integer, nullable=False)
+    meal_name = db.Column(db.String(250), nullable=False)
+    price = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, index=True)
+    user_email = db.Column(db.String(250), nullable=False)
+    user_id = db.Column(db.Integer)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    __table_args__ = (db.Index('ix_order_archive_user_id_id', user_id, id),)
+
+    def __repr__(self):
+        return Order.label(self.id, self.meal_name)
+
+
+class DailySales(db.Model):
+    """Contains the number of orders and the revenue of each meal per day.
+
+    The rows are kept up to date in the same transaction as every order written, updated or
+    deleted, so reports never scan the order table. rebuild() recomputes them from scratch.
+    """
+
+
+    __tablename__ = 'daily_sales'
+    day = db.Column(db.Date, primary_key=True)
+    meal_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    meal_name = db.Column(db.String(250), nullable=False)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return '<daily sales {} {}: {}>'.format(self.day, self.meal_name, self.orders)
+
+    @staticmethod
+    def _field(order, name):
+        """Reads a field of an Order or of a row dict"""
+        return order[name] if isinstance(order, dict) else getattr(order, name)
+
+    @classmethod
+    def record(cls, orders, sign=1):
+        """Adds (sign=1) or removes (sign=-1) orders, Order objects or row dicts with meal_id,
+        meal_name, price and created_at, from the totals in the current transaction. Orders
+        without a created_at belong to no day and are left out, as in remove() and rebuild()"""
+        totals = {}
+        for order in orders:
+            created_at = cls._field(order, "created_at")
+            if created_at is None:
+                continue
+            day = created_at.date()
+            meal_id = cls._field(order, "meal_id")
+            count, revenue, _ = totals.get((day, meal_id), (0, 0, None))
+            totals[(day, meal_id)] = (count + sign, revenue + sign * cls._field(order, "price"),
+                                      cls._field(order, "meal_name"))
+
+        cls._add(totals)
+
+    @classmethod
+    def remove(cls, model, condition):
+        """Removes the orders of model (Order or OrderArchive) matching condition from the
+        totals in the current transaction, summing them up with one GROUP BY query"""
+        day = db.func.date(model.created_at, type_=db.Date)
+        rows = db.session.query(
+            day, model.meal_id, db.func.max(model.meal_name), db.func.count(model.id),
+            db.func.sum(model.price)).filter(condition, model.created_at.isnot(None)).group_by(
+                day, model.meal_id)
+        cls._add({(day, meal_id) : (-count, -revenue, meal_name)
+                  for day, meal_id, meal_name, count, revenue in rows})
+
+    @classmethod
+    def _add(cls, totals):
+        """Adds {(day, meal_id): (orders, revenue, meal_name)} to the totals"""
+        if not totals:
+            return
+
+        values = [{"day" : day, "meal_id" : meal_id, "meal_name" : meal_name,
+                   "orders" : count, "revenue" : revenue}
+                  for (day, meal_id), (count, revenue, meal_name) in totals.items()]
+        table = cls.__table__
+
+        if db.session.get_bind(cls.__mapper__).dialect.name == 'postgresql':
+            statement = postgresql.insert(table).values(values)
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.day, table.c.meal_id],
+                set_={"orders" : table.c.orders + statement.excluded.orders,
+                      "revenue" : table.c.revenue + statement.excluded.revenue,
+                      "meal_name" : statement.excluded.meal_name}))
+            return
+
+        for value in values:
+            updated = db.session.execute(table.update().where(db.and_(
+                table.c.day == value["day"], table.c.meal_id == value["meal_id"])).values(
+                    orders=table.c.orders + value["orders"],
+                    revenue=table.c.revenue + value["revenue"],
+                    meal_name=value["meal_name"])).rowcount
+            if not updated:
+                db.session.execute(table.insert().values(value))
+
+    @classmethod
+    def rebuild(cls):
+        """Recomputes every row from the live and archived orders, returns the number of rows written"""
+        orders = db.union_all(*[
+            db.select([model.created_at, model.meal_id, model.meal_name, model.id, model.price]).where(
+                model.created_at.isnot(None))
+            for model in (Order, OrderArchive)]).alias()
+        day = db.func.date(orders.c.created_at)
+        totals = db.select([
+            day, orders.c.meal_id, db.func.max(orders.c.meal_name),
+            db.func.count(orders.c.id), db.func.sum(orders.c.price)]).group_by(day, orders.c.meal_id)
+
+        db.session.execute(cls.__table__.delete())
+        written = db.session.execute(cls.__table__.insert().from_select(
+            ["day", "meal_id", "meal_name", "orders", "revenue"], totals)).rowcount
+        db.session.commit()
+        return written
+
+    @classmethod
+    def between(cls, start, end):
+        """Gets the totals per day and meal from start to end, both dates included"""
+        rows = cls.query.filter(cls.day >= start, cls.day <= end, cls.orders > 0).order_by(
+            cls.day, cls.meal_id)
+        days = []
+
+        for row in rows:
+            if not days or days[-1]["date"] != row.day.isoformat():
+                days.append({"date" : row.day.isoformat(), "orders" : 0, "revenue" : 0, "meals" : []})
+            day = days[-1]
+            day["orders"] += row.orders
+            day["revenue"] += row.revenue
+            day["meals"].append({"meal_id" : row.meal_id, "meal_name" : row.meal_name,
+                                 "orders" : row.orders, "revenue" : row.revenue})
+
+        return days
+
+
+class IdempotencyKey(db.Model):
+    """Contains the stored responses of requests sent with an Idempotency-Key header"""
+
+
+    __tablename__ = 'idempotency_key'
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(40), nullable=False)
+    status = db.Column(db.Integer) # null while the first request is still running
+    mimetype = db.Column(db.String(100))
+    body = db.Column(db.LargeBinary)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return '<idempotency key {}: {}>'.format(self.user_id, self.key)
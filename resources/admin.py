@@ -0,0 +1,101 @@
+"""Contains endpoints that report on the running application to administrators and that
+clean up data in bulk
+"""
+import datetime
+
+from flask import Blueprint, make_response
+from flask_restful import Resource, Api, reqparse, inputs
+
+import models
+from database import pool_stats
+from json_backend import jsonify, output_json
+from .auth import admin_required
+
+
+class Pool(Resource):
+    """Contains a GET method to inspect the database connection pools"""
+
+
+    @admin_required
+    def get(self):
+        """Gets the live checkout and wait statistics of every connection pool"""
+        return make_response(jsonify({"pools" : pool_stats(models.db)}), 200)
+
+
+class OrderBulkDelete(Resource):
+    """Contains a DELETE method to delete the orders of a period or of a user at once"""
+
+
+    def __init__(self):
+        self.reqparse = reqparse.RequestParser()
+        self.reqparse.add_argument(
+            'from',
+            type=inputs.date,
+            help='kindly provide from as a date like 2018-06-01',
+            location='args')
+        self.reqparse.add_argument(
+            'to',
+            type=inputs.date,
+            help='kindly provide to as a date like 2018-06-30',
+            location='args')
+        self.reqparse.add_argument(
+            'user_id',
+            type=int,
+            help='kindly provide a valid user_id',
+            location='args')
+        super().__init__()
+
+    @admin_required
+    def delete(self):
+        """Deletes the live and archived orders placed from and to the given dates, both
+        included, and/or by user_id"""
+        kwargs = self.reqparse.parse_args()
+        start, end, user_id = kwargs.get('from'), kwargs.get('to'), kwargs.get('user_id')
+
+        if start is None and end is None and user_id is None:
+            return make_response(jsonify({
+                "message" : "kindly provide from, to or user_id to choose the orders to delete"}), 400)
+
+        if start is not None and end is not None and start > end:
+            return make_response(jsonify({"message" : "kindly ensure that from is not after to"}), 400)
+
+        deleted = models.Order.delete_many(
+            since=start,
+            before=end + datetime.timedelta(days=1) if end is not None else None,
+            user_id=user_id)
+        return make_response(jsonify({
+            "message" : "{} orders have been successfully deleted".format(deleted),
+            "deleted" : deleted}), 200)
+
+
+class MealBulkDelete(Resource):
+    """Contains a DELETE method to delete several meals at once"""
+
+
+    def __init__(self):
+        self.reqparse = reqparse.RequestParser()
+        self.reqparse.add_argument(
+            'meal_ids',
+            required=True,
+            type=int,
+            action='append',
+            help='kindly provide a valid list of meal_ids',
+            location='json')
+        super().__init__()
+
+    @admin_required
+    def delete(self):
+        """Deletes the given meals"""
+        kwargs = self.reqparse.parse_args()
+        deleted = models.Meal.delete_many(kwargs.get('meal_ids'))
+        return make_response(jsonify({
+            "message" : "{} meals have been successfully deleted".format(deleted),
+            "deleted" : deleted}), 200)
+
+
+admin_api = Blueprint('resources.admin', __name__)
+api = Api(admin_api)
+api.representation('application/json')(output_json)
+api.add_resource(Pool, '/admin/pool', endpoint='pool')
+api.add_resource(OrderBulkDelete, '/admin/orders', endpoint='order_bulk_delete')
+api.add_resource(MealBulkDelete, '/admin/meals', endpoint='meal_bulk_delete')
@@ -1,12 +1,114 @@
 """Contains the token_required decorator to restrict access to authenticated users only and
 the admin_required decorator to restrict access to administrators only.
+
+The token is verified once per request and the resulting Identity is placed on flask.g so
+resources can read the caller's id and admin flag without decoding the token again.
 """
+import threading
+import time
+from collections import namedtuple, OrderedDict
 from functools import wraps
 
-from flask import request, jsonify, make_response
+from flask import request, make_response, g
 import jwt
 
 import config
+from json_backend import jsonify
+
+
+Identity = namedtuple('Identity', ['id', 'admin', 'exp'])
+
+
+class TokenCache(object):
+    """Keeps verified tokens keyed by their signature until they expire"""
+
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        """Returns the cached identity for a token or None if it is unknown or expired"""
+        signature = token.rpartition('.')[2]
+        entry = self._tokens.get(signature)
+
+        if entry is None:
+            return None
+
+        cached_token, identity = entry
+        if cached_token != token:
+            return None
+
+        if identity.exp <= time.time():
+            with self._lock:
+                self._tokens.pop(signature, None)
+            return None
+
+        return identity
+
+    def put(self, token, identity):
+        """Caches the identity of a verified token"""
+        signature = token.rpartition('.')[2]
+        with self._lock:
+            if len(self._tokens) >= self.max_size:
+                self._evict()
+            self._tokens[signature] = (token, identity)
+
+    def clear(self):
+        """Drops all cached tokens"""
+        with self._lock:
+            self._tokens.clear()
+
+    def _evict(self):
+        """Drops expired tokens and, if still full, the oldest one. Caller holds the lock"""
+        now = time.time()
+        expired = [key for key, (_, identity) in self._tokens.items() if identity.exp <= now]
+        for key in expired:
+            del self._tokens[key]
+
+        if len(self._tokens) >= self.max_size:
+            self._tokens.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+def verify_token(token):
+    """Returns the Identity carried by a valid token, raises jwt.InvalidTokenError otherwise"""
+    identity = token_cache.get(token)
+
+    if identity is None:
+        data = jwt.decode(token, config.Config.SECRET_KEY)
+        try:
+            identity = Identity(id=data['id'], admin=bool(data['admin']), exp=int(data['exp']))
+        except (KeyError, TypeError, ValueError):
+            raise jwt.InvalidTokenError('token is missing required claims')
+        token_cache.put(token, identity)
+
+    return identity
+
+
+def current_identity():
+    """Returns the Identity of the authenticated caller for the current request"""
+    return g.identity
+
+
+def _authenticate():
+    """Places the caller's Identity on flask.g, returns an error response on failure"""
+    token = request.headers.get('x-access-token')
+
+    if token is None:
+        return make_response(jsonify({
+            "message" : "kindly provide a valid token in the header"}), 401)
+
+    try:
+        g.identity = verify_token(token)
+    except jwt.InvalidTokenError:
+        return make_response(jsonify({
+            "message" : "kindly provide a valid token in the header"}), 401)
+
+    return None
 
 
 def token_required(f):
@@ -15,20 +117,11 @@ def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         """validate token provided"""
-        token = None
+        error = _authenticate()
 
-        if 'x-access-token' in request.headers:
-            token = request.headers['x-access-token']
+        if error is not None:
+            return error
 
-        if token is None:
-            return make_response(jsonify({
-                "message" : "kindly provide a valid token in the header"}), 401)
-
-        try:
-            data = jwt.decode(token, config.Config.SECRET_KEY) # pylint: disable=W0612
-        except:
-            return make_response(jsonify({
-                "message" : "kindly provide a valid token in the header"}), 401)
         return f(*args, **kwargs)
 
     return decorated
@@ -40,23 +133,12 @@ def admin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         """validate token provided and ensures the user is an admin"""
-        token = None
-
-        if 'x-access-token' in request.headers:
-            token = request.headers['x-access-token']
+        error = _authenticate()
 
-        if token is None:
-            return make_response(jsonify({
-                "message" : "kindly provide a valid token in the header"}), 401)
-
-        try:
-            data = jwt.decode(token, config.Config.SECRET_KEY)
-            admin = data['admin']
-        except:
-            return make_response(jsonify({
-                "message" : "kindly provide a valid token in the header"}), 401)
+        if error is not None:
+            return error
 
-        if not admin:
+        if not g.identity.admin:
             return make_response(jsonify({
                 "message" : "you are not authorized to perform this function as a non-admin user"}), 401)
 
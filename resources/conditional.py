@@ -0,0 +1,72 @@
+"""Contains conditional request support (ETag / If-None-Match, Last-Modified /
+If-Modified-Since and If-Match).
+
+ETags are computed from the rows a resource is about to serialise, so a client holding
+a current copy gets a 304 before anything is marshalled or encoded. Rows with a version
+column use their id and version as their ETag, so an update sent with If-Match can be
+checked by the UPDATE itself.
+"""
+import datetime
+import hashlib
+
+from flask import request, current_app
+
+
+def row_etag(*values):
+    """Returns a strong ETag for the given row values"""
+    return hashlib.sha1(repr(values).encode('UTF-8')).hexdigest()
+
+
+def version_etag(row_id, version, *details):
+    """Returns the ETag of a row with a version column, <id>-<version>. details are values
+    left out of the version, like the stock of a meal, that still change the ETag for GET"""
+    etag = '{}-{}'.format(row_id, version)
+    if details:
+        etag += '-' + row_etag(*details)[:12]
+    return etag
+
+
+def if_match_versions(row_id):
+    """Returns the versions of row_id allowed by the If-Match header, None when any version is.
+    ETags of other rows, or that are not versions, match nothing"""
+    if not request.if_match or request.if_match.star_tag:
+        return None
+
+    versions = []
+    for etag in request.if_match.as_set():
+        parts = etag.split('-')
+        if len(parts) >= 2 and parts[0] == str(row_id) and parts[1].isdigit():
+            versions.append(int(parts[1]))
+    return sorted(versions)
+
+
+def _is_fresh(etag, last_modified):
+    """Checks whether the client's cached copy is still current"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+
+    if request.if_modified_since is not None and last_modified is not None:
+        return datetime.datetime.utcfromtimestamp(int(last_modified)) <= request.if_modified_since
+
+    return False
+
+
+def conditional(etag, build, private=False, last_modified=None):
+    """Returns a 304 if the client's copy matches, otherwise the response of build().
+
+    Successful responses carry the ETag, Last-Modified (a unix timestamp) when known and a
+    Cache-Control header that makes clients revalidate; per-user data is marked private so
+    shared proxies never store it.
+    """
+    if _is_fresh(etag, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = build()
+        if response.status_code != 200:
+            return response
+
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = datetime.datetime.utcfromtimestamp(int(last_modified))
+    response.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    return response
@@ -1,24 +1,36 @@
 """Contains all endpoints to manipulate meals, menu and orders information
 """
-from flask import jsonify, Blueprint, make_response, request
-from flask_restful import Resource, Api, reqparse, inputs, fields, marshal
-import jwt
+import itertools
+
+from flask import Blueprint, make_response, request, Response, current_app
+from flask_restful import Resource, Api, reqparse, inputs, fields
+from sqlalchemy import true
 
 import models
-import config
-from .auth import token_required, admin_required
+import catalogue
+from idempotency import idempotent
+from intake import order_intake
+from cache import menu_cache
+from json_backend import jsonify, dumps, output_json
+from .auth import token_required, admin_required, current_identity
+from .pagination import page_args, keyset_page, keyset_merge, with_query_cost
+from .streaming import stream_rows, stream_json
+from .conditional import conditional, row_etag, version_etag, if_match_versions
+from .serializers import Serializer
 
 meal_fields = {
     'id' : fields.Integer,
     'name': fields.String,
     'price': fields.Integer,
-    'in_menu': fields.Boolean
+    'in_menu': fields.Boolean,
+    'stock': fields.Integer(default=None)
 }
 
 menu_fields = {
     'id' : fields.Integer,
     'name': fields.String,
     'price': fields.Integer,
+    'sold_out': fields.Boolean
 }
 
 order_fields = {
@@ -31,6 +43,11 @@ order_fields = {
     'created_at' : fields.DateTime
 }
 
+meal_serializer = Serializer(meal_fields, models.Meal)
+menu_serializer = Serializer(menu_fields, models.Meal)
+order_serializer = Serializer(order_fields, models.Order)
+archive_serializer = Serializer(order_fields, models.OrderArchive)
+
 
 class MealList(Resource):
     """Contains GET and POST methods for manipulating meal information"""
@@ -56,6 +73,11 @@ class MealList(Resource):
             help='kindly provide a valid boolean value',
             type=inputs.boolean,
             location=['form', 'json'])
+        self.reqparse.add_argument(
+            'stock',
+            type=inputs.natural,
+            help='kindly provide a valid stock(a whole number, or null for no limit)',
+            location=['form', 'json'])
         super().__init__()
 
     @admin_required
@@ -65,14 +87,45 @@ class MealList(Resource):
         response = models.Meal.create_meal(
             name=kwargs.get('name'),
             price=kwargs.get('price'),
-            in_menu=kwargs.get('in_menu'))
+            in_menu=kwargs.get('in_menu'),
+            stock=kwargs.get('stock'))
         return response
 
     @admin_required
     def get(self):
-        """Gets all meals"""
-        meals = [marshal(meal, meal_fields) for meal in models.Meal.query.order_by(models.Meal.id.desc()).all()]
-        return make_response(jsonify({'meals': meals}), 200)
+        """Gets a page of meals, newest first"""
+        page = page_args()
+        rows, next_cursor = keyset_page(
+            meal_serializer.query(models.Meal.query), models.Meal.id, page['limit'], page['cursor'])
+        etag = row_etag(next_cursor, *rows)
+
+        def build():
+            """serialize the page"""
+            meals = [meal_serializer.encode(row) for row in rows]
+            return with_query_cost(make_response(jsonify({
+                'meals': meals, 'next_cursor': next_cursor}), 200))
+
+        return conditional(etag, build, private=True)
+
+
+class MealImport(Resource):
+    """Contains a POST method to import the meal catalogue in bulk"""
+
+
+    @admin_required
+    def post(self):
+        """Creates or updates meals from a CSV (text/csv) or NDJSON (application/x-ndjson)
+        upload sent as the request body"""
+        reader = catalogue.reader_for(request.mimetype)
+
+        if reader is None:
+            return make_response(jsonify({
+                "message" : "kindly upload the meals as text/csv or application/x-ndjson"}), 400)
+
+        report = catalogue.import_meals(reader(request.stream))
+        # the meals read before an unreadable part of the upload are kept, say how many
+        return make_response(jsonify(dict(report, message="{} meals created, {} updated, {} rows failed".format(
+            report['created'], report['updated'], len(report['errors'])))), 200 if report['complete'] else 400)
 
 
 class Meal(Resource):
@@ -104,18 +157,24 @@ class Meal(Resource):
     @admin_required
     def get(self, meal_id):
         """Get a particular meal"""
-        response = models.Meal.get_meal(meal_id)
-        return response
+        meal = models.Meal.query.get(meal_id)
+
+        if meal is None:
+            return models.Meal.get_meal(meal_id)
+
+        etag = version_etag(meal.id, meal.version, meal.stock)
+        return conditional(etag, lambda: models.Meal.get_meal(meal_id), private=True)
 
     @admin_required
     def put(self, meal_id):
-        """Update a particular meal"""
+        """Update a particular meal, only if it is still at the version sent in If-Match"""
         kwargs = self.reqparse.parse_args()
         response = models.Meal.update_meal(
             meal_id=meal_id,
             name=kwargs.get('name'),
             price=kwargs.get('price'),
-            in_menu=kwargs.get('in_menu'))
+            in_menu=kwargs.get('in_menu'),
+            versions=if_match_versions(meal_id))
         return response
 
     @admin_required
@@ -125,8 +184,30 @@ class Meal(Resource):
         return response
 
 
+class MealStock(Resource):
+    """Contains a PUT method for setting the stock of a meal"""
+
+
+    def __init__(self):
+        self.reqparse = reqparse.RequestParser()
+        self.reqparse.add_argument(
+            'stock',
+            required=True,
+            type=inputs.natural,
+            help='kindly provide a valid stock(a whole number, or null for no limit)',
+            location=['form', 'json'])
+        super().__init__()
+
+    @admin_required
+    def put(self, meal_id):
+        """Sets the portions of a meal left to sell"""
+        kwargs = self.reqparse.parse_args()
+        response = models.Meal.set_stock(meal_id=meal_id, stock=kwargs.get('stock'))
+        return response
+
+
 class MenuList(Resource):
-    """Contains GET and POST methods for manipulating the menu"""
+    """Contains GET, POST and PUT methods for manipulating the menu"""
     
     def __init__(self):
         self.reqparse = reqparse.RequestParser()
@@ -136,6 +217,15 @@ class MenuList(Resource):
             type=int,
             help='kindly provide a valid meal_id',
             location=['form', 'json'])
+        self.replace_parser = reqparse.RequestParser()
+        # not required, reqparse would reject the empty list that clears the menu
+        self.replace_parser.add_argument(
+            'meal_ids',
+            type=int,
+            nullable=False,
+            action='append',
+            help='kindly provide a valid list of meal_ids',
+            location='json')
         super().__init__()
 
     @admin_required
@@ -145,11 +235,43 @@ class MenuList(Resource):
         response = models.Meal.add_to_menu(meal_id=kwargs.get('meal_id'))
         return response
 
+    @admin_required
+    def put(self):
+        """Replaces the whole menu with the given meals at once"""
+        kwargs = self.replace_parser.parse_args()
+        meal_ids = kwargs.get('meal_ids')
+
+        if meal_ids is None:
+            if (request.get_json(silent=True) or {}).get('meal_ids') != []:
+                return make_response(jsonify({
+                    "message" : {"meal_ids" : "kindly provide a valid list of meal_ids"}}), 400)
+            meal_ids = []
+
+        response = models.Meal.replace_menu(meal_ids=meal_ids)
+        return response
+
     @token_required
     def get(self):
         """Gets all meals on the menu"""
-        menus = [marshal(menu, menu_fields) for menu in models.Meal.query.filter_by(in_menu=True).all()]
-        return make_response(jsonify({'menu': menus}), 200)
+        cached, hit = menu_cache().get(self.serialize)
+
+        def build():
+            """serve the cached body"""
+            return Response(cached.body, status=200, mimetype='application/json')
+
+        response = conditional(cached.etag, build, last_modified=cached.last_modified)
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    @staticmethod
+    def serialize():
+        """Returns the menu as a JSON document, read from the primary as every user is served
+        the cached copy and a lagging replica would keep the menu from before the last write"""
+        with current_app.extensions['replica_router'].primary():
+            # compare with a literal so the partial index on in_menu can be used
+            rows = menu_serializer.query(models.Meal.query).filter(models.Meal.in_menu == true()).all()
+        menus = [menu_serializer.encode(row) for row in rows]
+        return dumps({'menu': menus}) + b'\n'
 
 
 class Menu(Resource):
@@ -159,8 +281,13 @@ class Menu(Resource):
     @token_required
     def get(self, meal_id):
         """Get a particular meal on the menu"""
-        response = models.Meal.get_menu(meal_id)
-        return response
+        meal = models.Meal.query.get(meal_id)
+
+        if meal is None or not meal.in_menu:
+            return models.Meal.get_menu(meal_id)
+
+        etag = row_etag(meal.id, meal.name, meal.price, meal.in_menu, meal.sold_out)
+        return conditional(etag, lambda: models.Meal.get_menu(meal_id))
 
     @admin_required
     def delete(self, meal_id):
@@ -185,29 +312,126 @@ class OrderList(Resource):
         super().__init__()
 
     @token_required
+    @idempotent
     def post(self):
         """Creates a new order"""
         kwargs = self.reqparse.parse_args()
-        token = request.headers['x-access-token']
-        data = jwt.decode(token, config.Config.SECRET_KEY)
-        user_id = data['id']
+        user_id = current_identity().id
+        intake = order_intake()
+
+        if intake is not None:
+            current_app.extensions['replica_router'].wrote()
+            return models.Order.queue_order(
+                user_id=user_id, meal_id=kwargs.get('meal_id'), intake=intake)
+
         response = models.Order.create_order(user_id=user_id, meal_id=kwargs.get('meal_id'))
         return response
 
     @token_required
     def get(self):
-        """Gets all orders for admin and get all orders belonging to the current authenticated user"""
-        token = request.headers['x-access-token']
-        data = jwt.decode(token, config.Config.SECRET_KEY)
-        admin = data['admin']
-        user_id = data['id']
-        user_orders = [marshal(order, order_fields) for order in models.Order.query.filter_by(user_id=user_id).all()]
+        """Gets a page of all orders for admin or of the orders belonging to the current
+        authenticated user, newest first. Pass stream=1 to get every order in one streamed response"""
+        identity = current_identity()
+        page = page_args()
+
+        # orders moved to the archive are older than every live order, so they come last
+        sources = [(order_serializer.query(models.Order.query), models.Order),
+                   (archive_serializer.query(models.OrderArchive.query), models.OrderArchive)]
+
+        if identity.admin:
+            key = 'orders'
+        else:
+            key = 'your orders'
+            sources = [(query.filter(model.user_id == identity.id), model) for query, model in sources]
+
+        if request.args.get('stream', default=False, type=inputs.boolean):
+            if page['cursor'] is not None:
+                sources = [(query.filter(model.id < page['cursor']), model) for query, model in sources]
+            rows = itertools.chain.from_iterable(stream_rows(query, model.id) for query, model in sources)
+            return stream_json(key, rows, order_serializer.encode)
+
+        rows, next_cursor = keyset_merge(
+            [(query, model.id) for query, model in sources], page['limit'], page['cursor'])
+        etag = row_etag(key, next_cursor, *rows)
+
+        def build():
+            """serialize the page"""
+            orders = [order_serializer.encode(row) for row in rows]
+            return with_query_cost(make_response(jsonify({
+                key: orders, 'next_cursor': next_cursor}), 200))
+
+        return conditional(etag, build, private=True)
+
+
+class OrderBatch(Resource):
+    """Contains a POST method to place several orders at once"""
 
-        if admin:
-            orders = [marshal(order, order_fields) for order in models.Order.query.order_by(models.Order.id.desc()).all()]
-            return make_response(jsonify({'orders': orders}), 200)
 
-        return make_response(jsonify({'your orders': user_orders}), 200)
+    def __init__(self):
+        self.reqparse = reqparse.RequestParser()
+        self.reqparse.add_argument(
+            'meal_ids',
+            required=True,
+            type=int,
+            action='append',
+            help='kindly provide a valid list of meal_ids',
+            location='json')
+        self.reqparse.add_argument(
+            'user_ids',
+            type=int,
+            action='append',
+            help='kindly provide a valid list of user_ids',
+            location='json')
+        super().__init__()
+
+    @token_required
+    @idempotent
+    def post(self):
+        """Creates one order per meal_id in a single transaction, admins may pass the
+        user_id of each order in user_ids"""
+        kwargs = self.reqparse.parse_args()
+        identity = current_identity()
+        meal_ids = kwargs.get('meal_ids')
+        user_ids = kwargs.get('user_ids')
+
+        if len(meal_ids) > current_app.config['ORDER_BATCH_LIMIT']:
+            return make_response(jsonify({
+                "message" : "kindly provide at most {} meal_ids".format(
+                    current_app.config['ORDER_BATCH_LIMIT'])}), 400)
+
+        if user_ids is None:
+            user_ids = [identity.id] * len(meal_ids)
+        elif not identity.admin:
+            return make_response(jsonify({
+                "message" : "you are not authorized to place orders for other users as a non-admin user"}), 401)
+        elif len(user_ids) != len(meal_ids):
+            return make_response(jsonify({
+                "message" : "kindly provide one user_id for each meal_id"}), 400)
+
+        results = models.Order.create_orders(list(zip(meal_ids, user_ids)))
+        created = sum(1 for _, status in results if status == 201)
+        orders = [dict(result, status=status) for result, status in results]
+        return make_response(jsonify({
+            "message" : "{} of {} orders have been successfully created".format(created, len(results)),
+            "orders" : orders}), 201 if created else 400)
+
+
+class QueuedOrder(Resource):
+    """Contains a GET method to follow an order the intake accepted with a 202"""
+
+
+    @token_required
+    def get(self, ticket):
+        """Gets the outcome of a queued order, by the ticket of its 202 response"""
+        intake = current_app.extensions.get('order_intake')
+        tracked = intake.tracked(ticket) if intake is not None else None
+        identity = current_identity()
+
+        if tracked is None or (tracked[0]["user_id"] != identity.id and not identity.admin):
+            return make_response(jsonify({
+                "message" : "kindly provide a ticket of a recent order, this one is unknown"}), 404)
+
+        return models.Order.queued_result(tracked[1], status=200)
 
 
 class Order(Resource):
@@ -227,30 +451,27 @@ class Order(Resource):
     @token_required
     def get(self, order_id):
         """Get a particular order"""
-        token = request.headers['x-access-token']
-        data = jwt.decode(token, config.Config.SECRET_KEY)
-        admin = data['admin']
-        user_id = data['id']
-        order = models.Order.query.filter_by(user_id=user_id, id=order_id).first()
-        response = models.Order.get_order(order_id)
-
-        if admin:
-            return response
+        identity = current_identity()
+        order = models.Order.find(order_id)
 
-        if order is None:
+        if not identity.admin and (order is None or order.user_id != identity.id):
             return make_response(jsonify({
                 "message" : "order does not exists or it does not belong to you"}), 404)
 
-        return response
+        if order is None:
+            return models.Order.get_order(order_id)
+
+        etag = version_etag(order.id, order.version)
+        return conditional(etag, lambda: models.Order.get_order(order_id), private=True)
 
     @token_required
+    @idempotent
     def put(self, order_id):
-        """Update a particular order"""
+        """Update a particular order, only if it is still at the version sent in If-Match"""
         kwargs = self.reqparse.parse_args()
-        token = request.headers['x-access-token']
-        data = jwt.decode(token, config.Config.SECRET_KEY)
-        admin = data['admin']
-        user_id = data['id']
+        identity = current_identity()
+        admin = identity.admin
+        user_id = identity.id
         order = models.Order.query.get(order_id)
 
         if order is None:
@@ -258,7 +479,7 @@ class Order(Resource):
 
         if admin or order.user_id == user_id:
             response = models.Order.update_order(
-                order_id=order_id, meal_id=kwargs.get('meal_id'))
+                order_id=order_id, meal_id=kwargs.get('meal_id'), versions=if_match_versions(order_id))
             return response
 
         return make_response(jsonify({
@@ -267,10 +488,9 @@ class Order(Resource):
     @token_required
     def delete(self, order_id):
         """Delete a particular order"""
-        token = request.headers['x-access-token']
-        data = jwt.decode(token, config.Config.SECRET_KEY)
-        admin = data['admin']
-        user_id = data['id']
+        identity = current_identity()
+        admin = identity.admin
+        user_id = identity.id
         order = models.Order.query.get(order_id)
 
         if order is None:
@@ -285,11 +505,16 @@ class Order(Resource):
 
 meals_api = Blueprint('resources.meals', __name__)
 api = Api(meals_api) # create the API
+api.representation('application/json')(output_json)
 api.add_resource(MealList, '/meals', endpoint='meals')
+api.add_resource(MealImport, '/meals/import', endpoint='meal_import')
 api.add_resource(Meal, '/meals/<int:meal_id>', endpoint='meal')
+api.add_resource(MealStock, '/meals/<int:meal_id>/stock', endpoint='meal_stock')
 
 api.add_resource(MenuList, '/menu', endpoint='menus')
 api.add_resource(Menu, '/menu/<int:meal_id>', endpoint='menu')
 
 api.add_resource(OrderList, '/orders', endpoint='orders')
+api.add_resource(OrderBatch, '/orders/batch', endpoint='order_batch')
+api.add_resource(QueuedOrder, '/orders/queued/<ticket>', endpoint='queued_order')
 api.add_resource(Order, '/orders/<int:order_id>', endpoint='order')
@@ -0,0 +1,114 @@
+"""Contains keyset pagination helpers shared by the list endpoints and the query cost
+counters reported in the X-Query-Count and X-Query-Time response headers.
+
+Pages are always walked backwards over the primary key (newest first) with a
+WHERE id < :cursor predicate so no page ever needs an OFFSET scan.
+"""
+import base64
+import binascii
+import json
+import time
+
+from flask import g, has_app_context
+from flask_restful import reqparse, inputs
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def encode_cursor(last_id):
+    """Returns an opaque cursor pointing just past the row with the given id"""
+    raw = json.dumps({'id' : last_id}).encode('UTF-8')
+    return base64.urlsafe_b64encode(raw).decode('UTF-8').rstrip('=')
+
+
+def decode_cursor(value):
+    """Returns the id carried by a cursor, raises ValueError for anything else"""
+    padded = value + '=' * (-len(value) % 4)
+    try:
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('UTF-8')).decode('UTF-8'))
+        last_id = data['id']
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise ValueError('invalid cursor')
+
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise ValueError('invalid cursor')
+    return last_id
+
+
+def page_args():
+    """Parses the limit and cursor query string arguments"""
+    parser = reqparse.RequestParser()
+    parser.add_argument(
+        'limit',
+        default=DEFAULT_LIMIT,
+        type=inputs.int_range(1, MAX_LIMIT),
+        help='kindly provide a limit between 1 and {}'.format(MAX_LIMIT),
+        location='args')
+    parser.add_argument(
+        'cursor',
+        type=decode_cursor,
+        help='kindly provide a valid cursor',
+        location='args')
+    return parser.parse_args()
+
+
+def keyset_page(query, column, limit, cursor=None):
+    """Returns one page of rows ordered by column descending and the cursor of the next page"""
+    if cursor is not None:
+        query = query.filter(column < cursor)
+
+    rows = query.order_by(column.desc()).limit(limit + 1).all()
+    next_cursor = None
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], column.key))
+
+    return rows, next_cursor
+
+
+def keyset_merge(sources, limit, cursor=None):
+    """Like keyset_page over several (query, column) sources holding different ids, such as
+    live and archived rows. Each source is read with its own range scan and the rows merged"""
+    rows = []
+    for query, column in sources:
+        if cursor is not None:
+            query = query.filter(column < cursor)
+        rows.extend(query.order_by(column.desc()).limit(limit + 1).all())
+
+    key = sources[0][1].key
+    rows.sort(key=lambda row: getattr(row, key), reverse=True)
+    next_cursor = None
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], key))
+
+    return rows, next_cursor
+
+
+def with_query_cost(response):
+    """Adds the number of statements run and their total time so far to the response headers"""
+    if has_app_context():
+        response.headers['X-Query-Count'] = str(g.get('query_count', 0))
+        response.headers['X-Query-Time'] = '{:.3f}ms'.format(g.get('query_time', 0.0) * 1000)
+    return response
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany): # pylint: disable=W0613
+    """Remember when the statement started"""
+    conn.info['query_started'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany): # pylint: disable=W0613
+    """Add the statement to the cost of the current request"""
+    elapsed = time.perf_counter() - conn.info['query_started']
+
+    if has_app_context():
+        g.query_count = g.get('query_count', 0) + 1
+        g.query_time = g.get('query_time', 0.0) + elapsed
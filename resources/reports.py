@@ -0,0 +1,106 @@
+"""Contains the sales reports for administrators, read from pre-aggregated tables, and the
+export of the orders themselves
+"""
+import datetime
+import itertools
+
+from flask import Blueprint, make_response, request
+from flask_restful import Resource, Api, reqparse, inputs
+
+import models
+from json_backend import jsonify, output_json
+from .auth import admin_required
+from .conditional import conditional, row_etag
+from .streaming import stream_rows, stream_csv
+
+EXPORT_COLUMNS = ('id', 'meal_name', 'price', 'user_email', 'created_at')
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+
+
+def date_range(default_days=DEFAULT_DAYS, max_days=MAX_DAYS):
+    """Parses the from and to query string dates, both included, defaulting to the last
+    default_days days. Returns (start, end) or an error response"""
+    parser = reqparse.RequestParser()
+    parser.add_argument(
+        'from',
+        type=inputs.date,
+        help='kindly provide from as a date like 2018-06-01',
+        location='args')
+    parser.add_argument(
+        'to',
+        type=inputs.date,
+        help='kindly provide to as a date like 2018-06-30',
+        location='args')
+    kwargs = parser.parse_args()
+
+    end = kwargs.get('to').date() if kwargs.get('to') else datetime.datetime.utcnow().date()
+    start = kwargs.get('from').date() if kwargs.get('from') else end - datetime.timedelta(days=default_days - 1)
+
+    if start > end:
+        return None, make_response(jsonify({"message" : "kindly ensure that from is not after to"}), 400)
+
+    if max_days is not None and (end - start).days >= max_days:
+        return None, make_response(jsonify({
+            "message" : "kindly request at most {} days at a time".format(max_days)}), 400)
+
+    return (start, end), None
+
+
+class DailyReport(Resource):
+    """Contains a GET method for the daily sales totals"""
+
+
+    @admin_required
+    def get(self):
+        """Gets the orders and revenue per day and meal between from and to"""
+        dates, error = date_range()
+
+        if error is not None:
+            return error
+
+        start, end = dates
+        days = models.DailySales.between(start, end)
+        return conditional(
+            row_etag(start, end, days),
+            lambda: make_response(jsonify({
+                "from" : start.isoformat(), "to" : end.isoformat(), "days" : days}), 200),
+            private=True)
+
+
+class OrderExport(Resource):
+    """Contains a GET method to download orders as CSV"""
+
+
+    @admin_required
+    def get(self):
+        """Streams the orders placed between from and to, oldest first, as CSV. The file is
+        gzipped for clients that accept it"""
+        dates, error = date_range(max_days=None)
+
+        if error is not None:
+            return error
+
+        start, end = dates
+        # archived orders are older than every live order, so they come first
+        rows = itertools.chain.from_iterable(
+            stream_rows(models.db.session.query(
+                *[getattr(model, column) for column in EXPORT_COLUMNS]).filter(
+                    model.created_at >= start,
+                    model.created_at < end + datetime.timedelta(days=1)), model.id, newest_first=False)
+            for model in (models.OrderArchive, models.Order))
+        rows = ((order_id, meal_name, price, user_email, created_at.isoformat() if created_at else '')
+                for order_id, meal_name, price, user_email, created_at in rows)
+
+        return stream_csv(
+            EXPORT_COLUMNS, rows,
+            filename='orders-{}-{}.csv'.format(start.isoformat(), end.isoformat()),
+            compress=request.accept_encodings['gzip'] > 0)
+
+
+reports_api = Blueprint('resources.reports', __name__)
+api = Api(reports_api)
+api.representation('application/json')(output_json)
+api.add_resource(DailyReport, '/reports/daily', endpoint='daily_report')
+api.add_resource(OrderExport, '/orders/export.csv', endpoint='order_export')
@@ -0,0 +1,68 @@
+"""Contains serializers that turn flask_restful field specs into specialised row encoders.
+
+flask_restful.marshal walks the field dict and builds an OrderedDict for every object.
+A Serializer does that walk once, at import, and generates a function that maps a row
+tuple (fetched with only the needed columns) straight to a dict producing the same JSON.
+"""
+from calendar import timegm
+from email.utils import formatdate
+
+from flask_restful import fields
+
+
+def _rfc822(value):
+    """Formats a datetime the way fields.DateTime does by default"""
+    return formatdate(timegm(value.utctimetuple()))
+
+
+# formatter applied to a non-null value, None when the database value can be used as is
+_FORMATTERS = {
+    fields.Integer: None,
+    fields.String: None,
+    fields.Boolean: bool,
+    fields.DateTime: _rfc822,
+}
+
+
+class Serializer(object):
+    """Encodes rows selected with the columns backing a field spec"""
+
+
+    def __init__(self, spec, model):
+        # like marshal, accept both field classes and field instances
+        spec = [(key, field() if isinstance(field, type) else field) for key, field in spec.items()]
+        self.keys = [key for key, _ in spec]
+        self.columns = [getattr(model, field.attribute or key) for key, field in spec]
+        self.encode = self._compile(spec)
+
+    def query(self, query):
+        """Restricts a query to the columns of the field spec"""
+        return query.with_entities(*self.columns)
+
+    def _compile(self, spec):
+        """Generates encode(row) for the field spec"""
+        namespace = {}
+        lines = ['def encode(row):', '    return {']
+
+        for index, (key, field) in enumerate(spec):
+            field_class = type(field)
+            if field_class not in _FORMATTERS:
+                raise TypeError('cannot compile field {!r} of type {}'.format(key, field_class.__name__))
+            if field_class is fields.DateTime and field.dt_format != 'rfc822':
+                raise TypeError('cannot compile field {!r} with format {}'.format(key, field.dt_format))
+
+            value = 'row[{}]'.format(index)
+            formatter = _FORMATTERS[field_class]
+            if formatter is not None:
+                namespace['format_{}'.format(index)] = formatter
+                value = 'format_{}({})'.format(index, value)
+
+            if formatter is not None or field.default is not None:
+                namespace['default_{}'.format(index)] = field.default
+                value = 'default_{0} if row[{0}] is None else {1}'.format(index, value)
+
+            lines.append('        {!r}: {},'.format(key, value))
+
+        lines.append('    }')
+        exec('\n'.join(lines), namespace) # pylint: disable=W0122
+        return namespace['encode']
@@ -0,0 +1,76 @@
+"""Contains helpers to stream large listings as JSON or CSV without building them in memory
+"""
+import csv
+import io
+import zlib
+
+from flask import Response, stream_with_context
+
+from json_backend import dumps
+
+STREAM_BATCH = 1000
+
+
+def stream_rows(query, column, newest_first=True):
+    """Iterates over a query ordered by column, fetching rows in batches through a server-side cursor"""
+    return query.order_by(column.desc() if newest_first else column).yield_per(STREAM_BATCH)
+
+
+def stream_json(key, rows, serialize):
+    """Returns a response that writes {key: [...]} incrementally, one batch of rows at a time"""
+
+    def generate():
+        """yield the JSON document in chunks"""
+        yield b'{' + dumps(key) + b':['
+        chunk = []
+        separator = b''
+
+        for row in rows:
+            chunk.append(separator + dumps(serialize(row)))
+            separator = b','
+
+            if len(chunk) >= STREAM_BATCH:
+                yield b''.join(chunk)
+                chunk = []
+
+        chunk.append(b']}')
+        yield b''.join(chunk)
+
+    return Response(stream_with_context(generate()), status=200, mimetype='application/json')
+
+
+def stream_csv(header, rows, filename, compress=False):
+    """Returns a response that writes a CSV file one batch of rows at a time, gzipped when
+    compress is set"""
+
+    def generate():
+        """yield the CSV document in chunks"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+
+        for count, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if count % STREAM_BATCH == 0:
+                yield buffer.getvalue().encode('UTF-8')
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue().encode('UTF-8')
+
+    def gzipped(chunks):
+        """compress the chunks into a single gzip stream"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    body = gzipped(generate()) if compress else generate()
+    response = Response(stream_with_context(body), status=200, mimetype='text/csv')
+    response.headers['Content-Disposition'] = 'attachment; filename={}'.format(filename)
+    response.headers['Vary'] = 'Accept-Encoding'
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
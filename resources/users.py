@@ -2,14 +2,19 @@
 """
 import datetime
 
-from flask import Blueprint, jsonify, make_response, request, current_app
-from flask_restful import Resource, Api, reqparse, inputs, marshal, fields
+from flask import Blueprint, make_response, current_app
+from flask_restful import Resource, Api, reqparse, inputs, fields
 from werkzeug.security import check_password_hash
 import jwt
 
 import models
 import config
-from .auth import admin_required, token_required
+from json_backend import jsonify, output_json
+from .auth import admin_required, token_required, current_identity
+from .pagination import page_args, keyset_page, keyset_merge, with_query_cost
+from .conditional import conditional, row_etag
+from .serializers import Serializer
+from .meals import order_serializer, archive_serializer
 
 
 user_fields = {
@@ -20,6 +25,10 @@ user_fields = {
     'orders' : fields.List(fields.String) # list of strings
 }
 
+# orders are not a column, they are looked up for the whole page at once
+user_serializer = Serializer(
+    {key : field for key, field in user_fields.items() if key != 'orders'}, models.User)
+
 
 class Signup(Resource):
     "Contains a POST method to register a new user"
@@ -176,9 +185,21 @@ class UserList(Resource):
 
     @admin_required
     def get(self):
-        """Get all users"""
-        users = [marshal(user, user_fields) for user in models.User.query.order_by(models.User.id.desc()).all()]
-        return make_response(jsonify({'users': users}), 200)
+        """Get a page of users, newest first"""
+        page = page_args()
+        rows, next_cursor = keyset_page(
+            user_serializer.query(models.User.query), models.User.id, page['limit'], page['cursor'])
+        # load the orders of the whole page in one extra query instead of one per user
+        orders = models.Order.labels_by_user([row.id for row in rows])
+        etag = row_etag(next_cursor, *[(row, orders[row.id]) for row in rows])
+
+        def build():
+            """serialize the page"""
+            users = [dict(user_serializer.encode(row), orders=orders[row.id]) for row in rows]
+            return with_query_cost(make_response(jsonify({
+                'users': users, 'next_cursor': next_cursor}), 200))
+
+        return conditional(etag, build, private=True)
 
 
 class User(Resource):
@@ -226,8 +247,16 @@ class User(Resource):
     @admin_required
     def get(self, user_id):
         """Get a particular user"""
-        response = models.User.get_user(user_id)
-        return response
+        user = models.User.query.get(user_id)
+
+        if user is None:
+            return models.User.get_user(user_id)
+
+        info = models.User.user_info(user)
+        return conditional(
+            row_etag(sorted(info.items())),
+            lambda: make_response(jsonify({user.id : info}), 200),
+            private=True)
 
     @admin_required
     def put(self, user_id):
@@ -250,13 +279,11 @@ class User(Resource):
     @token_required
     def delete(self, user_id):
         """Delete a particular user"""
-        token = request.headers['x-access-token']
-        data = jwt.decode(token, config.Config.SECRET_KEY)
-        admin = data['admin']
-        token_user_id = data['id']
-        user = models.User.query.get(user_id)
+        identity = current_identity()
+        admin = identity.admin
+        token_user_id = identity.id
 
-        if admin or user.id == token_user_id:
+        if admin or user_id == token_user_id:
             response = models.User.delete_user(user_id)
             return response
 
@@ -264,6 +291,39 @@ class User(Resource):
             "message" : "sorry, you cannot delete this account since it does not belong to you"}), 401)
 
 
+class UserOrders(Resource):
+    """Contains a GET method for listing the orders of a particular user"""
+
+
+    @token_required
+    def get(self, user_id):
+        """Gets a page of the orders of a user, newest first. Users may only list their own"""
+        identity = current_identity()
+
+        if not identity.admin and identity.id != user_id:
+            return make_response(jsonify({
+                "message" : "sorry, you cannot view the orders of this user since it is not you"}), 401)
+
+        if models.User.query.get(user_id) is None:
+            return make_response(jsonify({"message" : "user does not exists"}), 404)
+
+        page = page_args()
+        rows, next_cursor = keyset_merge(
+            [(serializer.query(model.query).filter(model.user_id == user_id), model.id)
+             for serializer, model in ((order_serializer, models.Order),
+                                       (archive_serializer, models.OrderArchive))],
+            page['limit'], page['cursor'])
+        etag = row_etag(next_cursor, *rows)
+
+        def build():
+            """serialize the page"""
+            orders = [order_serializer.encode(row) for row in rows]
+            return with_query_cost(make_response(jsonify({
+                'orders': orders, 'next_cursor': next_cursor}), 200))
+
+        return conditional(etag, build, private=True)
+
+
 class ResetPassword(Resource):
     "Contains a POST method to reset your password"
 
@@ -295,9 +355,7 @@ class ResetPassword(Resource):
     def post(self):
         """Reset user's password"""
         kwargs = self.reqparse.parse_args()
-        token = request.headers['x-access-token']
-        data = jwt.decode(token, config.Config.SECRET_KEY)
-        user_id = data['id']
+        user_id = current_identity().id
         user = models.User.query.get(user_id)
 
         if check_password_hash(user.password, kwargs.get('current_password')):
@@ -332,9 +390,11 @@ class TestAdmin(Resource):
 
 users_api = Blueprint('resources.users', __name__)
 api = Api(users_api)
+api.representation('application/json')(output_json)
 api.add_resource(Signup, '/auth/signup', endpoint='signup')
 api.add_resource(Login, '/auth/login', endpoint='login')
 api.add_resource(UserList, '/users', endpoint='users')
 api.add_resource(User, '/users/<int:user_id>', endpoint='user')
+api.add_resource(UserOrders, '/users/<int:user_id>/orders', endpoint='user_orders')
 api.add_resource(ResetPassword, '/auth/reset', endpoint='reset')
 api.add_resource(TestAdmin, '/create_test_admin', endpoint='create_test_admin')
@@ -84,6 +84,22 @@ class BaseTests(unittest.TestCase):
                 content_type='application/json',
                 headers=self.user_header)
 
+    def place_order(self, meal_id=2, client=None, header=None, key=None):
+        """Places an order, as the user unless header is given and with an Idempotency-Key
+        when key is given"""
+        headers = dict(header or self.user_header)
+        if key is not None:
+            headers["Idempotency-Key"] = key
+        return (client or self.app).post(
+            '/api/v3/orders', data=json.dumps({"meal_id" : meal_id}),
+            content_type='application/json',
+            headers=headers)
+
+    def count_orders(self):
+        """Counts the rows of the order table"""
+        with self.application.app_context():
+            return models.Order.query.count()
+
     def tearDown(self):
         with self.application.app_context():
             models.db.session.remove()
@@ -0,0 +1,68 @@
+"""Test moving old orders to the archive and reading them back
+"""
+import unittest
+import datetime
+import json
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+from .base_test import BaseTests
+
+
+class ArchiveTests(BaseTests):
+    """Tests functionality of the order archive"""
+
+
+    def setUp(self):
+        """Place a few more orders and archive all but the newest"""
+        super().setUp()
+        self.app.post(
+            '/api/v3/orders/batch', data=json.dumps({"meal_ids" : [2, 2, 2, 2]}),
+            headers=self.user_header)
+        with self.application.app_context():
+            before = datetime.datetime.utcnow() + datetime.timedelta(days=1)
+            self.moved = models.Order.archive(before, batch_size=2)
+
+    def test_archive_moves_orders(self):
+        """Test that old orders are moved in batches and the newest one stays"""
+        self.assertEqual(self.moved, 4)
+        with self.application.app_context():
+            self.assertEqual([order.id for order in models.Order.query], [5])
+            self.assertEqual(models.OrderArchive.query.count(), 4)
+            self.assertEqual(models.Order.archive(datetime.datetime.utcnow()), 0)
+
+    def test_get_archived_order(self):
+        """Test that archived orders are still found by id"""
+        response = self.app.get('/api/v3/orders/1', headers=self.user_header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['1']['meal_name'], 'chapo')
+
+    def test_archived_order_is_read_only(self):
+        """Test that archived orders cannot be updated"""
+        response = self.app.put(
+            '/api/v3/orders/1', data=json.dumps({"meal_id" : 2}), headers=self.user_header)
+        self.assertEqual(response.status_code, 404)
+
+    def test_listing_includes_archive(self):
+        """Test that listings page through live and then archived orders"""
+        response = self.app.get('/api/v3/orders?limit=3', headers=self.admin_header)
+        page = json.loads(response.get_data(as_text=True))
+        self.assertEqual([order['id'] for order in page['orders']], [5, 4, 3])
+        response = self.app.get(
+            '/api/v3/orders?limit=3&cursor={}'.format(page['next_cursor']), headers=self.admin_header)
+        page = json.loads(response.get_data(as_text=True))
+        self.assertEqual([order['id'] for order in page['orders']], [2, 1])
+        self.assertIsNone(page['next_cursor'])
+
+        response = self.app.get('/api/v3/orders?stream=1', headers=self.user_header)
+        orders = json.loads(response.get_data(as_text=True))['your orders']
+        self.assertEqual([order['id'] for order in orders], [5, 4, 3, 2, 1])
+
+    def test_rebuild_includes_archive(self):
+        """Test that rebuilt daily totals still count archived orders"""
+        with self.application.app_context():
+            models.DailySales.rebuild()
+            self.assertEqual(models.DailySales.query.one().orders, 5)
@@ -0,0 +1,70 @@
+"""Test the token verification layer shared by all protected endpoints
+"""
+import unittest
+import datetime
+import time
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+
+import config
+from resources.auth import Identity, TokenCache, token_cache
+from .base_test import BaseTests
+
+
+class AuthTests(BaseTests):
+    """Tests functionality of the token_required and admin_required decorators"""
+
+
+    def test_verified_token_is_cached(self):
+        """Test that a verified token is served from the cache on later requests"""
+        token = self.user_header["x-access-token"]
+        token_cache.clear()
+        response = self.app.get('/api/v3/orders', headers=self.user_header)
+        self.assertEqual(response.status_code, 200)
+        identity = token_cache.get(token)
+        self.assertIsNotNone(identity)
+        self.assertFalse(identity.admin)
+
+    def test_expired_token(self):
+        """Test that an expired token is rejected"""
+        token = jwt.encode({
+            'id' : 1,
+            'admin' : True,
+            'exp' : datetime.datetime.utcnow() - datetime.timedelta(minutes=1)},
+                           config.Config.SECRET_KEY).decode('UTF-8')
+        header = {"Content-Type" : "application/json", "x-access-token" : token}
+        response = self.app.get('/api/v3/users', headers=header)
+        self.assertEqual(response.status_code, 401)
+
+    def test_token_missing_claims(self):
+        """Test that a correctly signed token without the admin claim is rejected"""
+        token = jwt.encode({
+            'id' : 1,
+            'exp' : datetime.datetime.utcnow() + datetime.timedelta(minutes=1)},
+                           config.Config.SECRET_KEY).decode('UTF-8')
+        header = {"Content-Type" : "application/json", "x-access-token" : token}
+        response = self.app.get('/api/v3/orders', headers=header)
+        self.assertEqual(response.status_code, 401)
+
+    def test_cache_evicts_at_expiry(self):
+        """Test that the cache stops serving an identity once it has expired"""
+        cache = TokenCache()
+        cache.put('a.b.c', Identity(id=1, admin=False, exp=int(time.time()) - 1))
+        self.assertIsNone(cache.get('a.b.c'))
+
+    def test_cache_is_bounded(self):
+        """Test that the cache drops the oldest token when it is full"""
+        cache = TokenCache(max_size=2)
+        exp = int(time.time()) + 60
+        for number in range(3):
+            cache.put('a.b.{}'.format(number), Identity(id=number, admin=False, exp=exp))
+        self.assertIsNone(cache.get('a.b.0'))
+        self.assertEqual(cache.get('a.b.2').id, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Test the batch orders endpoint and covers most edge cases
+"""
+import unittest
+import json
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .base_test import BaseTests
+
+
+class BatchOrdersTests(BaseTests):
+    """Tests functionality of the batch orders endpoint"""
+
+
+    def test_successful_creation(self):
+        """Test a user placing several orders at once"""
+        data = json.dumps({"meal_ids" : [2, 2, 2]})
+        response = self.app.post(
+            '/api/v3/orders/batch', data=data,
+            content_type='application/json',
+            headers=self.user_header)
+        self.assertEqual(response.status_code, 201)
+        orders = json.loads(response.get_data(as_text=True))['orders']
+        self.assertEqual([order['order_id'] for order in orders], [2, 3, 4])
+        self.assertEqual({order['user_id'] for order in orders}, {2})
+
+        response = self.app.get('/api/v3/orders', headers=self.user_header)
+        self.assertEqual(len(json.loads(response.get_data(as_text=True))['your orders']), 4)
+
+    def test_per_item_results(self):
+        """Test that each order reports its own result in the order it was given"""
+        data = json.dumps({"meal_ids" : [1, 2, 57]})
+        response = self.app.post(
+            '/api/v3/orders/batch', data=data,
+            content_type='application/json',
+            headers=self.user_header)
+        self.assertEqual(response.status_code, 201)
+        orders = json.loads(response.get_data(as_text=True))['orders']
+        self.assertEqual([order['status'] for order in orders], [400, 201, 404])
+
+    def test_none_created(self):
+        """Test a batch in which no order could be created"""
+        data = json.dumps({"meal_ids" : [1]})
+        response = self.app.post(
+            '/api/v3/orders/batch', data=data,
+            content_type='application/json',
+            headers=self.user_header)
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_for_other_users(self):
+        """Test an admin placing orders on behalf of other users"""
+        data = json.dumps({"meal_ids" : [2, 2], "user_ids" : [1, 2]})
+        response = self.app.post(
+            '/api/v3/orders/batch', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 201)
+        orders = json.loads(response.get_data(as_text=True))['orders']
+        self.assertEqual([order['user_id'] for order in orders], [1, 2])
+
+    def test_user_for_other_users(self):
+        """Test a non-admin trying to place orders for someone else"""
+        data = json.dumps({"meal_ids" : [2], "user_ids" : [1]})
+        response = self.app.post(
+            '/api/v3/orders/batch', data=data,
+            content_type='application/json',
+            headers=self.user_header)
+        self.assertEqual(response.status_code, 401)
+
+    def test_mismatched_user_ids(self):
+        """Test an admin giving a different number of user_ids and meal_ids"""
+        data = json.dumps({"meal_ids" : [2, 2], "user_ids" : [1]})
+        response = self.app.post(
+            '/api/v3/orders/batch', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 400)
+
+    def test_too_many(self):
+        """Test a batch larger than the configured limit"""
+        data = json.dumps({"meal_ids" : [2] * 101})
+        response = self.app.post(
+            '/api/v3/orders/batch', data=data,
+            content_type='application/json',
+            headers=self.user_header)
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_meal_ids(self):
+        """Test a batch with a meal_id that is not a number"""
+        data = json.dumps({"meal_ids" : [2, "chapo"]})
+        response = self.app.post(
+            '/api/v3/orders/batch', data=data,
+            content_type='application/json',
+            headers=self.user_header)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
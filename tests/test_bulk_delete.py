@@ -0,0 +1,129 @@
+"""Test deleting users with their orders and the bulk delete endpoints
+"""
+import unittest
+import datetime
+import json
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+import models
+from .base_test import BaseTests
+
+
+class BulkDeleteTests(BaseTests):
+    """Tests functionality of deleting orders and meals in bulk"""
+
+
+    def setUp(self):
+        """Place a few more orders, one of them by the admin and two of them last year"""
+        super().setUp()
+        self.app.post('/api/v3/orders/batch', data=json.dumps({"meal_ids" : [2, 2, 2]}),
+                      headers=self.user_header)
+        self.app.post('/api/v3/orders', data=json.dumps({"meal_id" : 2}), headers=self.admin_header)
+        with self.application.app_context():
+            last_year = datetime.datetime(2017, 6, 1, 12, 0)
+            models.Order.query.filter(models.Order.id.in_([1, 2])).update(
+                {"created_at" : last_year}, synchronize_session=False)
+            models.db.session.commit()
+            models.DailySales.rebuild()
+
+    def sales(self):
+        """Returns the daily sales, checking they match a rebuild from the orders"""
+        with self.application.app_context():
+            def read():
+                """read the rows that still count orders"""
+                return sorted((row.day, row.meal_id, row.orders, row.revenue)
+                              for row in models.DailySales.query if row.orders)
+            kept = read()
+            models.DailySales.rebuild()
+            self.assertEqual(kept, read())
+            return kept
+
+    def order_ids(self):
+        """Returns the ids of the live and archived orders"""
+        with self.application.app_context():
+            return sorted(order.id for model in (models.Order, models.OrderArchive)
+                          for order in model.query)
+
+    def delete_orders(self, query, header=None):
+        """Deletes orders in bulk"""
+        return self.app.delete('/api/v3/admin/orders' + query, headers=header or self.admin_header)
+
+    def test_delete_user_cascades(self):
+        """Test that deleting a user deletes their live and archived orders in the database"""
+        with self.application.app_context():
+            models.Order.archive(datetime.datetime(2018, 1, 1))
+        statements = []
+
+        def count(conn, cursor, statement, *args): # pylint: disable=W0613
+            """record each statement sent to the database"""
+            statements.append(statement)
+
+        with self.application.app_context():
+            event.listen(models.db.engine, 'before_cursor_execute', count)
+            try:
+                response = models.User.delete_user(2)
+            finally:
+                event.remove(models.db.engine, 'before_cursor_execute', count)
+
+        self.assertEqual(response.status_code, 200)
+        # orders are only read to be taken off the daily sales, never loaded or nulled
+        self.assertEqual(len([statement for statement in statements if '"order"' in statement]), 1)
+        self.assertEqual(self.order_ids(), [5])
+        self.assertEqual([row[2] for row in self.sales()], [1])
+
+    def test_delete_orders_of_user(self):
+        """Test deleting every order of a user"""
+        response = self.delete_orders('?user_id=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['deleted'], 4)
+        self.assertEqual(self.order_ids(), [5])
+        self.sales()
+
+    def test_delete_orders_between(self):
+        """Test deleting the orders of a period, live and archived"""
+        with self.application.app_context():
+            models.Order.archive(datetime.datetime(2018, 1, 1))
+        response = self.delete_orders('?from=2017-06-01&to=2017-06-01')
+        self.assertEqual(json.loads(response.get_data(as_text=True))['deleted'], 2)
+        self.assertEqual(self.order_ids(), [3, 4, 5])
+        self.sales()
+
+    def test_delete_orders_in_batches(self):
+        """Test that a bulk delete is done a batch at a time"""
+        with self.application.app_context():
+            self.assertEqual(models.Order.delete_many(since=datetime.datetime(2018, 1, 1), batch_size=2), 3)
+        self.assertEqual(self.order_ids(), [1, 2])
+        self.sales()
+
+    def test_delete_orders_errors(self):
+        """Test bulk deleting orders without a filter, with a bad range and as a user"""
+        self.assertEqual(self.delete_orders('').status_code, 400)
+        self.assertEqual(self.delete_orders('?from=2018-06-02&to=2018-06-01').status_code, 400)
+        self.assertEqual(self.delete_orders('?user_id=2', header=self.user_header).status_code, 401)
+        self.assertEqual(len(self.order_ids()), 5)
+
+    def test_delete_meals(self):
+        """Test deleting several meals at once"""
+        response = self.app.delete('/api/v3/admin/meals', data=json.dumps({"meal_ids" : [1, 2, 57]}),
+                                   headers=self.admin_header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['deleted'], 2)
+        menu = self.app.get('/api/v3/menu', headers=self.user_header)
+        self.assertEqual(json.loads(menu.get_data(as_text=True))['menu'], [])
+
+    def test_delete_meals_errors(self):
+        """Test bulk deleting meals without ids and as a user"""
+        response = self.app.delete('/api/v3/admin/meals', data=json.dumps({}), headers=self.admin_header)
+        self.assertEqual(response.status_code, 400)
+        response = self.app.delete('/api/v3/admin/meals', data=json.dumps({"meal_ids" : [1]}),
+                                   headers=self.user_header)
+        self.assertEqual(response.status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Test the CSV export of orders
+"""
+import unittest
+import csv
+import datetime
+import gzip
+import io
+import json
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resources import streaming
+from .base_test import BaseTests
+
+
+class OrderExportTests(BaseTests):
+    """Tests functionality of the orders export endpoint"""
+
+
+    def export(self, query='', headers=None):
+        """Downloads the export as the admin"""
+        return self.app.get('/api/v3/orders/export.csv' + query,
+                            headers=dict(self.admin_header, **(headers or {})))
+
+    def test_admin_export(self):
+        """Test admin downloading today's orders oldest first"""
+        self.app.post(
+            '/api/v3/orders/batch', data=json.dumps({"meal_ids" : [2, 2]}),
+            headers=self.user_header)
+        response = self.export()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(rows[0], ['id', 'meal_name', 'price', 'user_email', 'created_at'])
+        self.assertEqual([row[0] for row in rows[1:]], ['1', '2', '3'])
+        self.assertEqual(rows[1][1:4], ['chapo', '20', 'user@gmail.com'])
+
+    def test_export_in_batches(self):
+        """Test that an export larger than a batch is complete"""
+        batch = streaming.STREAM_BATCH
+        streaming.STREAM_BATCH = 2
+        try:
+            self.app.post(
+                '/api/v3/orders/batch', data=json.dumps({"meal_ids" : [2] * 4}),
+                headers=self.user_header)
+            rows = list(csv.reader(io.StringIO(self.export().get_data(as_text=True))))
+        finally:
+            streaming.STREAM_BATCH = batch
+        self.assertEqual(len(rows), 6)
+
+    def test_export_gzip(self):
+        """Test that clients accepting gzip get a compressed file"""
+        response = self.export(headers={"Accept-Encoding" : "gzip"})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        text = gzip.decompress(response.get_data()).decode('UTF-8')
+        self.assertEqual(len(list(csv.reader(io.StringIO(text)))), 2)
+
+    def test_export_range(self):
+        """Test that only the orders of the requested days are exported"""
+        tomorrow = datetime.datetime.utcnow().date() + datetime.timedelta(days=1)
+        response = self.export('?from={0}&to={0}'.format(tomorrow.isoformat()))
+        self.assertEqual(len(list(csv.reader(io.StringIO(response.get_data(as_text=True))))), 1)
+
+    def test_user_export(self):
+        """Test user unsuccessfully exporting orders"""
+        response = self.app.get('/api/v3/orders/export.csv', headers=self.user_header)
+        self.assertEqual(response.status_code, 401)
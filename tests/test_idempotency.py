@@ -0,0 +1,141 @@
+"""Test the Idempotency-Key support of the order endpoints
+"""
+import unittest
+import json
+import time
+from unittest import mock
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import IntegrityError
+
+import models
+import idempotency
+from .base_test import BaseTests
+
+
+class IdempotencyTests(BaseTests):
+    """Tests functionality of retried requests sent with an Idempotency-Key"""
+
+
+    def test_retry_is_replayed(self):
+        """Test that a retried order returns the first response without creating another order"""
+        first = self.place_order(key='lunch-1')
+        self.assertEqual(first.status_code, 201)
+        second = self.place_order(key='lunch-1')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.count_orders(), 2)
+
+    def test_without_key(self):
+        """Test that orders without a key are created on every request"""
+        self.place_order(key='lunch-1')
+        response = self.app.post(
+            '/api/v3/orders', data=json.dumps({"meal_id" : 2}),
+            content_type='application/json',
+            headers=self.user_header)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.count_orders(), 3)
+
+    def test_key_reused_with_different_request(self):
+        """Test that a key cannot be reused for a different order"""
+        self.place_order(key='lunch-1')
+        response = self.place_order(key='lunch-1', meal_id=1)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.count_orders(), 2)
+
+    def test_keys_are_per_user(self):
+        """Test that two users may use the same key"""
+        self.place_order(key='lunch-1')
+        response = self.place_order(key='lunch-1', header=self.admin_header)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response.headers)
+        self.assertEqual(self.count_orders(), 3)
+
+    def test_error_is_replayed(self):
+        """Test that a failed order is replayed like a successful one"""
+        first = self.place_order(key='lunch-1', meal_id=1)
+        self.assertEqual(first.status_code, 400)
+        second = self.place_order(key='lunch-1', meal_id=1)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+
+    def test_invalid_request_is_not_stored(self):
+        """Test that a request rejected by the parser can be retried with the same key"""
+        response = self.app.post(
+            '/api/v3/orders', data=json.dumps({}),
+            content_type='application/json',
+            headers=dict(self.user_header, **{"Idempotency-Key" : "lunch-1"}))
+        self.assertEqual(response.status_code, 400)
+        response = self.place_order(key='lunch-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response.headers)
+
+    def test_batch_retry_is_replayed(self):
+        """Test that a retried batch creates its orders once"""
+        headers = dict(self.user_header, **{"Idempotency-Key" : "batch-1"})
+        data = json.dumps({"meal_ids" : [2, 2]})
+        first = self.app.post('/api/v3/orders/batch', data=data, headers=headers)
+        second = self.app.post('/api/v3/orders/batch', data=data, headers=headers)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertEqual(self.count_orders(), 3)
+
+    def test_key_too_long(self):
+        """Test that an overly long key is rejected"""
+        response = self.place_order(key='k' * 256)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.count_orders(), 1)
+
+    def test_database_store(self):
+        """Test that the database store replays retries and rejects reused keys"""
+        self.application.extensions['idempotency'] = idempotency.DatabaseStore()
+        first = self.place_order(key='lunch-1')
+        second = self.place_order(key='lunch-1')
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.place_order(key='lunch-1', meal_id=1).status_code, 422)
+        self.assertEqual(self.count_orders(), 2)
+
+    def test_database_store_expired_key(self):
+        """Test that an expired key in the database store is claimed again"""
+        self.application.extensions['idempotency'] = idempotency.DatabaseStore(ttl=-1)
+        self.place_order(key='lunch-1')
+        response = self.place_order(key='lunch-1')
+        self.assertNotIn('Idempotent-Replayed', response.headers)
+        self.assertEqual(self.count_orders(), 3)
+
+    def test_database_store_gives_up(self):
+        """Test that a key the database store keeps failing to claim is answered with a 409"""
+        self.application.extensions['idempotency'] = idempotency.DatabaseStore()
+        conflict = IntegrityError('INSERT', {}, Exception('duplicate key'))
+        with mock.patch.object(models.db.session, 'commit', side_effect=conflict) as commit:
+            response = self.place_order(key='lunch-1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(commit.call_count, 3)
+        self.assertEqual(self.count_orders(), 1)
+
+
+class MemoryStoreTests(unittest.TestCase):
+    """Tests the bounds of the in-memory store"""
+
+
+    def test_evicts_oldest(self):
+        """Test that the oldest key is dropped when the store is full"""
+        store = idempotency.MemoryStore(max_size=2)
+        for key in ('a', 'b', 'c'):
+            self.assertIsNone(store.reserve(1, key, 'f'))
+        self.assertIsNone(store.reserve(1, 'a', 'f'))
+        self.assertIsNotNone(store.reserve(1, 'c', 'f'))
+
+    def test_expires(self):
+        """Test that a key can be claimed again once it expired"""
+        store = idempotency.MemoryStore(ttl=0.01)
+        store.reserve(1, 'a', 'f')
+        store.complete(1, 'a', 201, 'application/json', b'{}')
+        self.assertEqual(store.reserve(1, 'a', 'f').status, 201)
+        time.sleep(0.02)
+        self.assertIsNone(store.reserve(1, 'a', 'f'))
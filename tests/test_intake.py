@@ -0,0 +1,131 @@
+"""Test the write-behind order intake
+"""
+import unittest
+import json
+import threading
+from unittest import mock
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+from .base_test import BaseTests
+
+
+class IntakeTests(BaseTests):
+    """Tests functionality of creating orders through the intake"""
+
+
+    def setUp(self):
+        """Enable the intake with a delay long enough to group concurrent orders"""
+        super().setUp()
+        self.intake = self.application.extensions['order_intake']
+        self.intake.enabled = True
+        self.intake.delay = 0.05
+
+    def tearDown(self):
+        self.intake.close()
+        super().tearDown()
+
+    def test_successful_creation(self):
+        """Test that an order placed through the intake is written before the response"""
+        response = self.place_order()
+        self.assertEqual(response.status_code, 201)
+        order = json.loads(response.get_data(as_text=True))['2']
+        self.assertEqual(order['meal_name'], 'chapo')
+        self.assertEqual(self.count_orders(), 2)
+
+    def test_invalid_orders_are_not_queued(self):
+        """Test that orders failing validation are answered without the intake"""
+        self.assertEqual(self.place_order(meal_id=1).status_code, 400)
+        self.assertEqual(self.place_order(meal_id=57).status_code, 404)
+        self.assertEqual(self.intake.stats()['written'], 0)
+
+    def test_concurrent_orders_share_commits(self):
+        """Test that concurrent orders all get their own id and are committed together"""
+        responses = []
+
+        def order():
+            """place an order from another thread"""
+            responses.append(self.place_order(client=self.application.test_client()))
+
+        threads = [threading.Thread(target=order) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([response.status_code for response in responses], [201] * 20)
+        ids = {int(key) for response in responses
+               for key in json.loads(response.get_data(as_text=True)) if key != 'message'}
+        self.assertEqual(len(ids), 20)
+        self.assertEqual(self.count_orders(), 21)
+        self.assertLess(self.intake.stats()['batches'], 20)
+
+    def test_close_writes_queued_orders(self):
+        """Test that orders still queued when the intake closes are written"""
+        row = {"meal_id" : 2, "meal_name" : "chapo", "price" : 20,
+               "user_id" : 2, "user_email" : "user@gmail.com"}
+        queued = [self.intake.submit(dict(row)) for _ in range(5)]
+        self.intake.close()
+        self.assertTrue(all(future.done() for future in queued))
+        self.assertEqual(self.count_orders(), 6)
+        with self.assertRaises(RuntimeError):
+            self.intake.submit(dict(row))
+
+    def test_follow_accepted_order(self):
+        """Test that an order answered with a 202 can be followed with its ticket"""
+        self.intake.timeout = 0
+        response = self.place_order()
+        self.assertEqual(response.status_code, 202)
+        url = '/api/v3/orders/queued/{}'.format(json.loads(response.get_data(as_text=True))['ticket'])
+        self.intake.close()
+
+        response = self.app.get(url, headers=self.user_header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['2']['meal_name'], 'chapo')
+        self.assertEqual(self.app.get(url, headers=self.admin_header).status_code, 200)
+        self.assertEqual(self.app.get(url + 'x', headers=self.user_header).status_code, 404)
+
+    def test_accepted_order_sells_out(self):
+        """Test that an order selling out after its 202 is logged and reported on its ticket"""
+        self.app.put('/api/v3/meals/2/stock', data=json.dumps({"stock" : 1}),
+                     headers=self.admin_header)
+        self.intake.timeout = 0
+        tickets = [json.loads(self.place_order().get_data(as_text=True))['ticket'] for _ in range(2)]
+        with self.assertLogs(self.application.logger, 'WARNING') as logs:
+            self.intake.close()
+        self.assertIn('sold out', logs.output[0])
+
+        statuses = sorted(self.app.get('/api/v3/orders/queued/{}'.format(ticket),
+                                       headers=self.user_header).status_code for ticket in tickets)
+        self.assertEqual(statuses, [200, 400])
+
+    def test_failed_write(self):
+        """Test that an order the intake cannot write is logged and answered with JSON"""
+        with mock.patch.object(models.Order, 'insert_many', side_effect=RuntimeError('disk full')), \
+                self.assertLogs(self.application.logger, 'ERROR') as logs:
+            response = self.place_order()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('kindly try again', json.loads(response.get_data(as_text=True))['message'])
+        self.assertIn('disk full', logs.output[0])
+
+    def test_writer_survives_errors(self):
+        """Test that a batch failing outside the inserts fails its orders and not the writer"""
+        broken = mock.Mock(logger=self.application.logger)
+        broken.app_context.side_effect = RuntimeError('no context')
+        with mock.patch.object(self.intake, '_app', broken), \
+                self.assertLogs(self.application.logger, 'ERROR') as logs:
+            self.assertEqual(self.place_order().status_code, 503)
+        self.assertIn('could not be written', logs.output[0])
+        self.assertEqual(self.place_order().status_code, 201)
+
+    def test_dead_writer_is_restarted(self):
+        """Test that orders submitted after the writer died start a new one"""
+        dead = threading.Thread(target=lambda: None)
+        dead.start()
+        dead.join()
+        self.intake._thread = dead # pylint: disable=W0212
+        self.assertEqual(self.place_order().status_code, 201)
+        self.assertEqual(self.count_orders(), 2)
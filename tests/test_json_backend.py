@@ -0,0 +1,43 @@
+"""Test the configurable JSON backend used for every response
+"""
+import unittest
+import datetime
+import json
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_backend
+from .base_test import BaseTests
+
+
+class JsonBackendTests(BaseTests):
+    """Tests functionality of the JSON backends"""
+
+
+    def test_compact_response(self):
+        """Test that responses are encoded without indentation"""
+        response = self.app.get('/api/v3/orders/1', headers=self.user_header)
+        self.assertNotIn(b'\n ', response.get_data())
+        self.assertNotIn(b'": ', response.get_data())
+
+    def test_dates_and_keys(self):
+        """Test that every backend encodes dates as HTTP dates and accepts integer keys"""
+        data = {1 : {"created_at" : datetime.datetime(2018, 6, 7, 11, 18, 39), "name" : "chapo"}}
+        expected = {"1" : {"created_at" : "Thu, 07 Jun 2018 11:18:39 GMT", "name" : "chapo"}}
+        names = ['stdlib'] if json_backend.orjson is None else ['stdlib', 'orjson']
+
+        for name in names:
+            for compact in (True, False):
+                backend = json_backend.create_backend(name, compact=compact)
+                self.assertEqual(json.loads(backend.dumps(data).decode('UTF-8')), expected)
+
+    def test_unknown_backend(self):
+        """Test that a misspelt JSON_BACKEND is reported"""
+        with self.assertRaises(ValueError):
+            json_backend.create_backend('simplejson')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,9 @@ import sys # fix import errors
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import event
+
+import models
 from .base_test import BaseTests
 
 
@@ -19,6 +22,26 @@ class MealTests(BaseTests):
         response = self.app.get('/api/v3/meals/1', headers=self.admin_header)
         self.assertEqual(response.status_code, 200)
 
+    def test_get_one_not_modified(self):
+        """Test that a meal is not sent again while the client's copy is current"""
+        response = self.app.get('/api/v3/meals/1', headers=self.admin_header)
+        etag = response.headers['ETag']
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+
+        headers = dict(self.admin_header, **{"If-None-Match" : etag})
+        response = self.app.get('/api/v3/meals/1', headers=headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+
+        data = json.dumps({"name" : "ugali", "price" : 30, "in_menu" : False})
+        self.app.put(
+            '/api/v3/meals/1', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        response = self.app.get('/api/v3/meals/1', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
     def test_user_get_one(self):
         """Tests user unsuccessfully getting a meal"""
         response = self.app.get('/api/v3/meals/1', headers=self.user_header)
@@ -47,6 +70,35 @@ class MealTests(BaseTests):
             headers=self.admin_header)
         self.assertEqual(response.status_code, 400)
 
+    def test_update_taken_name(self):
+        """Test renaming a meal to the name of another meal"""
+        data = json.dumps({"name" : "chapo", "price" : 20, "in_menu" : False})
+        response = self.app.put(
+            '/api/v3/meals/1', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['message'],
+                         'meal with that name already exists')
+
+    def test_update_single_statement(self):
+        """Test that a meal update is written with a single statement"""
+        statements = []
+
+        def count(conn, cursor, statement, *args): # pylint: disable=W0613
+            """record each statement sent to the database"""
+            statements.append(statement)
+
+        with self.application.app_context():
+            event.listen(models.db.engine, 'before_cursor_execute', count)
+            try:
+                response = models.Meal.update_meal(1, "ugali", 30, False)
+            finally:
+                event.remove(models.db.engine, 'before_cursor_execute', count)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('UPDATE meal'))
+
     def test_update_non_existing(self):
         """Test updating non_existing meal item"""
         data = json.dumps({"name" : "Pilau with spices", "price" : 600, "in_menu" : False})
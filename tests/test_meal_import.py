@@ -0,0 +1,95 @@
+"""Test the bulk meal import endpoint and covers most edge cases
+"""
+import unittest
+import json
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .base_test import BaseTests
+
+
+class MealImportTests(BaseTests):
+    """Tests functionality of the meal import endpoint"""
+
+
+    def test_csv_import(self):
+        """Test importing new meals and updating existing ones from CSV"""
+        data = "name,price,in_menu\nrice,100,true\nbeans,50,\nugali,25,false\n"
+        response = self.app.post(
+            '/api/v3/meals/import', data=data,
+            content_type='text/csv',
+            headers={"x-access-token" : self.admin_header["x-access-token"]})
+        self.assertEqual(response.status_code, 200)
+        report = json.loads(response.get_data(as_text=True))
+        self.assertEqual((report['created'], report['updated'], report['errors']), (2, 1, []))
+
+        response = self.app.get('/api/v3/meals/1', headers=self.admin_header)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['1']['price'], 25)
+
+        response = self.app.get('/api/v3/menu', headers=self.user_header)
+        names = [meal['name'] for meal in json.loads(response.get_data(as_text=True))['menu']]
+        self.assertEqual(sorted(names), ['chapo', 'rice'])
+
+    def test_ndjson_row_errors(self):
+        """Test that invalid and duplicate rows are reported and the rest imported"""
+        data = '\n'.join([
+            json.dumps({"name" : "rice", "price" : 100}),
+            'not json',
+            json.dumps({"name" : " ", "price" : 100}),
+            json.dumps({"name" : "beans", "price" : "cheap"}),
+            json.dumps({"name" : "rice", "price" : 90}),
+            json.dumps({"name" : "githeri", "price" : 80, "in_menu" : "maybe"})])
+        response = self.app.post(
+            '/api/v3/meals/import', data=data,
+            content_type='application/x-ndjson',
+            headers={"x-access-token" : self.admin_header["x-access-token"]})
+        report = json.loads(response.get_data(as_text=True))
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3, 4, 5, 6])
+
+    def test_unsupported_type(self):
+        """Test uploading meals in a format that is not supported"""
+        response = self.app.post(
+            '/api/v3/meals/import', data=json.dumps([{"name" : "rice", "price" : 100}]),
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_utf8(self):
+        """Test that an upload which stops being UTF-8 is a 400 reporting what was imported"""
+        header = {"x-access-token" : self.admin_header["x-access-token"]}
+        response = self.app.post(
+            '/api/v3/meals/import', data=b'name,price\npilau,10\n\xff\xfe,10\n',
+            content_type='text/csv', headers=header)
+        self.assertEqual(response.status_code, 400)
+        report = json.loads(response.get_data(as_text=True))
+        self.assertFalse(report['complete'])
+        self.assertEqual(report['errors'][-1]['row'], 1)
+
+        rows = ''.join('meal {},10\n'.format(number) for number in range(2000))
+        response = self.app.post(
+            '/api/v3/meals/import', data=('name,price\n' + rows).encode() + b'\xff\xfe,10\n',
+            content_type='text/csv', headers=header)
+        self.assertEqual(response.status_code, 400)
+        report = json.loads(response.get_data(as_text=True))
+        self.assertGreater(report['created'], 0)
+        self.assertEqual(report['errors'][-1]['row'], report['created'] + 1)
+
+        response = self.app.post(
+            '/api/v3/meals/import', data=b'{"name": "pilau", "price": 10}\n\xff\n',
+            content_type='application/x-ndjson', headers=header)
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_import(self):
+        """Test a non-admin trying to import meals"""
+        response = self.app.post(
+            '/api/v3/meals/import', data="name,price\nrice,100\n",
+            content_type='text/csv',
+            headers={"x-access-token" : self.user_header["x-access-token"]})
+        self.assertEqual(response.status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
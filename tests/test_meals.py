@@ -19,6 +19,31 @@ class MealsTests(BaseTests):
         response = self.app.get('/api/v3/meals', headers=self.admin_header)
         self.assertEqual(response.status_code, 200)
 
+    def test_get_all_paginated(self):
+        """Test admin walking the meals one page at a time using the cursor"""
+        response = self.app.get('/api/v3/meals?limit=1', headers=self.admin_header)
+        first_page = json.loads(response.get_data(as_text=True))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Query-Count', response.headers)
+        self.assertEqual([meal['id'] for meal in first_page['meals']], [2])
+
+        response = self.app.get(
+            '/api/v3/meals?limit=1&cursor={}'.format(first_page['next_cursor']),
+            headers=self.admin_header)
+        second_page = json.loads(response.get_data(as_text=True))
+        self.assertEqual([meal['id'] for meal in second_page['meals']], [1])
+        self.assertIsNone(second_page['next_cursor'])
+
+    def test_get_all_invalid_cursor(self):
+        """Test getting meals with a cursor that was not issued by the API"""
+        response = self.app.get('/api/v3/meals?cursor=notacursor', headers=self.admin_header)
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_all_invalid_limit(self):
+        """Test getting meals with a limit outside the allowed range"""
+        response = self.app.get('/api/v3/meals?limit=0', headers=self.admin_header)
+        self.assertEqual(response.status_code, 400)
+
     def test_user_get_all(self):
         """Test user unsuccessfully getting all meals"""
         response = self.app.get('/api/v3/meals', headers=self.user_header)
@@ -24,6 +24,107 @@ class MenusTests(BaseTests):
         response = self.app.get('/api/v3/menu', headers=self.user_header)
         self.assertEqual(response.status_code, 200)
 
+    def test_get_all_cached(self):
+        """Test that the menu is served from the cache until a meal changes"""
+        first = self.app.get('/api/v3/menu', headers=self.user_header)
+        second = self.app.get('/api/v3/menu', headers=self.user_header)
+        self.assertEqual(first.headers['X-Cache'], 'MISS')
+        self.assertEqual(second.headers['X-Cache'], 'HIT')
+        self.assertEqual(first.get_data(), second.get_data())
+
+        data = json.dumps({"meal_id" : 1})
+        self.app.post(
+            '/api/v3/menu', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        response = self.app.get('/api/v3/menu', headers=self.user_header)
+        menu = json.loads(response.get_data(as_text=True))['menu']
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        self.assertEqual(sorted(meal['id'] for meal in menu), [1, 2])
+
+    def test_get_all_cache_expired(self):
+        """Test that a cached menu is rebuilt once its TTL has passed"""
+        self.application.extensions['menu_cache'].ttl = 0
+        self.app.get('/api/v3/menu', headers=self.user_header)
+        response = self.app.get('/api/v3/menu', headers=self.user_header)
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+
+    def test_get_all_not_modified(self):
+        """Test that the menu is not sent again while the client's copy is current"""
+        response = self.app.get('/api/v3/menu', headers=self.user_header)
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+
+        headers = dict(self.user_header, **{"If-None-Match" : response.headers['ETag']})
+        self.assertEqual(self.app.get('/api/v3/menu', headers=headers).status_code, 304)
+
+        headers = dict(self.user_header, **{"If-Modified-Since" : response.headers['Last-Modified']})
+        self.assertEqual(self.app.get('/api/v3/menu', headers=headers).status_code, 304)
+
+    def test_replace_menu(self):
+        """Test admin replacing the whole menu in one call"""
+        self.app.get('/api/v3/menu', headers=self.user_header)
+        version = self.application.extensions['menu_cache'].version
+        data = json.dumps({"meal_ids" : [1]})
+        response = self.app.put(
+            '/api/v3/menu', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.get_data(as_text=True))
+        self.assertEqual((result['added'], result['removed']), (1, 1))
+        self.assertEqual(self.application.extensions['menu_cache'].version, version + 1)
+
+        response = self.app.get('/api/v3/menu', headers=self.user_header)
+        menu = json.loads(response.get_data(as_text=True))['menu']
+        self.assertEqual([meal['id'] for meal in menu], [1])
+
+    def test_clear_menu(self):
+        """Test admin taking every meal off the menu with an empty list"""
+        self.app.get('/api/v3/menu', headers=self.user_header)
+        version = self.application.extensions['menu_cache'].version
+        response = self.app.put(
+            '/api/v3/menu', data=json.dumps({"meal_ids" : []}),
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.get_data(as_text=True))
+        self.assertEqual((result['menu'], result['added'], result['removed']), ([], 0, 1))
+        self.assertEqual(self.application.extensions['menu_cache'].version, version + 1)
+
+        response = self.app.get('/api/v3/menu', headers=self.user_header)
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        self.assertEqual(json.loads(response.get_data(as_text=True))['menu'], [])
+
+    def test_replace_menu_without_meal_ids(self):
+        """Test that replacing the menu needs a list of meal_ids"""
+        for data in ({}, {"meal_ids" : None}, {"meal_ids" : ["pilau"]}):
+            response = self.app.put(
+                '/api/v3/menu', data=json.dumps(data),
+                content_type='application/json',
+                headers=self.admin_header)
+            self.assertEqual(response.status_code, 400)
+
+    def test_replace_menu_non_existing(self):
+        """Test that the menu is left untouched when one of the meals does not exist"""
+        data = json.dumps({"meal_ids" : [1, 57]})
+        response = self.app.put(
+            '/api/v3/menu', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 404)
+        response = self.app.get('/api/v3/menu', headers=self.user_header)
+        menu = json.loads(response.get_data(as_text=True))['menu']
+        self.assertEqual([meal['id'] for meal in menu], [2])
+
+    def test_user_replace_menu(self):
+        """Test a non-admin trying to replace the menu"""
+        data = json.dumps({"meal_ids" : [1]})
+        response = self.app.put(
+            '/api/v3/menu', data=data,
+            content_type='application/json',
+            headers=self.user_header)
+        self.assertEqual(response.status_code, 401)
+
     def test_no_token_get_all(self):
         """Test unauthenticated user unsuccessfully getting all menu options"""
         response = self.app.get('/api/v3/menu')
@@ -0,0 +1,103 @@
+"""Test the request metrics served at /metrics
+"""
+import unittest
+import threading
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import config
+from metrics import Metrics
+from .base_test import BaseTests
+
+
+class NoMetricsConfig(config.TestingConfig):
+    """Testing configuration without metrics"""
+    METRICS = False
+
+
+class MetricsTests(BaseTests):
+    """Tests functionality of the metrics endpoint"""
+
+
+    def get_metrics(self):
+        """Gets the metrics as text"""
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        return response.get_data(as_text=True)
+
+    def test_counts_requests(self):
+        """Test that requests are counted by endpoint, method and status"""
+        self.app.get('/api/v3/menu')
+        self.app.get('/api/v3/menu', headers=self.user_header)
+        metrics = self.get_metrics()
+        self.assertIn('http_requests_total{endpoint="orders",method="POST",status="201"} 1\n', metrics)
+        self.assertIn('http_requests_total{endpoint="menus",method="GET",status="401"} 1\n', metrics)
+        self.assertIn('http_requests_total{endpoint="menus",method="GET",status="200"} 1\n', metrics)
+        self.assertIn('http_requests_total{endpoint="login",method="POST",status="200"} 2\n', metrics)
+
+    def test_latency_histogram(self):
+        """Test that every request of an endpoint falls in the +Inf bucket"""
+        self.app.get('/api/v3/menu', headers=self.user_header)
+        metrics = self.get_metrics()
+        self.assertIn('http_request_duration_seconds_bucket{endpoint="menus",le="+Inf"} 1\n', metrics)
+        self.assertIn('http_request_duration_seconds_count{endpoint="menus"} 1\n', metrics)
+        self.assertIn('http_request_duration_seconds_sum{endpoint="menus"}', metrics)
+
+    def test_unmatched_url(self):
+        """Test that requests to unknown URLs are counted together"""
+        self.app.get('/api/v3/nowhere')
+        self.assertIn('http_requests_total{endpoint="unmatched",method="GET",status="404"} 1\n',
+                      self.get_metrics())
+
+    def test_process_and_pool(self):
+        """Test that the resident memory and pool statistics are exported"""
+        metrics = self.get_metrics()
+        self.assertIn('process_resident_memory_bytes ', metrics)
+        self.assertIn('db_pool_checkouts_total{database="default"}', metrics)
+
+    def test_threads_are_added_up(self):
+        """Test that the requests recorded by each thread are all counted"""
+        def get_menu():
+            """get the menu from a client of its own"""
+            client = self.application.test_client()
+            for _ in range(5):
+                client.get('/api/v3/menu', headers=self.user_header)
+
+        threads = [threading.Thread(target=get_menu) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.app.get('/api/v3/menu', headers=self.user_header)
+        self.assertIn('http_requests_total{endpoint="menus",method="GET",status="200"} 21\n',
+                      self.get_metrics())
+        # the shards of finished threads are folded in only once
+        self.assertIn('http_requests_total{endpoint="menus",method="GET",status="200"} 21\n',
+                      self.get_metrics())
+
+
+class MetricsRecordTests(unittest.TestCase):
+    """Tests the counters without an app"""
+
+
+    def test_buckets(self):
+        """Test that latencies land in the first bucket they fit in"""
+        metrics = Metrics(buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.1, 0.5, 3):
+            metrics.record('resources.meals.orders', 'GET', 200, seconds)
+        self.assertEqual(metrics.collect().latency['orders'], [2, 1, 1, 3.65])
+
+    def test_disabled(self):
+        """Test that metrics can be turned off"""
+        application = app.create_app(NoMetricsConfig)
+        self.assertNotIn('metrics', application.extensions)
+        self.assertEqual(application.test_client().get('/metrics').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,6 +19,14 @@ class OrderTests(BaseTests):
         response = self.app.get('/api/v3/orders/1', headers=self.admin_header)
         self.assertEqual(response.status_code, 200)
 
+    def test_get_one_not_modified(self):
+        """Test that an order is not sent again while the client's copy is current"""
+        response = self.app.get('/api/v3/orders/1', headers=self.user_header)
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+        headers = dict(self.user_header, **{"If-None-Match" : response.headers['ETag']})
+        response = self.app.get('/api/v3/orders/1', headers=headers)
+        self.assertEqual(response.status_code, 304)
+
     def test_user_get_one(self):
         """Test user successfully getting an order item"""
         response = self.app.get('/api/v3/orders/1', headers=self.user_header)
@@ -24,6 +24,36 @@ class OrdersTests(BaseTests):
         response = self.app.get('/api/v3/orders', headers=self.user_header)
         self.assertEqual(response.status_code, 200)
 
+    def test_owner_get_all_paginated(self):
+        """Test user walking their orders one page at a time using the cursor"""
+        data = json.dumps({"meal_id" : 2})
+        self.app.post(
+            '/api/v3/orders', data=data,
+            content_type='application/json',
+            headers=self.user_header)
+        response = self.app.get('/api/v3/orders?limit=1', headers=self.user_header)
+        first_page = json.loads(response.get_data(as_text=True))
+        self.assertEqual([order['id'] for order in first_page['your orders']], [2])
+
+        response = self.app.get(
+            '/api/v3/orders?limit=1&cursor={}'.format(first_page['next_cursor']),
+            headers=self.user_header)
+        second_page = json.loads(response.get_data(as_text=True))
+        self.assertEqual([order['id'] for order in second_page['your orders']], [1])
+        self.assertIsNone(second_page['next_cursor'])
+
+    def test_get_all_streamed(self):
+        """Test admin getting every order in a single streamed response"""
+        data = json.dumps({"meal_id" : 2})
+        self.app.post(
+            '/api/v3/orders', data=data,
+            content_type='application/json',
+            headers=self.user_header)
+        response = self.app.get('/api/v3/orders?stream=1', headers=self.admin_header)
+        self.assertEqual(response.status_code, 200)
+        orders = json.loads(response.get_data(as_text=True))['orders']
+        self.assertEqual([order['id'] for order in orders], [2, 1])
+
     def test_successful_creation(self):
         """Tests successfully creating a new order item"""
         data = json.dumps({"meal_id" : 2})
@@ -0,0 +1,85 @@
+"""Test the connection pool options and the pool statistics endpoint
+"""
+import unittest
+import json
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import exc
+
+import app
+import config
+import models
+from database import InstrumentedQueuePool, InstrumentedNullPool, pool_stats
+from .base_test import BaseTests
+
+
+class PooledConfig(config.TestingConfig):
+    """Testing configuration with a small queue pool"""
+    SQLALCHEMY_POOL_SIZE = 1
+    SQLALCHEMY_MAX_OVERFLOW = 0
+    SQLALCHEMY_POOL_TIMEOUT = 0.05
+
+
+class NullPoolConfig(PooledConfig):
+    """Testing configuration for use behind an external pooler"""
+    SQLALCHEMY_NULL_POOL = True
+
+
+class PoolTests(BaseTests):
+    """Tests functionality of the pool statistics endpoint"""
+
+
+    def test_admin_get_pool(self):
+        """Test admin getting the statistics of the pool"""
+        response = self.app.get('/api/v3/admin/pool', headers=self.admin_header)
+        self.assertEqual(response.status_code, 200)
+        pool = json.loads(response.get_data(as_text=True))['pools']['default']
+        self.assertGreater(pool['checkouts'], 0)
+        self.assertIn('avg_wait_ms', pool)
+
+    def test_user_get_pool(self):
+        """Test user unsuccessfully getting the statistics of the pool"""
+        response = self.app.get('/api/v3/admin/pool', headers=self.user_header)
+        self.assertEqual(response.status_code, 401)
+
+
+class PoolOptionsTests(unittest.TestCase):
+    """Tests that the configured pool options reach the engine"""
+
+
+    def test_queue_pool(self):
+        """Test that a configured pool size gives a bounded, instrumented queue pool"""
+        application = app.create_app(PooledConfig)
+        with application.app_context():
+            pool = models.db.engine.pool
+            self.assertIsInstance(pool, InstrumentedQueuePool)
+            self.assertEqual(pool.size(), 1)
+            self.assertTrue(pool._pre_ping) # pylint: disable=W0212
+
+            connection = models.db.engine.connect()
+            try:
+                with self.assertRaises(exc.TimeoutError):
+                    models.db.engine.connect()
+            finally:
+                connection.close()
+
+            stats = pool_stats(models.db)['default']
+            self.assertEqual(stats['checkouts'], 1)
+            self.assertEqual(stats['timeouts'], 1)
+            self.assertEqual(stats['in_use'], 0)
+            self.assertEqual(stats['checked_in'], 1)
+            models.db.engine.dispose()
+
+    def test_null_pool(self):
+        """Test that the null pool mode opens a connection per checkout"""
+        application = app.create_app(NullPoolConfig)
+        with application.app_context():
+            self.assertIsInstance(models.db.engine.pool, InstrumentedNullPool)
+            for _ in range(2):
+                models.db.engine.connect().close()
+            stats = pool_stats(models.db)['default']
+            self.assertEqual(stats['connects'], 2)
+            self.assertEqual(stats['timeouts'], 0)
@@ -0,0 +1,84 @@
+"""Test that GET requests read from the replica and writers read their own writes
+"""
+import unittest
+import json
+import os
+import tempfile
+
+import sys # fix import errors
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+from .base_test import BaseTests
+
+
+class ReplicaTests(BaseTests):
+    """Tests functionality of the replica routing with a second SQLite file as the replica"""
+
+
+    def setUp(self):
+        """Add an empty replica that has not caught up with the primary yet"""
+        super().setUp()
+        handle, self.replica_path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.application.config['SQLALCHEMY_BINDS'] = {'replica' : 'sqlite:///' + self.replica_path}
+        with self.application.app_context():
+            models.db.Model.metadata.create_all(bind=models.db.get_engine(bind='replica'))
+        self.application.extensions['replica_router'].clear()
+
+    def tearDown(self):
+        super().tearDown()
+        os.remove(self.replica_path)
+
+    def get_orders(self):
+        """Gets the orders of the user"""
+        response = self.app.get('/api/v3/orders', headers=self.user_header)
+        return json.loads(response.get_data(as_text=True))['your orders']
+
+    def test_get_reads_replica(self):
+        """Test that GET requests read from the replica"""
+        self.assertEqual(self.get_orders(), [])
+        response = self.app.get('/api/v3/meals', headers=self.admin_header)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['meals'], [])
+
+    def test_writes_go_to_primary(self):
+        """Test that writes and the reads of write requests use the primary"""
+        data = json.dumps({"name" : "ugali", "price" : 30, "in_menu" : True})
+        response = self.app.put(
+            '/api/v3/meals/1', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 200)
+        with self.application.app_context():
+            self.assertEqual(models.Meal.query.get(1).price, 30)
+
+    def test_read_your_writes(self):
+        """Test that a user who just placed an order sees it, and other users do not"""
+        response = self.app.post(
+            '/api/v3/orders', data=json.dumps({"meal_id" : 2}),
+            content_type='application/json',
+            headers=self.user_header)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.get_orders()), 2)
+
+        response = self.app.get('/api/v3/orders', headers=self.admin_header)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['orders'], [])
+
+        self.application.extensions['replica_router'].clear()
+        self.assertEqual(self.get_orders(), [])
+
+    def test_menu_cache_built_on_primary(self):
+        """Test that the shared menu cache is built from the primary after an admin's write"""
+        response = self.app.post(
+            '/api/v3/menu', data=json.dumps({"meal_id" : 1}),
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.app.get('/api/v3/menu', headers=self.user_header)
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        menu = json.loads(response.get_data(as_text=True))['menu']
+        self.assertEqual(sorted(meal['id'] for meal in menu), [1, 2])
+
+        # the user's own reads still go to the replica
+        self.assertEqual(self.get_orders(), [])
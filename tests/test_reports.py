@@ -0,0 +1,85 @@
+"""Test the daily sales report and the rollup behind it
+"""
+import unittest
+import datetime
+import json
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+from .base_test import BaseTests
+
+
+class DailyReportTests(BaseTests):
+    """Tests functionality of the daily reports endpoint"""
+
+
+    def get_days(self, query=''):
+        """Gets the days of the report as the admin"""
+        response = self.app.get('/api/v3/reports/daily' + query, headers=self.admin_header)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.get_data(as_text=True))['days']
+
+    def test_admin_get_report(self):
+        """Test admin getting today's totals"""
+        days = self.get_days()
+        self.assertEqual(len(days), 1)
+        self.assertEqual(days[0]['date'], datetime.datetime.utcnow().date().isoformat())
+        self.assertEqual((days[0]['orders'], days[0]['revenue']), (1, 20))
+        self.assertEqual(days[0]['meals'], [
+            {"meal_id" : 2, "meal_name" : "chapo", "orders" : 1, "revenue" : 20}])
+
+    def test_user_get_report(self):
+        """Test user unsuccessfully getting the report"""
+        response = self.app.get('/api/v3/reports/daily', headers=self.user_header)
+        self.assertEqual(response.status_code, 401)
+
+    def test_totals_follow_orders(self):
+        """Test that created, updated and deleted orders are reflected in the totals"""
+        self.app.post(
+            '/api/v3/orders/batch', data=json.dumps({"meal_ids" : [2, 2]}),
+            headers=self.user_header)
+        self.app.put(
+            '/api/v3/meals/1', data=json.dumps({"name" : "ugali", "price" : 50, "in_menu" : True}),
+            headers=self.admin_header)
+        self.app.put('/api/v3/orders/1', data=json.dumps({"meal_id" : 1}), headers=self.user_header)
+        self.app.delete('/api/v3/orders/2', headers=self.user_header)
+
+        day = self.get_days()[0]
+        self.assertEqual((day['orders'], day['revenue']), (2, 70))
+        self.assertEqual([(meal['meal_id'], meal['orders']) for meal in day['meals']], [(1, 1), (2, 1)])
+
+        with self.application.app_context():
+            self.assertEqual(models.DailySales.rebuild(), 2)
+        self.assertEqual(self.get_days()[0], day)
+
+    def test_order_without_created_at(self):
+        """Test that orders without a created_at are updated, deleted and rebuilt without a day"""
+        with self.application.app_context():
+            models.Order.query.get(1).created_at = None
+            models.db.session.commit()
+            models.DailySales.query.delete()
+            models.db.session.commit()
+
+        self.app.put(
+            '/api/v3/meals/1', data=json.dumps({"name" : "ugali", "price" : 50, "in_menu" : True}),
+            headers=self.admin_header)
+        response = self.app.put('/api/v3/orders/1', data=json.dumps({"meal_id" : 1}),
+                                headers=self.user_header)
+        self.assertEqual(response.status_code, 200)
+        with self.application.app_context():
+            self.assertEqual(models.DailySales.rebuild(), 0)
+        self.assertEqual(self.app.delete('/api/v3/orders/1', headers=self.user_header).status_code, 200)
+        self.assertEqual(self.get_days(), [])
+
+    def test_outside_range(self):
+        """Test a range without orders"""
+        self.assertEqual(self.get_days('?from=2018-06-01&to=2018-06-30'), [])
+
+    def test_invalid_range(self):
+        """Test ranges that cannot be reported"""
+        for query in ('?from=2018-06-30&to=2018-06-01', '?from=june', '?from=2016-01-01&to=2018-01-01'):
+            response = self.app.get('/api/v3/reports/daily' + query, headers=self.admin_header)
+            self.assertEqual(response.status_code, 400)
@@ -0,0 +1,51 @@
+"""Test that the compiled serializers produce the same output as flask_restful.marshal
+"""
+import unittest
+import datetime
+from types import SimpleNamespace
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_restful import marshal, fields
+
+from resources.meals import order_fields, order_serializer, meal_fields, meal_serializer
+from resources.serializers import Serializer
+
+import models
+
+
+def encode_and_marshal(serializer, spec, values):
+    """Returns the output of the compiled serializer and of marshal for the same values"""
+    row = tuple(values)
+    obj = SimpleNamespace(**dict(zip(serializer.keys, values)))
+    return serializer.encode(row), dict(marshal(obj, spec))
+
+
+class SerializerTests(unittest.TestCase):
+    """Tests functionality of the compiled serializers"""
+
+
+    def test_same_as_marshal(self):
+        """Test that an order row is encoded exactly like marshal encodes it"""
+        encoded, marshalled = encode_and_marshal(order_serializer, order_fields, (
+            7, 2, 'chapo', 20, 3, 'user@gmail.com', datetime.datetime(2018, 6, 7, 11, 18, 39)))
+        self.assertEqual(encoded, marshalled)
+
+    def test_null_values(self):
+        """Test that null values fall back to the field defaults like marshal"""
+        encoded, marshalled = encode_and_marshal(
+            order_serializer, order_fields, (7, None, None, None, None, None, None))
+        self.assertEqual(encoded, marshalled)
+        encoded, marshalled = encode_and_marshal(meal_serializer, meal_fields, (1, 'ugali', 20, None, None))
+        self.assertEqual(encoded, marshalled)
+
+    def test_unsupported_field(self):
+        """Test that fields that cannot be compiled are rejected up front"""
+        with self.assertRaises(TypeError):
+            Serializer({'price' : fields.Float}, models.Meal)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,6 +22,16 @@ class SignupTests(BaseTests):
         response = self.app.post('/api/v3/auth/signup', data=data, content_type='application/json')
         self.assertEqual(response.status_code, 201)
 
+    def test_signup_existing_email(self):
+        """Test unsuccessful signup because the email is already registered"""
+        data = json.dumps({
+            "username" : "mark", "email" : "user@gmail.com",
+            "password" : "secret12345", "confirm_password" : "secret12345"})
+        response = self.app.post('/api/v3/auth/signup', data=data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['message'],
+                         'user with that email already exists')
+
     def test_signup_diff_passwords(self):
         """Test unsuccessful signup because of unmatching passwords"""
         data = json.dumps({
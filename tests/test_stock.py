@@ -0,0 +1,165 @@
+"""Test the stock of meals and sold out meals
+"""
+import unittest
+import json
+import threading
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+from .base_test import BaseTests
+
+
+class StockTests(BaseTests):
+    """Tests functionality of ordering meals with a limited stock"""
+
+
+    def set_stock(self, stock, meal_id=2, header=None):
+        """Sets the stock of a meal"""
+        return self.app.put(
+            '/api/v3/meals/{}/stock'.format(meal_id), data=json.dumps({"stock" : stock}),
+            headers=header or self.admin_header)
+
+    def get_stock(self, meal_id=2):
+        """Reads the stock of a meal from the database"""
+        with self.application.app_context():
+            return models.Meal.query.get(meal_id).stock
+
+    def get_menu(self):
+        """Gets the menu, keyed by meal id"""
+        response = self.app.get('/api/v3/menu', headers=self.user_header)
+        return {meal['id'] : meal for meal in json.loads(response.get_data(as_text=True))['menu']}
+
+    def test_set_stock(self):
+        """Test admin setting and clearing the stock of a meal"""
+        response = self.set_stock(5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['2']['stock'], 5)
+        self.assertEqual(self.get_stock(), 5)
+        self.assertEqual(self.set_stock(None).status_code, 200)
+        self.assertIsNone(self.get_stock())
+
+    def test_set_stock_errors(self):
+        """Test unsuccessfully setting the stock of a meal"""
+        self.assertEqual(self.set_stock(-1).status_code, 400)
+        self.assertEqual(self.set_stock(5, meal_id=57).status_code, 404)
+        self.assertEqual(self.set_stock(5, header=self.user_header).status_code, 401)
+
+    def test_create_meal_with_stock(self):
+        """Test admin creating a meal with a stock"""
+        response = self.app.post(
+            '/api/v3/meals', data=json.dumps({"name" : "pilau", "price" : 90, "in_menu" : True,
+                                              "stock" : 3}),
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.get_stock(meal_id=3), 3)
+
+    def test_order_takes_stock(self):
+        """Test that orders take stock until the meal sells out"""
+        self.set_stock(2)
+        self.assertEqual(self.place_order().status_code, 201)
+        self.assertEqual(self.place_order().status_code, 201)
+        response = self.place_order()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sold out', json.loads(response.get_data(as_text=True))['message'])
+        self.assertEqual(self.get_stock(), 0)
+        self.assertEqual(self.count_orders(), 3)
+
+    def test_unlimited_meal(self):
+        """Test that a meal without a stock never sells out"""
+        for _ in range(3):
+            self.assertEqual(self.place_order().status_code, 201)
+        self.assertIsNone(self.get_stock())
+        self.assertFalse(self.get_menu()[2]['sold_out'])
+
+    def test_menu_shows_sold_out(self):
+        """Test that the cached menu is refreshed when a meal sells out and is restocked"""
+        self.set_stock(1)
+        self.assertFalse(self.get_menu()[2]['sold_out'])
+        self.place_order()
+        self.assertTrue(self.get_menu()[2]['sold_out'])
+
+        self.app.delete('/api/v3/orders/2', headers=self.user_header)
+        self.assertEqual(self.get_stock(), 1)
+        self.assertFalse(self.get_menu()[2]['sold_out'])
+
+    def test_update_order_moves_stock(self):
+        """Test that changing the meal of an order takes its stock and gives back the old one"""
+        self.app.post('/api/v3/meals', data=json.dumps({
+            "name" : "pilau", "price" : 90, "in_menu" : True, "stock" : 1}),
+                      headers=self.admin_header)
+        self.set_stock(1)
+        self.place_order()
+        self.assertEqual(self.get_stock(), 0)
+
+        response = self.app.put('/api/v3/orders/2', data=json.dumps({"meal_id" : 3}),
+                                headers=self.user_header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_stock(), 1)
+        self.assertEqual(self.get_stock(meal_id=3), 0)
+
+        response = self.app.put('/api/v3/orders/1', data=json.dumps({"meal_id" : 3}),
+                                headers=self.user_header)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.get_stock(), 1)
+
+    def test_batch_sells_what_is_left(self):
+        """Test that a batch larger than the stock gets the portions that are left"""
+        self.set_stock(2)
+        response = self.app.post('/api/v3/orders/batch', data=json.dumps({"meal_ids" : [2, 2, 2]}),
+                                 headers=self.user_header)
+        statuses = [order['status'] for order in json.loads(response.get_data(as_text=True))['orders']]
+        self.assertEqual(statuses, [201, 201, 400])
+        self.assertEqual(self.get_stock(), 0)
+        self.assertEqual(self.count_orders(), 3)
+
+    def test_intake_takes_stock(self):
+        """Test that orders written by the intake take stock too"""
+        intake = self.application.extensions['order_intake']
+        intake.enabled = True
+        intake.delay = 0.05
+        self.set_stock(2)
+        statuses = []
+
+        def order():
+            """place an order from a client of its own"""
+            statuses.append(self.place_order(client=self.application.test_client()).status_code)
+
+        threads = [threading.Thread(target=order) for _ in range(5)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            intake.close()
+
+        self.assertEqual(sorted(statuses), [201, 201, 400, 400, 400])
+        self.assertEqual(self.get_stock(), 0)
+        self.assertEqual(self.count_orders(), 3)
+
+    def test_concurrent_orders_never_oversell(self):
+        """Test that concurrent orders sell exactly the stock"""
+        self.set_stock(10)
+        statuses = []
+
+        def order():
+            """place an order from a client of its own"""
+            statuses.append(self.place_order(client=self.application.test_client()).status_code)
+
+        threads = [threading.Thread(target=order) for _ in range(30)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses.count(201), 10)
+        self.assertEqual(statuses.count(400), 20)
+        self.assertEqual(self.get_stock(), 0)
+        self.assertEqual(self.count_orders(), 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,11 +2,13 @@
 """
 import unittest
 import json
+import datetime
 
 import sys # fix import errors
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import models
 from .base_test import BaseTests
 
 
@@ -19,6 +21,25 @@ class UsersTest(BaseTests):
         response = self.app.get('/api/v3/users/1', headers=self.admin_header)
         self.assertEqual(response.status_code, 200)
 
+    def test_admin_get_user_order_summary(self):
+        """Test that a user is returned with a summary of their live and archived orders"""
+        self.app.post('/api/v3/orders', data=json.dumps({"meal_id" : 2}), headers=self.user_header)
+        with self.application.app_context():
+            models.Order.archive(datetime.datetime.utcnow() + datetime.timedelta(days=1))
+
+        response = self.app.get('/api/v3/users/2', headers=self.admin_header)
+        user = json.loads(response.get_data(as_text=True))['2']
+        self.assertNotIn('orders', user)
+        self.assertEqual(user['order_summary']['count'], 2)
+        self.assertEqual(user['order_summary']['total_spend'], 40)
+        self.assertIsNotNone(user['order_summary']['last_order_at'])
+
+    def test_admin_get_user_without_orders(self):
+        """Test the order summary of a user who never ordered"""
+        response = self.app.get('/api/v3/users/1', headers=self.admin_header)
+        summary = json.loads(response.get_data(as_text=True))['1']['order_summary']
+        self.assertEqual(summary, {"count" : 0, "total_spend" : 0, "last_order_at" : None})
+
     def test_user_get_user(self):
         """Test non-admin user getting one user by providing the user_id"""
         response = self.app.get('/api/v3/users/1', headers=self.user_header)
@@ -62,6 +83,37 @@ class UsersTest(BaseTests):
             headers=self.admin_header)
         self.assertEqual(response.status_code, 400)
 
+    def test_update_taken_email(self):
+        """Test unsuccessful user update because the email belongs to another user"""
+        data = json.dumps({
+            "username" : "user1", "email" : "admin@gmail.com",
+            "password" : "topsecret1", "confirm_password" : "topsecret1"})
+        response = self.app.put(
+            '/api/v3/users/2', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['message'],
+                         'user with that email already exists')
+
+    def test_update_password_only(self):
+        """Test updates that change only the password, then nothing at all"""
+        data = json.dumps({
+            "username" : "user", "email" : "user@gmail.com",
+            "password" : "topsecret1", "confirm_password" : "topsecret1"})
+        response = self.app.put(
+            '/api/v3/users/2', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 200)
+        response = self.app.put(
+            '/api/v3/users/2', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['message'],
+                         'No changes detected')
+
     def test_updating_non_existing(self):
         """Test updating non_existing user"""
         data = json.dumps({
@@ -0,0 +1,69 @@
+"""Test the endpoint listing the orders of a user
+"""
+import unittest
+import json
+import datetime
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+from .base_test import BaseTests
+
+
+class UserOrdersTests(BaseTests):
+    """Tests functionality of the orders sub-resource of a user"""
+
+
+    def place_orders(self, count):
+        """Places more orders as the user"""
+        for _ in range(count):
+            self.app.post('/api/v3/orders', data=json.dumps({"meal_id" : 2}), headers=self.user_header)
+
+    def get_orders(self, user_id=2, header=None, query=''):
+        """Lists the orders of a user"""
+        return self.app.get('/api/v3/users/{}/orders{}'.format(user_id, query),
+                            headers=header or self.admin_header)
+
+    def test_admin_get_user_orders(self):
+        """Test admin listing the orders of a user, newest first"""
+        self.place_orders(2)
+        response = self.get_orders()
+        self.assertEqual(response.status_code, 200)
+        orders = json.loads(response.get_data(as_text=True))['orders']
+        self.assertEqual([order['id'] for order in orders], [3, 2, 1])
+        self.assertTrue(all(order['user_id'] == 2 for order in orders))
+
+    def test_pagination(self):
+        """Test walking the orders of a user page by page, archived ones last"""
+        self.place_orders(3)
+        with self.application.app_context():
+            models.Order.archive(datetime.datetime.utcnow() + datetime.timedelta(days=1))
+
+        ids = []
+        query = '?limit=3'
+        while query:
+            page = json.loads(self.get_orders(query=query).get_data(as_text=True))
+            ids.extend(order['id'] for order in page['orders'])
+            query = '?limit=3&cursor={}'.format(page['next_cursor']) if page['next_cursor'] else None
+        self.assertEqual(ids, [4, 3, 2, 1])
+
+    def test_user_get_own_orders(self):
+        """Test a user listing their own orders"""
+        response = self.get_orders(header=self.user_header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.get_data(as_text=True))['orders']), 1)
+
+    def test_user_get_other_orders(self):
+        """Test a user unsuccessfully listing the orders of someone else"""
+        response = self.get_orders(user_id=1, header=self.user_header)
+        self.assertEqual(response.status_code, 401)
+
+    def test_get_orders_non_existing(self):
+        """Test listing the orders of a user that does not exist"""
+        self.assertEqual(self.get_orders(user_id=27).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
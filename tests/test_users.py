@@ -19,6 +19,52 @@ class UsersTests(BaseTests):
         response = self.app.get('/api/v3/users', headers=self.admin_header)
         self.assertEqual(response.status_code, 200)
 
+    def test_admin_get_all_paginated(self):
+        """Tests getting users one page at a time using the cursor"""
+        response = self.app.get('/api/v3/users?limit=1', headers=self.admin_header)
+        first_page = json.loads(response.get_data(as_text=True))
+        self.assertEqual([user['id'] for user in first_page['users']], [2])
+
+        response = self.app.get(
+            '/api/v3/users?limit=1&cursor={}'.format(first_page['next_cursor']),
+            headers=self.admin_header)
+        second_page = json.loads(response.get_data(as_text=True))
+        self.assertEqual([user['id'] for user in second_page['users']], [1])
+        self.assertIsNone(second_page['next_cursor'])
+
+    def test_admin_get_all_query_count(self):
+        """Tests that listing users costs the same number of queries however many users have orders"""
+        data = json.dumps({"meal_id" : 2})
+        self.app.post(
+            '/api/v3/orders', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        user = json.dumps({
+            "username" : "mark", "email" : "mark@gmail.com",
+            "password" : "secret12345", "confirm_password" : "secret12345"})
+        self.app.post(
+            '/api/v3/users', data=user,
+            content_type='application/json',
+            headers=self.admin_header)
+        response = self.app.get('/api/v3/users', headers=self.admin_header)
+        users = json.loads(response.get_data(as_text=True))['users']
+        self.assertEqual(len(users), 3)
+        self.assertEqual(users[1]['orders'], ['<order 1: chapo>'])
+        self.assertEqual(response.headers['X-Query-Count'], '2')
+
+    def test_admin_get_all_not_modified(self):
+        """Tests that the users page is sent again only once it has changed"""
+        response = self.app.get('/api/v3/users', headers=self.admin_header)
+        headers = dict(self.admin_header, **{"If-None-Match" : response.headers['ETag']})
+        self.assertEqual(self.app.get('/api/v3/users', headers=headers).status_code, 304)
+
+        data = json.dumps({"meal_id" : 2})
+        self.app.post(
+            '/api/v3/orders', data=data,
+            content_type='application/json',
+            headers=self.admin_header)
+        self.assertEqual(self.app.get('/api/v3/users', headers=headers).status_code, 200)
+
     def test_user_get_all(self):
         """Tests normal user unauthorized to get get all users"""
         response = self.app.get('/api/v3/users', headers=self.user_header)
@@ -0,0 +1,127 @@
+"""Test the If-Match support of meal and order updates
+"""
+import unittest
+import json
+
+import sys # fix import errors
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+import models
+from .base_test import BaseTests
+
+
+class VersionTests(BaseTests):
+    """Tests functionality of updates sent with If-Match"""
+
+
+    def update_meal(self, price, etag=None):
+        """Updates the price of the meal on the menu, with If-Match when etag is given"""
+        headers = dict(self.admin_header)
+        if etag is not None:
+            headers['If-Match'] = etag
+        return self.app.put(
+            '/api/v3/meals/2', data=json.dumps({"name" : "chapo", "price" : price, "in_menu" : True}),
+            headers=headers)
+
+    def update_order(self, meal_id, etag=None):
+        """Changes the meal of the order, with If-Match when etag is given"""
+        headers = dict(self.user_header)
+        if etag is not None:
+            headers['If-Match'] = etag
+        return self.app.put('/api/v3/orders/1', data=json.dumps({"meal_id" : meal_id}),
+                            headers=headers)
+
+    def meal_etag(self):
+        """Gets the ETag of the meal on the menu"""
+        return self.app.get('/api/v3/meals/2', headers=self.admin_header).headers['ETag']
+
+    def test_meal_etag_is_id_and_version(self):
+        """Test that the ETag of a meal has its id and changes with every update"""
+        self.assertTrue(self.meal_etag().startswith('"2-1-'))
+        self.update_meal(30)
+        self.assertTrue(self.meal_etag().startswith('"2-2-'))
+
+    def test_meal_update_if_match(self):
+        """Test that an update sent with the current ETag succeeds"""
+        response = self.update_meal(30, etag=self.meal_etag())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.meal_etag().startswith('"2-2-'))
+
+    def test_meal_lost_update(self):
+        """Test that the second of two admins editing the same version gets a 412"""
+        etag = self.meal_etag()
+        self.assertEqual(self.update_meal(30, etag=etag).status_code, 200)
+        response = self.update_meal(40, etag=etag)
+        self.assertEqual(response.status_code, 412)
+        with self.application.app_context():
+            self.assertEqual(models.Meal.query.get(2).price, 30)
+
+    def test_meal_update_other_etags(self):
+        """Test If-Match with an ETag that is no version, with a wildcard and without it"""
+        self.assertEqual(self.update_meal(30, etag='"abc"').status_code, 412)
+        self.assertEqual(self.update_meal(30, etag='*').status_code, 200)
+        self.assertEqual(self.update_meal(40).status_code, 200)
+        self.assertEqual(self.update_meal(40, etag='"2-3"').status_code, 400)
+
+    def test_meal_update_etag_of_other_meal(self):
+        """Test that the ETag of another meal at the same version does not match"""
+        etag = self.app.get('/api/v3/meals/1', headers=self.admin_header).headers['ETag']
+        self.assertTrue(etag.startswith('"1-1'))
+        self.assertEqual(self.update_meal(30, etag=etag).status_code, 412)
+
+    def test_meal_update_if_match_non_existing(self):
+        """Test that a missing meal is still reported as missing"""
+        headers = dict(self.admin_header, **{'If-Match' : '"57-1"'})
+        response = self.app.put(
+            '/api/v3/meals/57', data=json.dumps({"name" : "pilau", "price" : 90, "in_menu" : True}),
+            headers=headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_meal_update_if_match_single_statement(self):
+        """Test that the version is checked by the UPDATE itself"""
+        statements = []
+
+        def count(conn, cursor, statement, *args): # pylint: disable=W0613
+            """record each statement sent to the database"""
+            statements.append(statement)
+
+        with self.application.app_context():
+            event.listen(models.db.engine, 'before_cursor_execute', count)
+            try:
+                response = models.Meal.update_meal(2, "chapo", 30, True, versions=[1])
+            finally:
+                event.remove(models.db.engine, 'before_cursor_execute', count)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(statements), 1)
+
+    def test_selling_stock_keeps_version(self):
+        """Test that an edit sent with If-Match succeeds after an order took stock"""
+        self.app.put('/api/v3/meals/2/stock', data=json.dumps({"stock" : 5}),
+                     headers=self.admin_header)
+        etag = self.meal_etag()
+        self.app.post('/api/v3/orders', data=json.dumps({"meal_id" : 2}), headers=self.user_header)
+        # the stock is part of the meal, so cached copies are refreshed
+        self.assertNotEqual(self.meal_etag(), etag)
+        self.assertEqual(self.update_meal(30, etag=etag).status_code, 200)
+
+    def test_order_update_if_match(self):
+        """Test changing an order at its current version, then at an outdated one"""
+        self.app.post('/api/v3/meals', data=json.dumps({"name" : "pilau", "price" : 90, "in_menu" : True}),
+                      headers=self.admin_header)
+        etag = self.app.get('/api/v3/orders/1', headers=self.user_header).headers['ETag']
+        self.assertEqual(etag, '"1-1"')
+
+        response = self.update_order(3, etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['1']['version'], 2)
+        self.assertEqual(self.update_order(2, etag=etag).status_code, 412)
+        with self.application.app_context():
+            self.assertEqual(models.Order.query.get(1).meal_id, 3)
+        self.assertEqual(self.update_order(2).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()